@@ -0,0 +1,147 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from script.log import SLog
+from script.constPath.error_code import ErrorCode
+from ability.core.exeception import MException
+from ability.core.memory import Memory, ARGS_SCOPE, current_scope
+from ability.core.engine_registry import current_device
+from ability.component.template import Template
+from ability.component.router import BaseRouter
+import ability.common.platform as platform_code
+
+TAG = "Call"
+
+# 子工作流嵌套调用的最大深度，防止工作流互相调用无限递归
+MAX_DEPTH = 8
+# map 模式的并发上限
+MAX_WORKERS = 8
+
+_depth = contextvars.ContextVar("call_depth", default=0)
+
+
+@BaseRouter.route('cfs/call')
+class Call(Template):
+    """
+    调用另一个工作流:
+      - 入参写入子工作流的 {{$args.名称}}，子工作流在独立的变量作用域中执行
+      - outputs 把子工作流中的变量 (如 login-1.token，不加花括号) 取回为本节点的输出变量；
+        路径在子工作流结束后才在其作用域中读取，只能是常量，不能写成 {{...}}
+      - map 模式对 items 中的每一项执行一次子工作流 ({{$args.item}} / {{$args.index}})，
+        最多 workers 个同时执行，结果按顺序写入 results
+      - 子工作流的界面节点与调用方共用设备锁；子工作流包含界面节点时 map 逐项执行
+    子工作流的编译计划按 (workflow id, updated_at) 缓存，重复调用不会重复解析
+    """
+    META = {
+        "type": 200,
+        "name": "调用工作流",
+        "icon": "workflow",
+        "inputs": [
+            {"name": "workflow_id", "type": "int", "desc": "被调用的工作流 ID"},
+            {"name": "inputs", "type": "dict", "desc": "入参，子工作流中以 {{$args.名称}} 读取"},
+            {"name": "outputs", "type": "dict", "desc": "输出变量名 -> 子工作流中的变量路径 (常量)，如 login-1.token"},
+            {"name": "mode", "type": "select", "desc": "执行方式",
+             "options": [{"value": "single", "text": "单次"}, {"value": "map", "text": "逐项并行"}]},
+            {"name": "items", "type": "list", "desc": "map 模式: 逐项执行的列表"},
+            {"name": "workers", "type": "int", "desc": "map 模式: 同时执行的数量"},
+        ],
+        "defaultData": {
+            "workflow_id": "",
+            "inputs": {},
+            "outputs": {},
+            "mode": "single",
+            "items": [],
+            "workers": 2
+        },
+        "outputVars": [
+            {"key": "results", "type": "list", "desc": "map 模式: 每一项的输出"}
+        ]
+    }
+
+    def on_check(self):
+        """
+        outputs 必须是 {输出变量名: 变量路径}，路径为非空常量字符串
+        """
+        outputs = self.get_param_value("outputs") or {}
+        if isinstance(outputs, dict) and all(isinstance(name, str) and isinstance(path, str) and path.strip()
+                                             and "{{" not in path for name, path in outputs.items()):
+            return
+        SLog.e(TAG, f"Node [{self.info.id}] outputs must map names to paths like login-1.token: {outputs}")
+        raise MException(ErrorCode.RUN_ERROR_CALL_BAD_OUTPUTS)
+
+    def execute(self):
+        from server.services.workflow_service import load_workflow
+
+        self.on_check()
+        depth = _depth.get()
+        if depth >= MAX_DEPTH:
+            raise MException(ErrorCode.RUN_ERROR_CALL_TOO_DEEP)
+        workflow_id = self.get_param_value("workflow_id")
+        workflow = load_workflow(workflow_id)
+        if workflow is None:
+            SLog.e(TAG, f"Workflow [{workflow_id}] not found")
+            raise MException(ErrorCode.RUN_ERROR_CALL_NOT_FOUND)
+        # 子工作流沿用调用方的设备
+        workflow = dict(workflow, device=current_device.get())
+
+        inputs = self.get_param_value("inputs") or {}
+        outputs = self.get_param_value("outputs") or {}
+        if self.get_param_value("mode") != "map":
+            # 在上下文副本中执行，子工作流的作用域不影响本节点之后写入的变量
+            result = contextvars.copy_context().run(self._invoke, workflow, inputs, outputs, 0, depth)
+            if result["status"] != "success":
+                raise MException(ErrorCode.RUN_ERROR_CALL_FAILED)
+            for name, value in result["outputs"].items():
+                self.memory.set(self.info, name, value)
+            return
+
+        items = self.get_param_value("items") or []
+        workers = max(1, min(int(self.get_param_value("workers") or 1), MAX_WORKERS, len(items) or 1))
+        if workers > 1 and self._uses_device(workflow):
+            # 子工作流包含界面节点时逐项执行: 并行的各项会在同一台设备上交替操作
+            SLog.w(TAG, f"Workflow [{workflow_id}] has UI nodes, map items run one at a time")
+            workers = 1
+        SLog.i(TAG, f"Map workflow [{workflow_id}] over {len(items)} items, workers={workers}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"call-{self.info.id}") as executor:
+            # 每一项在调用方上下文的副本中执行 (run_id、设备、调用深度)
+            futures = [executor.submit(contextvars.copy_context().run, self._invoke, workflow,
+                                       dict(inputs, item=item, index=index), outputs, index, depth)
+                       for index, item in enumerate(items)]
+            results = [future.result() for future in futures]
+        self.memory.set(self.info, "results", [dict(item["outputs"], status=item["status"]) for item in results])
+        failed = [index for index, item in enumerate(results) if item["status"] != "success"]
+        if failed:
+            SLog.e(TAG, f"Map workflow [{workflow_id}] failed items: {failed}")
+            raise MException(ErrorCode.RUN_ERROR_CALL_FAILED)
+
+    @staticmethod
+    def _uses_device(workflow):
+        """
+        子工作流中是否有节点在界面通道上执行 (其中再调用的工作流不展开，它们的界面节点同样受设备锁约束)
+        """
+        from driver.core.manager import lane_of
+        nodes = workflow.get("nodes") or {}
+        return any(lane_of(node.get("platform")) != platform_code.COMMON
+                   for node in nodes.values() if isinstance(node, dict) and node.get("nodeCode"))
+
+    def _invoke(self, workflow, args, outputs, index, depth):
+        from driver.core.manager import Manager as Runner
+
+        memory = Memory()
+        scope = f"{memory.store().run_id}/{self.info.id}#{index}"
+        current_scope.set(scope)
+        _depth.set(depth + 1)
+        try:
+            store = memory.store()
+            for name, value in args.items():
+                store.set(ARGS_SCOPE, name, value)
+            Runner(workflow, keep_alive=True, report={}).run()
+            values = {name: memory.get(path) for name, path in outputs.items()}
+            return {"status": "success", "outputs": values}
+        except Exception as e:
+            SLog.e(TAG, f"Workflow [{workflow.get('id')}] #{index} failed: {e}")
+            return {"status": "failed", "outputs": {}, "error": str(e)}
+        finally:
+            memory.release(scope)
@@ -1,33 +1,162 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
+import time
 
-from ability.core.step_result import StepResult
-from ability.component.template import Template
+from script.log import SLog
 from ability.component.router import BaseRouter
+from ability.component.cfs.mIf import MIf
 
 import script.constPath.component_code as MCode
 
+TAG = "MFor"
+
+# 未设置 max_iterations 时的迭代上限，防止 while 条件写错导致死循环
+MAX_ITERATIONS = 1000
+
+# 未设置 loop 时按节点类型选择循环方式
+LOOP_TYPES = {
+    MCode.MCFS_FOR: "count",
+    MCode.MCFS_FOR_RANDOM: "count",
+    MCode.MCFS_FOR_CHILD: "each",
+    MCode.MCFS_FOR_ELEMENT: "each",
+    MCode.MCFS_WHILE: "while",
+}
+
+
 @BaseRouter.route('cfs/mFor')
-class MFor(Template):
+class MFor(MIf):
     """
-        This component will close web browser.
+    循环: 节点的 nextCodes 为循环体入口 (data["body"]，默认第一个) 和循环结束后的节点，
+    循环体最后一个节点连回本节点。每次进入本节点决定继续执行循环体还是退出:
+
+      count: 执行 count 次
+      each:  遍历 items (列表变量或查找到的元素列表)，当前项为 {{本节点.item}}
+      while: conditions 成立时继续 (logic 为 AND / OR)
+
+    break_if 条件成立时提前退出，无需单独的 cfs/mIf 节点；超过 max_iterations 时强制退出
+    同一次运行内组件实例在迭代之间复用，循环状态保存在实例上，退出时清除以便外层循环再次进入
     """
     META = {
-        "name": "M",
-        "inputs": [{"key": "path", "type": "string"}]
+        "type": 110,
+        "name": "循环",
+        "icon": "loop",
+        "inputs": [
+            {"name": "loop", "type": "select", "desc": "循环方式",
+             "options": [{"value": "count", "text": "按次数"}, {"value": "each", "text": "遍历列表"},
+                         {"value": "while", "text": "条件循环"}]},
+            {"name": "count", "type": "int", "desc": "按次数: 循环次数"},
+            {"name": "items", "type": "list", "desc": "遍历列表: 列表变量，如 {{find.elements}}"},
+            {"name": "conditions", "type": "list", "desc": "条件循环: 条件成立时继续"},
+            {"name": "break_if", "type": "list", "desc": "条件成立时提前退出"},
+            {"name": "max_iterations", "type": "int", "desc": "最大迭代次数"},
+        ],
+        "defaultData": {
+            "loop": "count",
+            "count": 1,
+            "items": [],
+            "conditions": [],
+            "logic": "AND",
+            "break_if": [],
+            "max_iterations": MAX_ITERATIONS
+        },
+        "outputVars": [
+            {"key": "index", "type": "int", "desc": "当前迭代序号 (从 0 开始)"},
+            {"key": "item", "type": "any", "desc": "遍历列表: 当前项"},
+            {"key": "iterations", "type": "int", "desc": "已执行的迭代次数"},
+            {"key": "timings", "type": "list", "desc": "每次迭代的耗时 (秒)"},
+            {"key": "exit_reason", "type": "str", "desc": "退出原因: done / break / max_iterations"},
+        ]
     }
 
-    def on_check(self):
-        ...
+    def __init__(self, info):
+        super().__init__(info)
+        self.state = None
 
     def execute(self):
-        if self.info.nodeType == MCode.MCFS_FOR_RANDOM:
-            if self.memory.get(self.info.id):
-                self.memory.set(self.info, int(self.memory.get(self.info.id)) + 1)
-                if int(self.memory.get(self.info.id)) > int(self.get_param_value("index")):
-                    self.result.success()
-            else:
-                self.memory.set(self.info, 1)
-        return StepResult()
+        now = time.perf_counter()
+        state = self.state
+        if state is None:
+            state = self.state = self._start(now)
+        else:
+            # 再次进入: 上一次迭代结束
+            state["timings"].append(round(now - state["entered"], 3))
+            state["index"] += 1
+            state["entered"] = now
+
+        # 条件中可以引用 {{本节点.index}}
+        self.memory.set(self.info, "index", state["index"])
+        reason = self._exit_reason(state)
+        if reason is None:
+            if state["items"] is not None:
+                self.memory.set(self.info, "item", state["items"][state["index"]])
+            self.info.nextCodes = [state["body"]]
+            return self.result
+
+        timings = state["timings"]
+        self.memory.set(self.info, "iterations", len(timings))
+        self.memory.set(self.info, "timings", timings)
+        self.memory.set(self.info, "exit_reason", reason)
+        average = sum(timings) / len(timings) if timings else 0
+        SLog.i(TAG, f"Loop [{self.info.id}] exit ({reason}): {len(timings)} iterations, avg {average:.3f}s")
+        self.info.nextCodes = state["exit"]
+        self.state = None
+        return self.result
+
+    def _start(self, now):
+        next_codes = list(self.info.nextCodes)
+        body = self.info.data.get("body") or (next_codes[0] if next_codes else None)
+        loop = self.info.data.get("loop") or LOOP_TYPES.get(self.info.nodeType, "count")
+        items = None
+        limit = None
+        if loop == "each":
+            items = self.get_param_value("items")
+            items = list(items) if isinstance(items, (list, tuple)) else []
+            limit = len(items)
+        elif loop == "count":
+            # 旧版本的 MCFS_FOR_RANDOM 使用 index 作为次数
+            name = "count" if "count" in self.info.data else "index"
+            limit = int(self._param(name, 1) or 0)
+        return {
+            "loop": loop,
+            "body": body,
+            "exit": [code for code in next_codes if code != body],
+            "items": items,
+            "limit": limit,
+            "max": int(self._param("max_iterations", MAX_ITERATIONS)),
+            "index": 0,
+            "entered": now,
+            "timings": [],
+        }
+
+    def _param(self, name, default):
+        if self.info.data.get(name) in (None, ""):
+            return default
+        return self.get_param_value(name)
+
+    def _exit_reason(self, state):
+        if state["body"] is None:
+            return "done"
+        if state["limit"] is not None and state["index"] >= state["limit"]:
+            return "done"
+        if state["loop"] == "while" and not self._check("conditions", self._logic()):
+            return "done"
+        if self._check("break_if", "OR"):
+            return "break"
+        if state["index"] >= state["max"]:
+            SLog.w(TAG, f"Loop [{self.info.id}] reached max iterations {state['max']}")
+            return "max_iterations"
+        return None
 
+    def _logic(self):
+        logic = self.info.data.get("logic") or "AND"
+        return str(logic).upper()
 
+    def _check(self, name, logic):
+        """
+        条件列表: AND 全部成立 / OR 任一成立；条件为空时 while 视为成立，break_if 视为不成立
+        """
+        conditions = [operand for operand in self._operands(name) if operand is not None]
+        if not conditions:
+            return logic == "AND"
+        results = (self._compare_values(left, op, right) for left, op, right in conditions)
+        return all(results) if logic == "AND" else any(results)
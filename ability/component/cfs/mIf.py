@@ -118,7 +118,7 @@ class MIf(Template):
                 variable_name = self._extract_variable_name(value)
                 # 从组件上下文中获取变量值
                 actual_value = self.memory.get(variable_name)
-                SLog.d(TAG, f"解析模板变量: {value} -> {variable_name} = {actual_value}")
+                SLog.d(TAG, "解析模板变量: %s -> %s = %s", value, variable_name, actual_value)
                 return actual_value
 
         # 处理布尔值字符串和数字
@@ -146,15 +146,47 @@ class MIf(Template):
 
         return value
 
+    def _operands(self, name):
+        """
+        取出条件列表，返回 [(left, op, right)]，格式错误的条目为 None (保持与 branches 的序号对应)
+        计划中已编译的条件: 引用变量的一侧已解析为变量值，原样参与比较 (不再按模板二次解析，也不做类型转换)，
+        只有常量一侧按字符串转换类型；未编译时按原方式逐项解析
+        """
+        raw = self.info.data.get(name)
+        if not isinstance(raw, list):
+            return []
+        bindings = getattr(self.info, "bindings", None)
+        resolved = self.get_param_value(name) if bindings is not None and name in bindings else raw
+
+        def value(text, actual):
+            if resolved is raw:
+                return self._get_actual_value(text)
+            if isinstance(text, str) and "{{" in text:
+                return actual
+            return self._convert_value_type(actual)
+
+        operands = []
+        for condition, actual in zip(raw, resolved):
+            if not isinstance(condition, dict):
+                operands.append(None)
+                continue
+            operands.append((value(condition.get('left'), actual.get('left')), condition.get('op'),
+                             value(condition.get('right'), actual.get('right'))))
+        return operands
+
     def execute(self):
+        # 实例在循环中会被复用，每次执行重新判断分支
+        self.index = "else"
 
         # 1. 获取条件列表和逻辑关系
-        conditions = self.get_param_value("conditions")
+        conditions = self._operands("conditions")
         branches = self.get_param_value("branches")
         # logic_type = self.get_param_value("logic")  # 获取 'AND' 或 'OR'
 
         if not conditions:
             SLog.w(TAG, "No conditions found, defaulting to True")
+            # 与旧的顺序执行一致，只走第一个后继节点
+            self.info.nextCodes = list(self.info.nextCodes[:1])
             return self.result
 
         # if not logic_type:
@@ -162,16 +194,11 @@ class MIf(Template):
         # check_results = []
 
         # 2. 遍历所有条件进行判断
-        for key, condition in enumerate(conditions):
-            left = condition.get('left')
-            op = condition.get('op')
-            right = condition.get('right')
-
-            # 获取实际值（自动处理模板变量）
-            left_value = self._get_actual_value(left)
-            right_value = self._get_actual_value(right)
-
-            SLog.d(TAG, f"实际值: left={left_value}, right={right_value}")
+        for key, operand in enumerate(conditions):
+            if operand is None:
+                continue
+            left_value, op, right_value = operand
+            SLog.d(TAG, "实际值: left=%s, right=%s", left_value, right_value)
 
             # 执行单条比较
             res = self._compare_values(left_value, op, right_value)
@@ -183,7 +210,9 @@ class MIf(Template):
         try:
             self.info.nextCodes = [branches[str(self.index)]]
             SLog.i(TAG, branches[str(self.index)])
-        except KeyError:
-            ...
+        except (KeyError, TypeError):
+            # 未命中且没有 else 分支: 与旧的顺序执行一致，只走第一个后继节点，其余分支剪枝
+            self.info.nextCodes = list(self.info.nextCodes[:1])
+            SLog.w(TAG, f"No branch for [{self.index}], following {self.info.nextCodes}")
 
         return self.result
\ No newline at end of file
@@ -59,11 +59,10 @@ MAP = {
         },
         "details": {
             "for": {
-                "type": 101,
+                "type": 110,
                 "name": "循环执行",
-                "icon": "if",
-                "address": "cfs/mIf",
-                "hide": True
+                "icon": "loop",
+                "address": "cfs/mFor"
             },
             "if": {
                 "type": 101,
@@ -77,6 +76,12 @@ MAP = {
                 "icon": "bed",  # 对应前端 iconMap 里的图标
                 "address": "cfs/sleep",
             },
+            "call": {
+                "type": 200,
+                "name": "调用工作流",
+                "icon": "workflow",
+                "address": "cfs/call",
+            },
         }
     },
     "web": {
@@ -13,6 +13,8 @@ TAG = "OCR"
 
 @BaseRouter.route('public/ocr')
 class FastOCR(Template):
+    # 同一图片内容的识别结果不变，默认使用结果缓存 (节点 data 中 cache: false 可关闭)
+    CACHEABLE = True
     META = {
         "inputs": [
             {
@@ -46,7 +48,8 @@ class FastOCR(Template):
             results = analyze(image_path)
             self.memory.set(self.info, "ocr_result", results)
 
-            if results:
+            # 标注图需要再解码、编码一次图片，只在下游引用时生成
+            if results and self.wants("ocr_image_path"):
                 write_path = visualize(image_path, results)
                 self.memory.set(self.info, "ocr_image_path", write_path)
             self.result.result_data({"ocr_result": results})
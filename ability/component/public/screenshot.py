@@ -93,9 +93,11 @@ class Screenshot(Template):
             path = self.engine.screenshot(full_path)
             SLog.i("Screenshot", f"Saved at: {path}")
 
-        # 将路径和URL写入运行内存，供后续节点或前端使用
-        self.memory.set(self.info, "path", full_path)
-        self.memory.set(self.info, "url", web_path)
+        # 将下游引用的路径和URL写入运行内存
+        if self.wants("path"):
+            self.memory.set(self.info, "path", full_path)
+        if self.wants("url"):
+            self.memory.set(self.info, "url", web_path)
 
         self.result.success()
         return self.result
\ No newline at end of file
@@ -73,9 +73,9 @@ class BaseRouter:
         return config["address"]
 
     @classmethod
-    def handle_request(cls, uri, *args):
+    def _load(cls, uri):
         """
-        uri: 调用方传入的字符串，例如 "web/open-url"
+        查表并导入组件模块，返回 (真实地址, 处理器)
         """
         # --- 步骤 1: 查表获取真实地址 ---
         real_address = cls._resolve_uri_to_address(uri)
@@ -83,14 +83,14 @@ class BaseRouter:
         if not real_address:
             # 如果映射表中没找到，是否尝试直接使用 uri 作为地址？
             # 视你的需求而定，这里默认走 404
-            return cls._default_handler(uri, *args)
+            return None, None
 
         # --- 步骤 2: 动态加载模块 ---
         # real_address 是 "web/open_url"，转换为 "web.open_url" 以供 import 使用
         module_path = real_address.strip('/').replace('/', '.')
 
         if not module_path:
-            return cls._default_handler(uri, *args)
+            return None, None
 
         try:
             # 避免重复导入 (可选优化：sys.modules检查)
@@ -102,12 +102,32 @@ class BaseRouter:
         except Exception as e:
             SLog.e(TAG, f'Error importing module {module_path}: {e}')
 
-        # --- 步骤 3: 获取并执行路由 ---
         # 注意：这里是用 real_address ("web/open_url") 去 routes 字典里查
-        handler = cls.routes.get(real_address, cls._default_handler)
+        return real_address, cls.routes.get(real_address)
+
+    @classmethod
+    def resolve(cls, uri):
+        """
+        预解析组件类 (供执行计划编译使用)，找不到时返回 None
+        """
+        _, handler = cls._load(uri)
+        return handler if isinstance(handler, type) else None
+
+    @classmethod
+    def handle_request(cls, uri, *args):
+        """
+        uri: 调用方传入的字符串，例如 "web/open-url"
+        """
+        real_address, handler = cls._load(uri)
+        if not real_address:
+            return cls._default_handler(uri, *args)
+
+        # --- 步骤 3: 获取并执行路由 ---
+        if handler is None:
+            handler = cls._default_handler
 
         if isinstance(handler, type):
             instance = handler(*args)
             return instance
 
-        return handler(real_address, *args)
\ No newline at end of file
+        return handler(real_address, *args)
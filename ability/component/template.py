@@ -5,27 +5,12 @@ import re
 from driver.agent.actuator import process_runner_wrapper
 from script.log import SLog
 from ability.core.memory import Memory
+from ability.core.binding import clean_invisible_chars
 from ability.core.step_result import StepResult
 from ability.manager import Manager
-import ability.common.platform as platform_code
 
 TAG = "Template"
 
-# 编译清洗规则，匹配各种零宽字符
-_INVISIBLE_CHARS_PATTERN = re.compile(r'[\u200b-\u200d\ufeff]')
-
-def clean_invisible_chars(data):
-    """递归清洗字符串中的不可见字符"""
-    if isinstance(data, str):
-        return _INVISIBLE_CHARS_PATTERN.sub('', data)
-    elif isinstance(data, list):
-        # 如果是列表（如 locator_chain），对内部每个元素进行处理
-        return [clean_invisible_chars(item) for item in data]
-    elif isinstance(data, dict):
-        # 如果是字典（如 locator 节点），清洗所有的值
-        return {k: clean_invisible_chars(v) for k, v in data.items()}
-    return data
-
 
 class Template:
 
@@ -48,15 +33,22 @@ class Template:
         self.result = StepResult()
         self.get_engine()
 
+    def reset(self):
+        """
+        循环中复用实例再次执行前调用: 重新开始本次执行的结果和计时
+        """
+        self.result = StepResult()
+
     def get_engine(self):
-        if self.info.platform in platform_code.MWEB:
-            self.engine = Manager().WebEngine
-        elif self.info.platform in platform_code.MMOBILE:
-            self.engine = Manager().MobileEngine
-        elif self.info.platform in platform_code.MPC:
-            self.engine = Manager().PCEngine
+        # 按节点的平台和设备从引擎注册表获取，非界面组件为 None
+        self.engine = Manager().engine_for(self.info)
 
     def get_param_value(self, param_name):
+        # 计划中编译好的参数: 直接解析绑定，无需再清洗和匹配
+        bindings = getattr(self.info, "bindings", None)
+        if bindings is not None and param_name in bindings:
+            return bindings[param_name].resolve(self.memory)
+
         param_name = clean_invisible_chars(param_name)
         pattern = r'\{\{([^{}]+)\}\}'
         if isinstance(param_name, str) and re.match(pattern, param_name):
@@ -65,7 +57,7 @@ class Template:
 
         if param_name in self.info.data:
             val = clean_invisible_chars(self.info.data[param_name])
-            SLog.d(TAG, "Getting value of parameter '{}', and Parameter value is '{}'".format(param_name, val))
+            SLog.d(TAG, "Getting value of parameter '%s', and Parameter value is '%s'", param_name, val)
 
             if isinstance(val, str) and re.match(pattern, val):
                 return self.memory.get(val)
@@ -74,6 +66,13 @@ class Template:
             SLog.w(TAG, "Parameter '{}' is not defined".format(param_name))
             return False
 
+    def wants(self, key):
+        """
+        下游是否引用了该输出变量；未经计划编译 (如单节点调试接口) 时视为需要
+        """
+        wanted = getattr(self.info, "wanted", None)
+        return wanted is None or key in wanted
+
     def execute(self):
         ...
 
@@ -0,0 +1,136 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import os
+import re
+import pickle
+import hashlib
+import tempfile
+
+from server.core.database import APP_DATA_DIR
+
+TAG = "Artifact"
+
+ARTIFACT_DIR = os.path.join(APP_DATA_DIR, "artifacts")
+
+# 超过该大小 (字节) 的变量写入文件，内存和日志中只保留引用
+SPILL_THRESHOLD = 64 * 1024
+PREVIEW_LENGTH = 120
+
+# 运行数据中对文件的引用: artifact 的 sha256 摘要，以及 uploads 目录中的文件 (完整路径或 /file/ 链接)
+DIGEST = re.compile(r"[0-9a-f]{64}")
+UPLOAD_NAME = re.compile(r"(?:uploads[\\/]+|/file/)([^\s\\/\"'<>|?*:,;]+)")
+
+
+class ArtifactRef:
+    """
+    大变量的引用: 内容按 sha256 存放在 artifacts 目录，读取时才加载
+    """
+    __slots__ = ("digest", "kind", "size", "preview")
+
+    def __init__(self, digest, kind, size, preview):
+        self.digest = digest
+        self.kind = kind
+        self.size = size
+        self.preview = preview
+
+    @property
+    def path(self):
+        return os.path.join(ARTIFACT_DIR, self.digest[:2], self.digest)
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            payload = f.read()
+        if self.kind == "text":
+            return payload.decode("utf-8")
+        if self.kind == "bytes":
+            return payload
+        return pickle.loads(payload)
+
+    def to_dict(self):
+        return {"artifact": self.digest, "kind": self.kind, "size": self.size, "preview": self.preview}
+
+    def __repr__(self):
+        return f"<artifact {self.digest[:12]} {self.kind} {self.size}B: {self.preview}>"
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return "text", value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray)):
+        return "bytes", bytes(value)
+    if isinstance(value, (list, tuple, dict)):
+        try:
+            return "pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None, None  # 含不可序列化对象时保留在内存中
+    return None, None
+
+
+def preview(value, length=PREVIEW_LENGTH):
+    if isinstance(value, ArtifactRef):
+        return repr(value)
+    text = str(value)
+    if len(text) <= length:
+        return text
+    return f"{text[:length]}...({len(text)} chars)"
+
+
+def spill(value, threshold=SPILL_THRESHOLD):
+    """
+    大于阈值的字符串/字节/容器写入文件并返回 ArtifactRef，其它值原样返回
+    """
+    if isinstance(value, str) and len(value) < threshold // 4:
+        return value  # 短字符串不必编码
+    kind, payload = _encode(value)
+    if payload is None or len(payload) < threshold:
+        return value
+    digest = hashlib.sha256(payload).hexdigest()
+    ref = ArtifactRef(digest, kind, len(payload), preview(value))
+    if os.path.exists(ref.path):
+        # 内容相同的文件已存在时刷新修改时间，清理按修改时间计算保留期 (见 maintenance_service)
+        try:
+            os.utime(ref.path)
+            return ref
+        except FileNotFoundError:
+            pass  # 刚好被清理，重新写入
+    os.makedirs(os.path.dirname(ref.path), exist_ok=True)
+    # 先写临时文件再改名，并发写入同一内容时也不会读到半个文件；临时文件名各线程唯一
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(ref.path), prefix=f"{digest}.", suffix=".tmp",
+                                     delete=False) as f:
+        f.write(payload)
+    try:
+        os.replace(f.name, ref.path)
+    except OSError:
+        os.remove(f.name)
+        raise
+    return ref
+
+
+def materialize(value):
+    return value.load() if isinstance(value, ArtifactRef) else value
+
+
+def references(value, found=None) -> dict:
+    """
+    变量、结果摘要或日志中引用的文件: { artifact 摘要或上传文件名: "artifact" / "upload" }
+    """
+    found = {} if found is None else found
+    if isinstance(value, ArtifactRef):
+        found[value.digest] = "artifact"
+    elif isinstance(value, str):
+        if len(value) >= 64:
+            for digest in DIGEST.findall(value):
+                found[digest] = "artifact"
+        if "uploads" in value or "/file/" in value:
+            for name in UPLOAD_NAME.findall(value):
+                # 句末的标点不属于文件名
+                found.setdefault(name.rstrip("."), "upload")
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            references(key, found)
+            references(item, found)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            references(item, found)
+    return found
+
@@ -0,0 +1,180 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import re
+import json
+
+from ability.core.expression import Expression, ExpressionError, compile_text
+from script.log import SLog
+
+TAG = "Binding"
+
+# 编译清洗规则，匹配各种零宽字符
+_INVISIBLE_CHARS_PATTERN = re.compile(r'[\u200b-\u200d\ufeff]')
+
+
+def clean_invisible_chars(data):
+    """递归清洗字符串中的不可见字符"""
+    if isinstance(data, str):
+        return _INVISIBLE_CHARS_PATTERN.sub('', data)
+    elif isinstance(data, list):
+        # 如果是列表（如 locator_chain），对内部每个元素进行处理
+        return [clean_invisible_chars(item) for item in data]
+    elif isinstance(data, dict):
+        # 如果是字典（如 locator 节点），清洗所有的值
+        return {k: clean_invisible_chars(v) for k, v in data.items()}
+    return data
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("true", "1", "yes", "on"):
+            return True
+        if value in ("false", "0", "no", "off", ""):
+            return False
+        raise ValueError(f"not a bool: {value}")
+    return bool(value)
+
+
+def _to_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str) and value.strip().startswith("["):
+        return json.loads(value)
+    raise ValueError(f"not a list: {value}")
+
+
+# META 中 inputs 声明的类型 -> 转换函数，其它类型保持原值
+COERCE = {
+    "int": int,
+    "float": float,
+    "bool": _to_bool,
+    "boolean": _to_bool,
+    "list": _to_list,
+}
+
+
+def coerce(value, type_name):
+    """
+    按声明类型转换，失败或未设置时返回原值
+    """
+    convert = COERCE.get(type_name)
+    if convert is None or value is None or value == "" or value is False:
+        return value
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class Literal:
+    """
+    常量参数: 编译时已完成清洗和类型转换
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def resolve(self, memory):
+        return self.value
+
+    def refs(self):
+        return ()
+
+
+class Ref:
+    """
+    整个值是一个表达式 {{node_id.var...}}: 结果保留原始类型
+    """
+    __slots__ = ("expression", "type_name")
+
+    def __init__(self, expression: Expression, type_name=None):
+        self.expression = expression
+        self.type_name = type_name
+
+    def resolve(self, memory):
+        return coerce(self.expression.evaluate(memory.lookup), self.type_name)
+
+    def refs(self):
+        return (self.expression,)
+
+
+class Text:
+    """
+    文本中嵌入表达式: 结果为拼接后的字符串
+    """
+    __slots__ = ("template", "type_name")
+
+    def __init__(self, template, type_name=None):
+        self.template = template
+        self.type_name = type_name
+
+    def resolve(self, memory):
+        return coerce(self.template.evaluate(memory.lookup), self.type_name)
+
+    def refs(self):
+        return tuple(self.template.expressions)
+
+
+class Struct:
+    """
+    内部包含变量引用的列表/字典，执行时逐项解析
+    """
+    __slots__ = ("items", "is_dict")
+
+    def __init__(self, items, is_dict):
+        self.items = items
+        self.is_dict = is_dict
+
+    def resolve(self, memory):
+        if self.is_dict:
+            return {key: item.resolve(memory) for key, item in self.items}
+        return [item.resolve(memory) for item in self.items]
+
+    def refs(self):
+        return tuple(ref for _, item in self.items for ref in item.refs()) if self.is_dict \
+            else tuple(ref for item in self.items for ref in item.refs())
+
+
+def compile_value(value, type_name=None):
+    """
+    把节点 data 中的一个参数编译为 Literal / Ref / Text / Struct
+    """
+    value = clean_invisible_chars(value)
+    return _compile(value, type_name)
+
+
+def _compile(value, type_name=None):
+    if isinstance(value, str):
+        try:
+            compiled = compile_text(value)
+        except ExpressionError as e:
+            # 无法解析的 {{ }} 按原文传递 (如 JSON 文本)，其余表达式照常解析
+            SLog.w(TAG, f"Unparsable expression kept as text [{value}]: {e}")
+            compiled = compile_text(value, strict=False)
+        if isinstance(compiled, Expression):
+            return Ref(compiled, type_name)
+        if compiled is not None:
+            return Text(compiled, type_name)
+        return Literal(coerce(value, type_name))
+    if isinstance(value, dict):
+        items = [(key, _compile(item)) for key, item in value.items()]
+        if any(not isinstance(item, Literal) for _, item in items):
+            return Struct(items, True)
+    elif isinstance(value, list):
+        items = [_compile(item) for item in value]
+        if any(not isinstance(item, Literal) for item in items):
+            return Struct(items, False)
+    return Literal(coerce(value, type_name))
+
+
+def compile_bindings(data, meta=None):
+    """
+    编译节点的全部参数，类型取自组件 META 的 inputs
+    """
+    if not isinstance(data, dict):
+        return {}
+    types = {item.get("name"): item.get("type") for item in (meta or {}).get("inputs", []) if isinstance(item, dict)}
+    return {name: compile_value(value, types.get(name)) for name, value in data.items()}
+
@@ -1,12 +1,27 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
-from script.singleton_meta import SingletonMeta
+from ability.core.screen_state import ScreenState
 TAG = "BaseEngine"
 
 
-class BaseEngine(metaclass=SingletonMeta):
-    def __init__(self):
+class BaseEngine:
+    """
+    引擎实例由 ability.core.engine_registry 按 (类别, 设备) 创建和复用，不要直接实例化
+    """
+    # 支持预取的界面状态，需要同时实现 capture(kind)
+    PREFETCH = ()
+
+    def __init__(self, target=None):
         self.driver = None
+        # 设备序列号 / 浏览器配置目录，None 为默认设备
+        self.target = target
+        self.screen = ScreenState()
+
+    def healthy(self):
+        """
+        已启动的引擎是否仍可用，失效时由注册表下线并在下次使用时重新初始化
+        """
+        return True
 
     def init_driver(self):
         ...
@@ -0,0 +1,136 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import threading
+import contextvars
+
+from script.log import SLog
+import ability.common.platform as platform_code
+
+TAG = "EngineRegistry"
+
+# 当前运行默认使用的设备 (Android 序列号 / 浏览器配置目录)，节点 data["device"] 可覆盖
+current_device = contextvars.ContextVar("current_device", default=None)
+
+
+def family_of(platform):
+    """
+    引擎类别: 同一类别同一设备共用一个引擎
+    """
+    if platform in platform_code.MMOBILE:
+        return platform_code.MOBILE
+    if platform in platform_code.MWEB:
+        return platform_code.WEB
+    if platform in platform_code.MPC:
+        return platform_code.PC
+    return None
+
+
+def target_of(info):
+    """
+    节点使用的设备: data["device"] 优先，否则为当前运行的设备
+    """
+    data = getattr(info, "data", None)
+    if isinstance(data, dict) and data.get("device"):
+        return str(data["device"]).strip()
+    return current_device.get()
+
+
+def _create(platform, target):
+    if platform in platform_code.MMOBILE:
+        if platform == platform_code.IOS:
+            from ability.engine.mobile.mIOS import IOSEngine
+            return IOSEngine(target)
+        from ability.engine.mobile.mAndroidADB import AndroidADBEngine
+        return AndroidADBEngine(target)
+    if platform in platform_code.MWEB:
+        from ability.engine.web.mChrome import ChromeEngine
+        return ChromeEngine(target)
+    if platform == platform_code.MACOS:
+        from ability.engine.pc.mMac import MacEngine
+        return MacEngine(target)
+    if platform == platform_code.WINDOWS:
+        from ability.engine.pc.mWindows import WindowsEngine
+        return WindowsEngine(target)
+    return None
+
+
+class EngineRegistry:
+    """
+    按 (引擎类别, 设备) 管理引擎实例
+
+    - 首次使用时创建，start 由调用方负责
+    - 已启动的引擎每隔 health_interval 秒检查一次，失效时下线，下次 start 重新初始化
+    - 超过 idle_timeout 秒未使用的引擎在 sweep 时下线并移除
+    """
+
+    def __init__(self, idle_timeout=600, health_interval=30):
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def get(self, platform, target=None, create=True):
+        family = family_of(platform)
+        if family is None:
+            return None
+        key = (family, target or None)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._engines.get(key)
+            if entry is None:
+                if not create:
+                    return None
+                engine = _create(platform, key[1])
+                if engine is None:
+                    return None
+                entry = self._engines[key] = {"engine": engine, "used": now, "checked": now}
+                SLog.i(TAG, f"Engine created: {type(engine).__name__} {key}")
+            entry["used"] = now
+            check = entry["engine"].driver is not None and now - entry["checked"] > self.health_interval
+            if check:
+                entry["checked"] = now
+        engine = entry["engine"]
+        if check and not self._healthy(engine):
+            SLog.w(TAG, f"Engine unhealthy, restart on next use: {type(engine).__name__} {key}")
+            self._close(engine)
+            engine.driver = None
+        return engine
+
+    @staticmethod
+    def _healthy(engine):
+        try:
+            return engine.healthy()
+        except Exception as e:
+            SLog.w(TAG, f"Health check failed: {e}")
+            return False
+
+    @staticmethod
+    def _close(engine):
+        try:
+            if engine.driver is not None:
+                engine.end()
+        except Exception as e:
+            SLog.w(TAG, f"Engine end failed: {e}")
+
+    def sweep(self):
+        """
+        下线空闲超时的引擎，在两次运行之间调用，运行中不会移除正在使用的引擎
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._engines.items() if now - entry["used"] > self.idle_timeout]
+            engines = [(key, self._engines.pop(key)["engine"]) for key in expired]
+        for key, engine in engines:
+            SLog.i(TAG, f"Engine idle timeout: {type(engine).__name__} {key}")
+            self._close(engine)
+
+    def close_all(self):
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for entry in engines:
+            self._close(entry["engine"])
+
+
+engine_registry = EngineRegistry()
@@ -0,0 +1,281 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+"""
+{{ }} 中的表达式:
+
+    {{node_id.var}}                         取变量
+    {{node_id.var.key[0]['name']}}          路径: 字段、下标、字符串键
+    {{node_id.var[1:3]}}                    切片
+    {{node_id.var | first | upper}}         过滤器
+    {{node_id.var | default:'none'}}        带参数的过滤器
+    {{$row.field}}                          运行级变量 (如数据集运行中的当前行)
+    登录用户 {{a.name}}，共 {{b.items | length}} 条   文本插值
+
+表达式编译为步骤元组并缓存，循环中重复求值不会重复解析
+"""
+import re
+import json
+from functools import lru_cache
+
+from script.log import SLog
+
+TAG = "Expression"
+
+_EXPRESSION_PATTERN = re.compile(r'\{\{([^{}]+)\}\}')
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?(?![\w\-]))
+  | (?P<name>\$?\w[\w\-]*)
+  | (?P<op>[.\[\]:|])
+""", re.VERBOSE)
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN_PATTERN.match(text, pos)
+        if match is None:
+            raise ExpressionError(f"Unexpected character {text[pos]!r} at {pos} in {text!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == "ws":
+            continue
+        value = match.group()
+        if kind == "string":
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        tokens.append((kind, value))
+    return tokens
+
+
+def _filter_default(value, fallback=None):
+    return fallback if value is None or value == "" else value
+
+
+def _where(value, key, expected=None):
+    items = value or []
+    if expected is None:
+        return [item for item in items if _step_key(item, key, None)]
+    return [item for item in items if _step_key(item, key, None) == expected]
+
+
+FILTERS = {
+    "length": lambda value: len(value) if value is not None else 0,
+    "first": lambda value: value[0] if value else None,
+    "last": lambda value: value[-1] if value else None,
+    "upper": lambda value: str(value).upper(),
+    "lower": lambda value: str(value).lower(),
+    "strip": lambda value: str(value).strip(),
+    "int": lambda value: int(float(value)),
+    "float": float,
+    "str": str,
+    "json": lambda value: json.dumps(value, ensure_ascii=False, default=str),
+    "keys": lambda value: list(value.keys()),
+    "values": lambda value: list(value.values()),
+    "default": _filter_default,
+    "join": lambda value, sep=",": sep.join(str(item) for item in value),
+    "split": lambda value, sep=",": str(value).split(sep),
+    "replace": lambda value, old, new="": str(value).replace(old, new),
+    "round": lambda value, digits=0: round(float(value), int(digits)),
+    # 列表过滤: where:'text':'登录' 保留 text 等于 '登录' 的项；map:'text' 取出每项的 text
+    "where": _where,
+    "map": lambda value, key: [_step_key(item, key, None) for item in value or []],
+}
+
+
+def _step_key(value, key, default=None):
+    if isinstance(value, dict):
+        return value.get(key, default)
+    if isinstance(value, (list, tuple)) and isinstance(key, int):
+        return value[key] if -len(value) <= key < len(value) else default
+    return getattr(value, key, default)
+
+
+class Expression:
+    """
+    编译后的表达式: 节点 id、变量名，之后是路径步骤和过滤器
+    """
+    __slots__ = ("text", "node_id", "var_name", "steps", "filters")
+
+    def __init__(self, text, node_id, var_name, steps, filters):
+        self.text = text
+        self.node_id = node_id
+        self.var_name = var_name
+        self.steps = steps
+        self.filters = filters
+
+    def evaluate(self, lookup):
+        """
+        lookup(node_id, var_name) 负责取出变量，路径不存在时返回 None
+        """
+        value = lookup(self.node_id, self.var_name)
+        for kind, arg in self.steps:
+            if value is None:
+                return None
+            if kind == "key":
+                value = _step_key(value, arg)
+            else:
+                try:
+                    value = value[arg]
+                except (TypeError, KeyError, IndexError):
+                    return None
+        for name, args in self.filters:
+            try:
+                value = FILTERS[name](value, *args)
+            except (TypeError, ValueError, AttributeError) as e:
+                SLog.w(TAG, f"Filter [{name}] failed in {{{{{self.text}}}}}: {e}")
+                return None
+        return value
+
+
+class Template:
+    """
+    文本插值: 字面文本与表达式交替拼接
+    """
+    __slots__ = ("parts",)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    @property
+    def expressions(self):
+        return [part for part in self.parts if isinstance(part, Expression)]
+
+    def evaluate(self, lookup):
+        return "".join(part if isinstance(part, str) else _to_text(part.evaluate(lookup)) for part in self.parts)
+
+
+def _to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+class _Parser:
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self, op=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if op is not None and token != ("op", op):
+            return None
+        return token
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token is None or (kind and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind or "token"
+            raise ExpressionError(f"Expected {expected} at token {self.pos} in {self.text!r}")
+        self.pos += 1
+        return token[1]
+
+    def parse(self):
+        node_id = self.take("name")
+        self.take("op", ".")
+        var_name = self.take("name")
+        steps = []
+        while self.peek("[") or self.peek("."):
+            if self.peek("."):
+                self.pos += 1
+                token = self.peek()
+                if token and token[0] == "number" and isinstance(token[1], int):
+                    steps.append(("index", self.take("number")))  # a.list.0 等价于 a.list[0]
+                else:
+                    steps.append(("key", self.take("name")))
+            else:
+                self.pos += 1
+                steps.append(self._subscript())
+                self.take("op", "]")
+        filters = []
+        while self.peek("|"):
+            self.pos += 1
+            name = self.take("name")
+            if name not in FILTERS:
+                raise ExpressionError(f"Unknown filter [{name}] in {self.text!r}")
+            args = []
+            while self.peek(":"):
+                self.pos += 1
+                args.append(self._literal())
+            filters.append((name, tuple(args)))
+        if self.peek() is not None:
+            raise ExpressionError(f"Unexpected {self.peek()[1]!r} in {self.text!r}")
+        return Expression(self.text, node_id, var_name, tuple(steps), tuple(filters))
+
+    def _subscript(self):
+        start = stop = None
+        token = self.peek()
+        if token and token[0] in ("string", "number"):
+            value = self.take()
+            if not self.peek(":"):
+                return ("index", value)
+            start = value
+        if self.peek(":"):
+            self.pos += 1
+            if not self.peek("]"):
+                stop = self.take("number")
+            return ("index", slice(start, stop))
+        raise ExpressionError(f"Invalid subscript in {self.text!r}")
+
+    def _literal(self):
+        token = self.peek()
+        if token is None or token[0] not in ("string", "number", "name"):
+            raise ExpressionError(f"Expected filter argument in {self.text!r}")
+        self.pos += 1
+        return token[1]
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(text: str) -> Expression:
+    """
+    编译 {{ }} 内部的表达式 (不含花括号)，结果缓存
+    """
+    return _Parser(text.strip()).parse()
+
+
+@lru_cache(maxsize=1024)
+def compile_text(text: str, strict=True):
+    """
+    编译参数字符串: 整体是一个 {{ }} 返回 Expression (保留原始类型)，
+    混合文本返回 Template (结果为字符串)，不含表达式返回 None
+    strict 为 False 时无法解析的 {{ }} (如 JSON 文本) 作为普通文本保留，不抛出 ExpressionError
+    """
+    stripped = text.strip()
+    match = _EXPRESSION_PATTERN.fullmatch(stripped)
+    if match:
+        try:
+            return compile_expression(match.group(1))
+        except ExpressionError:
+            if strict:
+                raise
+            return None
+    if "{{" not in text:
+        return None
+    parts, pos = [], 0
+    for match in _EXPRESSION_PATTERN.finditer(text):
+        try:
+            expression = compile_expression(match.group(1))
+        except ExpressionError:
+            if strict:
+                raise
+            continue
+        if match.start() > pos:
+            parts.append(text[pos:match.start()])
+        parts.append(expression)
+        pos = match.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+    return Template(parts) if any(not isinstance(part, str) for part in parts) else None
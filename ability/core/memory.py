@@ -1,16 +1,145 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
-import requests
-import re
+import threading
+import contextvars
+from collections import OrderedDict
+
 from script.singleton_meta import SingletonMeta
-from script.log import SLog
+from script.log import SLog, current_run_id
+from script.mTask import emit
+from ability.core.artifact import spill, materialize, preview
+from ability.core.expression import ExpressionError, compile_text, compile_expression
 
 TAG: str = "Memory"
 
+# 不在任务中执行 (如单节点调试接口) 时使用的作用域
+DEFAULT_SCOPE = "_default"
+
+# 运行级变量使用 "$" 开头的伪节点 id，例如数据集运行的当前行 {{$row.field}}
+ROW_SCOPE = "$row"
+# 子工作流调用 (cfs/call) 的入参 {{$args.name}}
+ARGS_SCOPE = "$args"
+
+# 子工作流在独立作用域中执行，变量不与调用方的节点混在一起；为 None 时使用 run_id
+current_scope = contextvars.ContextVar("current_scope", default=None)
+
+
+class RunStore:
+    """
+    单次运行的变量存储: { node_id: { var_name: var_value, ... } }
+    变量总数超过 max_vars 时淘汰最久未写入的节点
+    """
+
+    def __init__(self, run_id, max_vars=10000):
+        self.run_id = run_id
+        self.max_vars = max_vars
+        self.count = 0
+        self._nodes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set(self, node_id, var_name, var_value):
+        with self._lock:
+            node_vars = self._nodes.get(node_id)
+            if node_vars is None:
+                node_vars = self._nodes[node_id] = {}
+            else:
+                self._nodes.move_to_end(node_id)
+            if var_name not in node_vars:
+                self.count += 1
+            node_vars[var_name] = var_value
+            while self.count > self.max_vars and len(self._nodes) > 1:
+                evicted, values = self._nodes.popitem(last=False)
+                self.count -= len(values)
+                SLog.w(TAG, f"Run [{self.run_id}] store full, evict node [{evicted}]")
+
+    def get(self, node_id, var_name, default=None):
+        with self._lock:
+            return self._nodes.get(node_id, {}).get(var_name, default)
+
+    def has_node(self, node_id):
+        with self._lock:
+            return node_id in self._nodes
+
+    def get_all_from_node(self, node_id):
+        with self._lock:
+            return dict(self._nodes.get(node_id, {}))
+
+    def snapshot(self):
+        with self._lock:
+            return {node_id: dict(values) for node_id, values in self._nodes.items()}
+
 
 class Memory(metaclass=SingletonMeta):
-    # 数据结构变更: { node_id: { var_name: var_value, ... } }
-    mDict = {}
+    """
+    变量存储入口: 按 run_id (contextvar) 隔离，每次运行一个 RunStore，运行结束时 release 释放
+    子工作流的作用域为 "<run_id>/<节点>#<序号>"，计入所属运行，调用结束时释放，最迟随所属运行一起释放
+    同一运行内的并行分支写入各自节点，RunStore 加锁保证并发安全
+    """
+    # 同时保留的运行数上限 (子工作流的作用域不计数)，防止未释放的运行无限累积
+    MAX_RUNS = 16
+
+    def __init__(self):
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(run_id=None):
+        return run_id or current_scope.get() or current_run_id.get() or DEFAULT_SCOPE
+
+    def store(self, run_id=None) -> RunStore:
+        """
+        获取当前运行的变量存储，不存在时创建
+        """
+        scope = self._scope(run_id)
+        root = scope.partition("/")[0]
+        with self._lock:
+            # 子工作流作用域的访问同样算作所属运行的访问
+            if root != scope and root in self._runs:
+                self._runs.move_to_end(root)
+            store = self._runs.get(scope)
+            if store is not None:
+                self._runs.move_to_end(scope)
+            else:
+                store = self._runs[scope] = RunStore(scope)
+                self._evict({root, self._scope().partition("/")[0]})
+            return store
+
+    def _evict(self, active):
+        """
+        运行数超过 MAX_RUNS 时释放最久未访问的运行 (连同其子工作流作用域)
+        active: 正在访问的运行 (新作用域所属的运行、当前上下文的运行)，不会被释放
+        """
+        roots = [key for key in self._runs if "/" not in key]
+        excess = len(roots) - self.MAX_RUNS
+        for key in roots:
+            if excess <= 0:
+                break
+            if key in active:
+                continue
+            self._drop(key)
+            excess -= 1
+            SLog.w(TAG, f"Too many runs in memory, release [{key}]")
+
+    def _drop(self, scope):
+        self._runs.pop(scope, None)
+        for child in [key for key in self._runs if key.startswith(f"{scope}/")]:
+            del self._runs[child]
+
+    def release(self, run_id=None):
+        """
+        运行结束，释放该运行的全部变量
+        """
+        scope = self._scope(run_id)
+        with self._lock:
+            self._drop(scope)
+
+    def snapshot(self, run_id=None) -> dict:
+        """
+        调试用: 返回运行内全部变量的拷贝，大变量保持为 ArtifactRef
+        """
+        with self._lock:
+            store = self._runs.get(self._scope(run_id))
+        return store.snapshot() if store else {}
 
     def set(self, info, var_name: str, var_value: any):
         """
@@ -20,34 +149,20 @@ class Memory(metaclass=SingletonMeta):
         :param var_value: 变量值
         """
         node_id = info.id
+        # 大变量 (DOM、OCR 结果等) 写入 artifact 文件，内存和日志中只保留引用
+        var_value = spill(var_value)
+        self.store().set(node_id, var_name, var_value)
 
-        # 如果该节点还没有任何数据，先初始化一个空字典
-        if node_id not in self.mDict:
-            self.mDict[node_id] = {}
-
-        # 存入/更新变量
-        self.mDict[node_id][var_name] = var_value
-
-        SLog.i(TAG, f"Node [{node_id}] set variable [{var_name}] = [{var_value}]")
-        self._broadcast(node_id, var_name, var_value)
+        shown = preview(var_value)
+        SLog.i(TAG, f"Node [{node_id}] set variable [{var_name}] = [{shown}]")
+        self._broadcast(node_id, var_name, shown)
 
     @staticmethod
     def _broadcast(node_id, var_name, var_value):
-        try:
-            data = {
-                "type": "memory_update",
-                "content": {
-                    "node_id": node_id,
-                    "var_name": var_name,
-                    "var_value": var_value
-                }
-            }
-            # 发送 HTTP 请求给主进程 (假设运行在本地 8000 端口)
-            # timeout 设置短一点(0.2s)，避免因为网络问题阻塞脚本执行
-            # requests.post("http://127.0.0.1:8000/ws/internal/broadcast", json=data, timeout=0.2)
-        except Exception as e:
-            # 广播失败属于非关键错误，记录警告即可，不要抛出异常中断流程
-            SLog.w(TAG, f"WebSocket broadcast warning: {e}")
+        """
+        变量更新事件: 常驻进程中经事件总线推送给订阅该运行的 WebSocket 客户端 (见 driver.agent.events)
+        """
+        emit("memory_update", node_id=node_id, var_name=var_name, var_value=var_value)
 
     def get(self, node_var_name: str) -> any:
         """
@@ -58,20 +173,33 @@ class Memory(metaclass=SingletonMeta):
         if not node_var_name or not isinstance(node_var_name, str):
             return None
 
-        pattern = r'\{\{([^{}]+)\}\}'
-        if re.match(pattern, node_var_name):
-            node_var_name = node_var_name[2:-2].strip()
+        # 支持 "{{node.var[0].text | upper}}"、文本插值以及不带花括号的 "node.var"
+        try:
+            if "{{" in node_var_name:
+                compiled = compile_text(node_var_name)
+            else:
+                compiled = compile_expression(node_var_name)
+        except ExpressionError as e:
+            SLog.w(TAG, f"Invalid expression [{node_var_name}]: {e}")
+            return None
+        return compiled.evaluate(self.lookup)
 
-        node_id, var_name = node_var_name.split(".")
+    def lookup(self, node_id: str, var_name: str) -> any:
+        """
+        按节点和变量名获取变量 (编译后的参数绑定直接调用)
+        """
+        store = self.store()
         # 1. 检查节点是否存在
-        if node_id not in self.mDict:
+        if not store.has_node(node_id):
             SLog.w(TAG, f"Node [{node_id}] not found in store.")
             return None
 
         # 2. 检查该节点下是否有该变量
-        node_vars = self.mDict[node_id]
-        if var_name in node_vars:
-            return node_vars[var_name]
+        missing = object()
+        value = store.get(node_id, var_name, missing)
+        if value is not missing:
+            # 引用在下游真正读取时才加载
+            return materialize(value)
         else:
             SLog.w(TAG, f"Variable [{var_name}] not found in Node [{node_id}]. Returning None.")
             return None
@@ -80,7 +208,7 @@ class Memory(metaclass=SingletonMeta):
         """
         获取某节点下的所有变量 (辅助方法)
         """
-        return self.mDict.get(node_id, {})
+        return {key: materialize(value) for key, value in self.store().get_all_from_node(node_id).items()}
 
     def update(self, info, var_name: str, var_value: any):
         """
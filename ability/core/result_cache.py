@@ -0,0 +1,231 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+from script.log import SLog
+from script.mPath import get_final_path
+from server.core.database import APP_DATA_DIR
+from ability.core.artifact import ArtifactRef
+
+TAG = "ResultCache"
+
+CACHE_DIR = os.path.join(APP_DATA_DIR, "cache", "results")
+
+# 节点 data 中控制缓存的参数，不参与缓存键
+CACHE_PARAMS = ("cache", "cache_ttl")
+
+
+class ResultCache:
+    """
+    跨运行的节点结果缓存: 键为 (组件地址, 解析后的输入, 引用文件的内容哈希)
+    每条记录一个文件，按 TTL 过期，超过 capacity 时淘汰最久未使用的记录
+    """
+
+    def __init__(self, root=CACHE_DIR, capacity=1000, ttl=24 * 3600):
+        self.root = root
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._file_hashes = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.pkl")
+
+    def _load_index(self):
+        # 首次使用时扫描磁盘，按最近使用时间排序
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.root):
+            for folder in os.scandir(self.root):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".pkl"):
+                        entries.append((entry.stat().st_mtime, entry.name[:-4]))
+        self._index = OrderedDict((key, None) for _, key in sorted(entries))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                record = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            record = None
+        if record is not None and record["expires_at"] < time.time():
+            self._remove(key)
+            record = None
+        if record is not None and not all(os.path.exists(value.path) for value in record["outputs"].values()
+                                          if isinstance(value, ArtifactRef)):
+            record = None  # 引用的 artifact 已被清理
+        with self._lock:
+            if record is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._load_index()
+            self._index[key] = None
+            self._index.move_to_end(key)
+        os.utime(path)
+        return record
+
+    def put(self, key, outputs, result, ttl=None):
+        record = {
+            "outputs": outputs,
+            "result": result,
+            "expires_at": time.time() + (ttl if ttl is not None else self.ttl),
+        }
+        path = self._path(key)
+        try:
+            payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            SLog.w(TAG, f"Result not cacheable: {e}")
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        with self._lock:
+            self._load_index()
+            self._index[key] = None
+            self._index.move_to_end(key)
+            evicted = []
+            while len(self._index) > self.capacity:
+                evicted.append(self._index.popitem(last=False)[0])
+        for old in evicted:
+            self._remove(old)
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None:
+                self._index.pop(key, None)
+
+    def file_hash(self, path):
+        """
+        文件内容哈希，按 (路径, 修改时间, 大小) 缓存，未变化的文件不重复计算
+        """
+        stat = os.stat(path)
+        marker = (path, stat.st_mtime_ns, stat.st_size)
+        digest = self._file_hashes.get(marker)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            if len(self._file_hashes) > 4096:
+                self._file_hashes.clear()
+            self._file_hashes[marker] = digest
+        return digest
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._index = OrderedDict()
+        if os.path.isdir(self.root):
+            for folder in os.scandir(self.root):
+                if folder.is_dir():
+                    for entry in os.scandir(folder.path):
+                        os.remove(entry.path)
+
+
+result_cache = ResultCache()
+
+
+def _policy(component):
+    """
+    节点 data["cache"] 优先，未设置时使用组件类的 CACHEABLE 默认值
+    """
+    data = component.info.data if isinstance(component.info.data, dict) else {}
+    enabled = data.get("cache")
+    if enabled is None:
+        enabled = getattr(component, "CACHEABLE", False)
+    if isinstance(enabled, str):
+        enabled = enabled.strip().lower() in ("true", "1", "yes")
+    if not enabled:
+        return None
+    ttl = data.get("cache_ttl")
+    return {"ttl": float(ttl) if ttl not in (None, "") else None}
+
+
+def _inputs(component):
+    info = component.info
+    bindings = getattr(info, "bindings", None)
+    if bindings is not None:
+        return {name: binding.resolve(component.memory) for name, binding in bindings.items() if name not in CACHE_PARAMS}
+    data = info.data if isinstance(info.data, dict) else {}
+    return {name: component.get_param_value(name) for name in data if name not in CACHE_PARAMS}
+
+
+def _file_digests(inputs):
+    # 输入中引用的本地文件 (绝对路径或上传目录下的文件名) 按内容参与缓存键
+    digests = {}
+    for name, value in inputs.items():
+        if not isinstance(value, str) or not value or len(value) > 1024:
+            continue
+        path = get_final_path(value)
+        if os.path.isfile(path):
+            digests[name] = result_cache.file_hash(path)
+    return digests
+
+
+def cache_key(component):
+    inputs = _inputs(component)
+    material = {
+        "address": component.info.nodeCode,
+        "component": f"{type(component).__module__}.{type(component).__qualname__}",
+        "inputs": inputs,
+        "files": _file_digests(inputs),
+        # 下游引用的输出不同 (如是否需要 OCR 标注图) 时结果不同
+        "wanted": sorted(component.info.wanted) if getattr(component.info, "wanted", None) is not None else None,
+    }
+    text = json.dumps(material, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cached_execute(component):
+    """
+    执行组件；启用缓存时命中则回放输出变量和返回值，未命中则执行后写入缓存
+    """
+    if getattr(component, "info", None) is None or getattr(component, "memory", None) is None:
+        return component.execute()
+    policy = _policy(component)
+    if policy is None:
+        return component.execute()
+    try:
+        key = cache_key(component)
+    except Exception as e:
+        SLog.w(TAG, f"Node [{component.info.id}] cache key failed: {e}")
+        return component.execute()
+
+    store = component.memory.store()
+    node_id = component.info.id
+    record = result_cache.get(key)
+    if record is not None:
+        for name, value in record["outputs"].items():
+            store.set(node_id, name, value)
+        component.result.success("cached")
+        SLog.i(TAG, f"Node [{node_id}] cache hit {key[:12]}")
+        return record["result"]
+
+    result = component.execute()
+    if not component.result.is_failed():
+        result_cache.put(key, store.get_all_from_node(node_id), result, policy["ttl"])
+    return result
@@ -0,0 +1,99 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from script.log import SLog
+
+TAG = "ScreenState"
+
+
+class ScreenState:
+    """
+    引擎的当前界面状态 (截图、布局)
+
+    - 每次输入动作后 invalidate，版本号递增，旧版本的采集结果直接丢弃
+    - prefetch 在后台采集，下一个节点读取时如仍是同一版本且未过期则直接使用
+    - 预取结果只交给第一个读取者，之后的读取 (如 wait 组件轮询) 重新采集
+    """
+
+    def __init__(self, max_age=3.0):
+        self.max_age = max_age
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._pending.clear()
+
+    def put(self, kind, value, version=None):
+        with self._lock:
+            if version is None or version == self.version:
+                self._entries[kind] = (self.version, time.monotonic(), value)
+
+    def refresh(self, kind, capture):
+        """
+        立即采集并保存 (如节奏控制判断界面稳定时的截图)，返回采集结果
+        """
+        version = self.version
+        value = capture(kind)
+        if value is not None:
+            self.put(kind, value, version)
+        return value
+
+    def prefetch(self, kinds, capture):
+        """
+        后台采集当前版本的界面状态
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-prefetch")
+            version = self.version
+            for kind in kinds:
+                if kind in self._entries or kind in self._pending:
+                    continue
+                self._pending[kind] = (version, self._executor.submit(self._capture, kind, capture, version))
+
+    def _capture(self, kind, capture, version):
+        try:
+            value = capture(kind)
+        except Exception as e:
+            SLog.w(TAG, f"Prefetch [{kind}] failed: {e}")
+            value = None
+        with self._lock:
+            pending = self._pending.get(kind)
+            if pending is not None and pending[0] == version:
+                del self._pending[kind]
+            if value is not None and version == self.version:
+                self._entries[kind] = (version, time.monotonic(), value)
+        return value
+
+    def get(self, kind, capture):
+        """
+        读取界面状态: 优先使用同版本且未过期的预取结果，否则重新采集
+        """
+        with self._lock:
+            entry = self._entries.pop(kind, None)
+            pending = self._pending.get(kind)
+            version = self.version
+        if entry is not None and entry[0] == version and time.monotonic() - entry[1] <= self.max_age:
+            self.hits += 1
+            return entry[2]
+        if pending is not None and pending[0] == version:
+            # 预取正在进行，等待结果而不是重复采集
+            value = pending[1].result()
+            with self._lock:
+                entry = self._entries.pop(kind, None)
+            if value is not None and entry is not None and entry[0] == version:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return capture(kind)
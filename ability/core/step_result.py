@@ -38,6 +38,10 @@ class StepResult:
     def is_success(self):
         return self._success
 
+    def is_failed(self):
+        # 组件显式调用过 fail()
+        return self.end_timestamp is not None and not self._success
+
     def result_data(self, data):
         self._data = data
 
@@ -57,7 +57,7 @@ class AndroidEngine(BaseEngine):
                 current = current[index]
             child = True
 
-        SLog.d(TAG, "Building chain for condition '{}'".format(current))
+        SLog.d(TAG, "Building chain for condition '%s'", current)
         return current
 
     def end(self):
@@ -15,29 +15,56 @@ from ability.core.engine import BaseEngine
 TAG = 'AndroidADBEngine'
 
 
+def get_adb_path():
+    """动态获取集成的 ADB 路径"""
+    # 判断是否在 PyInstaller 打包后的环境中
+    # 开发环境下的相对路径
+    base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+    sys_folder = "mac" if platform.system() == "Darwin" else "win"
+    adb_bin_dir = os.path.join(base_path, 'resource', 'platform-tools', sys_folder)
+
+    # 根据系统补全文件名
+    adb_exe = "adb.exe" if platform.system() == "Windows" else "adb"
+    full_path = os.path.join(adb_bin_dir, adb_exe)
+    # macOS 权限补丁：确保打包后的二进制文件有执行权限
+    if platform.system() != "Windows" and os.path.exists(full_path):
+        os.chmod(full_path, 0o755)
+
+    return f'"{full_path}"'  # 加引号防止路径中有空格
+
+
+def list_devices():
+    """
+    adb devices 中状态为 device 的序列号 (不含 offline / unauthorized)
+    """
+    try:
+        output = subprocess.check_output(f"{get_adb_path()} devices", shell=True, timeout=10)
+    except Exception as e:
+        SLog.e(TAG, f"获取设备列表失败: {e}")
+        return []
+    serials = []
+    for line in output.decode('utf-8', errors='ignore').splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+
 class AndroidADBEngine(BaseEngine):
+    PREFETCH = ("screenshot", "hierarchy")
 
     def get_adb_path(self):
-        """动态获取集成的 ADB 路径"""
-        # 判断是否在 PyInstaller 打包后的环境中
-        # 开发环境下的相对路径
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-        sys_folder = "mac" if platform.system() == "Darwin" else "win"
-        adb_bin_dir = os.path.join(base_path, 'resource', 'platform-tools', sys_folder)
-
-        # 根据系统补全文件名
-        adb_exe = "adb.exe" if platform.system() == "Windows" else "adb"
-        full_path = os.path.join(adb_bin_dir, adb_exe)
-        # macOS 权限补丁：确保打包后的二进制文件有执行权限
-        if platform.system() != "Windows" and os.path.exists(full_path):
-            os.chmod(full_path, 0o755)
-
-        return f'"{full_path}"'  # 加引号防止路径中有空格
+        return get_adb_path()
+
+    def healthy(self):
+        state = subprocess.run(f"{self.adb_base} get-state", shell=True, capture_output=True, timeout=10)
+        return state.stdout.decode('utf-8', errors='ignore').strip() == "device"
 
     def init_driver(self, test_subject=None):
         if self.driver is not None:  # 二次检查
             return
 
+        test_subject = test_subject or self.target
         self.adb_exe_path = self.get_adb_path()
         self.adb_base = f"{self.adb_exe_path} -s {test_subject}" if test_subject else self.adb_exe_path
         # 🔥 关键修复：设置标志位，防止 BaseEngine.start 重复触发
@@ -56,20 +83,37 @@ class AndroidADBEngine(BaseEngine):
         p_name = "".join(c for c in package_name if c.isprintable()).strip()
         # 启动 app 后建议在业务脚本里加一点 sleep
         self.shell(f"monkey -p {p_name} -c android.intent.category.LAUNCHER 1")
+        self.screen.invalidate()
         return True
 
     def stop_app(self, package_name=None):
         if package_name:
             self.shell(f"am force-stop {package_name}")
+            self.screen.invalidate()
         return True
 
-    def screenshot(self, path=None):
-        try:
+    def capture(self, kind):
+        """
+        采集界面状态: screenshot 返回 PIL 图片，hierarchy 返回布局 XML
+        """
+        if kind == "screenshot":
             # exec-out 是获取二进制流最快且最稳定的方式
             cmd = f"{self.adb_base} exec-out screencap -p"
             img_bytes = subprocess.check_output(cmd, shell=True)
             if not img_bytes: return None
             img = Image.open(BytesIO(img_bytes))
+            img.load()
+            return img
+        if kind == "hierarchy":
+            # 修复 adb pull - 报错问题：改用 cat 直接读取内容
+            self.shell("uiautomator dump /sdcard/view.xml")
+            return self.shell("cat /sdcard/view.xml")
+        return None
+
+    def screenshot(self, path=None):
+        try:
+            img = self.screen.get("screenshot", self.capture)
+            if img is None: return None
             if path:
                 img.save(path)
                 return path
@@ -79,13 +123,9 @@ class AndroidADBEngine(BaseEngine):
             return None
 
     def find_element(self, locator_chain=[]):
-        """
-        修复 adb pull - 报错问题：改用 cat 直接读取内容
-        """
-        self.shell("uiautomator dump /sdcard/view.xml")
         try:
-            # 修正点：不再使用 pull - 而是使用 cat，彻底解决 unrecognized option '-' 报错
-            xml_data = self.shell("cat /sdcard/view.xml")
+            # 优先使用上一个节点结束后预取的布局
+            xml_data = self.screen.get("hierarchy", self.capture)
             if not xml_data or "<?xml" not in xml_data:
                 return None
             root = ET.fromstring(xml_data)
@@ -111,7 +151,9 @@ class AndroidADBEngine(BaseEngine):
 
     def click(self, element, position=None):
         target = position if position else element
-        if target: self.shell(f"input tap {target[0]} {target[1]}")
+        if target:
+            self.shell(f"input tap {target[0]} {target[1]}")
+            self.screen.invalidate()
 
     def send_keys(self, element, text):
         """
@@ -124,6 +166,7 @@ class AndroidADBEngine(BaseEngine):
         # 2. ADB 原生 text 不支持中文，空格需转义为 %s
         safe_text = str(text).replace(" ", "%s")
         self.shell(f"input text {safe_text}")
+        self.screen.invalidate()
 
     def drag_and_drop(self, source, target):
         """
@@ -133,6 +176,7 @@ class AndroidADBEngine(BaseEngine):
             # input swipe <x1> <y1> <x2> <y2> <duration_ms>
             SLog.i(TAG, f"执行滑动: {source} -> {target}")
             self.shell(f"input swipe {source[0]} {source[1]} {target[0]} {target[1]} 500")
+            self.screen.invalidate()
 
     def close_window(self, target):
         self.stop_app(target)
\ No newline at end of file
@@ -16,7 +16,7 @@ class IOSEngine(BaseEngine):
     def init_driver(self, test_subject=None):
         SLog.i(TAG, "Init iOS Engine")
         try:
-            self.driver = wda.USBClient()
+            self.driver = wda.USBClient(self.target or "")
         except Exception as e:
             SLog.w(TAG, f"USB connection failed, trying default localhost:8100. Error: {e}")
             self.driver = wda.Client()
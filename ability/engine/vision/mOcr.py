@@ -72,7 +72,7 @@ def analyze(image_path, img=None):
     total_time = 0.0
     if elapse is not None:
         total_time = sum(elapse) if isinstance(elapse, (list, tuple)) else float(elapse)
-    SLog.d(TAG, f">> 识别耗时: {total_time:.4f}s")
+    SLog.d(TAG, ">> 识别耗时: %.4fs", total_time, duration_ms=int(total_time * 1000), engine="ocr")
 
     if not result:
         return []
@@ -18,7 +18,6 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from script.log import SLog
-from script.singleton_meta import SingletonMeta
 from ability.core.engine import BaseEngine
 
 TAG = 'ChromeEngine'
@@ -26,8 +25,9 @@ TAG = 'ChromeEngine'
 
 class ChromeEngine(BaseEngine):
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, target=None):
+        # target: 浏览器用户数据目录，不同目录的实例互不影响
+        super().__init__(target)
         self.service = None
         self.proxy = None
         self.server = None
@@ -35,7 +35,10 @@ class ChromeEngine(BaseEngine):
     def init_driver(self):
         SLog.i(TAG, "Create an instance of Chrome browser")
         self.service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=self.service)
+        chrome_options = Options()
+        if self.target:
+            chrome_options.add_argument(f"--user-data-dir={self.target}")
+        self.driver = webdriver.Chrome(service=self.service, options=chrome_options)
 
     def start_app(self, url=None):
         if not url.startswith("http"):
@@ -49,6 +52,12 @@ class ChromeEngine(BaseEngine):
         self.driver.close()
         return True
 
+    def healthy(self):
+        try:
+            return self.driver.current_window_handle is not None
+        except Exception:
+            return False
+
     def end(self):
         SLog.i(TAG, "Close Chrome browser instance")
         self.driver.quit()
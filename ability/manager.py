@@ -5,6 +5,8 @@ import ability.common.platform as platform_code
 from ability.component.router import BaseRouter
 from script.singleton_meta import SingletonMeta
 from driver.common.task_details import TaskDetails
+from ability.core.result_cache import cached_execute
+from ability.core.engine_registry import engine_registry, target_of
 
 
 
@@ -17,18 +19,18 @@ class TaskInfo:
 class Manager(metaclass=SingletonMeta):
     def __init__(self):
         self.router = BaseRouter()
-        self.PCEngine = None
-        self.WebEngine = None
-        self.MobileEngine = None
+        self.engines = engine_registry
+
+    def engine_for(self, info, create=True):
+        """
+        节点使用的引擎: 按平台和设备 (节点 data["device"] 或当前运行的设备) 从注册表获取
+        """
+        return self.engines.get(info.platform, target_of(info), create=create)
 
     def online(self, info):
-        self.apply_engine(info)
-        if self.PCEngine:
-            self.PCEngine.start()
-        if self.WebEngine:
-            self.WebEngine.start()
-        if self.MobileEngine:
-            self.MobileEngine.start()
+        engine = self.engine_for(info)
+        if engine:
+            engine.start()
 
     def execute_interface(self, data: dict):
         """
@@ -39,39 +41,16 @@ class Manager(metaclass=SingletonMeta):
         return self.register_router(info, True)
 
     def register_router(self, info, channel=None):
+        handler = getattr(info, "handler", None)
+        if handler is not None:
+            # 执行计划编译时已解析出组件类，直接实例化
+            execute_router = handler(info)
+        else:
+            execute_router = self.router.handle_request(info.nodeCode, info)
         if not channel:
-            return self.router.handle_request(info.nodeCode, info)
-        execute_router = self.router.handle_request(info.nodeCode, info)
-        result = execute_router.execute()
+            return execute_router
+        result = cached_execute(execute_router)
         return result
 
-    def apply_engine(self, info):
-        if info.platform in platform_code.MMOBILE:
-            if self.MobileEngine:
-                return True
-            if info.platform == platform_code.IOS:
-                from ability.engine.mobile.mIOS import IOSEngine
-                self.MobileEngine = IOSEngine()
-            else:
-                from ability.engine.mobile.mAndroidADB import AndroidADBEngine
-                self.MobileEngine = AndroidADBEngine()
-        if info.platform in platform_code.MWEB:
-            if self.WebEngine:
-                return True
-            from ability.engine.web.mChrome import ChromeEngine
-            self.WebEngine = ChromeEngine()
-        if info.platform in platform_code.MPC:
-            if self.PCEngine:
-                return True
-            if info.platform == platform_code.MACOS:
-                from ability.engine.pc.mMac import MacEngine
-                self.PCEngine = MacEngine()
-            elif info.platform == platform_code.WINDOWS:
-                from ability.engine.pc.mWindows import WindowsEngine
-                self.PCEngine = WindowsEngine()
-        return True
-
     def offline(self):
-        if self.PCEngine: self.PCEngine.end()
-        if self.WebEngine: self.WebEngine.end()
-        if self.MobileEngine: self.MobileEngine.end()
+        self.engines.close_all()
@@ -1,68 +1,99 @@
 import traceback
 import os
-from script.log import SLog, current_run_id, current_flow_id
-from server.core.log_database import LogSessionLocal
-from server.models.log import WorkflowLog
-from driver.core.manager import Manager
+from script.log import SLog, LEVELS, current_run_id, current_flow_id
+from server.services.log_service import log_writer
+from driver.core.manager import Manager, RunTimeout
 from server.services import run_service
-from script.mTask import report
+from script.mTask import report, emit
+from ability.core.memory import Memory
 
+# 运行数据中决定执行环境的字段: 数据集的当前行 ({{$row.x}}) 和任务分配的设备
+RUN_CONTEXT = ("row", "device")
 
 
-# 1. 定义写入数据库的具体逻辑
-# 这个函数会在子进程中被 SLog 调用
-def _db_writer(run_id, flow_id, node_id, level, tag, message):
-    db = LogSessionLocal()
-    try:
-        log = WorkflowLog(
-            run_id=run_id,
-            flow_id=flow_id,
-            node_id=node_id,
-            level=level,
-            tag=tag,
-            message=message
-        )
-        db.add(log)
-        db.commit()
-    except Exception as e:
-        SLog.e("System", f"Log Write Error: {e}")
-    finally:
-        db.close()
+def _log_callback(run_id, flow_id, node_id, level, tag, message, fields=None):
+    """
+    SLog 数据库回调: 写入日志库，同时作为运行事件推送给订阅的客户端
+    """
+    log_writer.write(run_id, flow_id, node_id, level, tag, message, fields)
+    emit("log", node_id=node_id, level=level, tag=tag, message=str(message), fields=fields or None)
 
 
-# 2. 包装器函数
-def process_runner_wrapper(run_data, run_id, flow_id):
+# 包装器函数
+def process_runner_wrapper(run_data, run_id, flow_id, keep_alive=False):
     """
     这是一个运行在子进程中的 wrapper。
     它负责初始化环境，然后执行真正的业务脚本。
+    keep_alive: 在常驻进程池中执行时为 True，结束后保留引擎供下一次任务复用
+    返回运行结束状态: success / failed / timeout / cancelled
     """
     # --- A. 初始化 SLog 回调 ---
-    # 在这个新进程里，把写入数据库的能力注入给 SLog
-    SLog.set_log_callback(_db_writer)
+    # 在这个新进程里，把写入数据库的能力注入给 SLog (后台线程按批写入)
+    log_writer.start()
+    SLog.set_log_callback(_log_callback)
+    # 写入数据库的级别默认为 INFO，工作流可以用 _log_level 设置 (如排查问题时的 debug)
+    level = str((run_data or {}).get("_log_level") or "info").lower()
+    SLog.set_level(db=level if level in LEVELS else "info")
 
     # --- B. 设置上下文 ---
     # 让后续的 SLog.i() 知道当前的 ID
     token_run = current_run_id.set(run_id)
     token_flow = current_flow_id.set(str(flow_id))
 
+    # 常驻进程会连续执行多个任务，清理上一次任务残留的结果
+    report.clear()
+
+    status = "success"
     try:
         SLog.i("System", "start")
         SLog.i("System", f"任务进程启动 PID:{os.getpid()}")
         SLog.i("System", f"输入数据{run_data}")
 
-        run_service.create_run()
+        # 排队期间已被取消
+        if run_service.get_status(run_id) == "cancelled":
+            SLog.i("System", "任务已取消，跳过执行")
+            return "cancelled"
+
+        # 数据集的当前行和任务分配的设备记录在结果摘要中，从该运行恢复时沿用
+        context = {key: run_data[key] for key in RUN_CONTEXT if run_data and run_data.get(key) is not None}
+        if context:
+            report["_run"] = {"context": context}
+
+        # 从上一次运行的某个节点恢复执行
+        resume = run_data.get("resume") if run_data else None
+        if resume:
+            resume = dict(resume, checkpoints=run_service.load_checkpoints(resume["run_uuid"]))
+            report.setdefault("_run", {})["resumed_from"] = {"run_uuid": resume["run_uuid"],
+                                                             "node_id": resume["node_id"]}
+            run_service.create_run(trigger="resume", summary=dict(report))
+        elif run_data and run_data.get("trigger"):
+            # 数据集运行的每一行、任务中的每个工作流
+            run_service.create_run(trigger=run_data["trigger"], parent_uuid=run_data.get("parent_uuid"),
+                                   summary=dict(report) if context else None)
+        else:
+            run_service.create_run(summary=dict(report) if context else None)
         # --- C. 执行真正的业务脚本 ---
-        runner = Manager(run_data)
+        runner = Manager(run_data, keep_alive=keep_alive, checkpoint=run_service.save_checkpoint, resume=resume)
         runner.run()
 
-        run_service.finish_run("success", report)
+        run_service.finish_run(status, report)
+    except RunTimeout as e:
+        status = "timeout"
+        run_service.finish_run(status, report)
+        SLog.e("System", f"任务超时: {e}, 节点 {e.node_id}")
     except Exception as e:
-        run_service.finish_run("failed", report)
+        status = "failed"
+        run_service.finish_run(status, report)
         error_msg = traceback.format_exc()
         SLog.e("System", f"任务异常崩溃: {error_msg}")
         SLog.i("System", "error")
     finally:
-        # 清理上下文
+        # 释放本次运行的变量，清理上下文
+        Memory().release(run_id)
         current_run_id.reset(token_run)
         current_flow_id.reset(token_flow)
-        SLog.i("System", "end")
\ No newline at end of file
+        SLog.i("System", "end")
+        # 运行结束前写入检查点、结束状态和剩余日志，主进程收到结束事件时数据已完整
+        run_service.run_writer.flush()
+        log_writer.flush()
+    return status
@@ -0,0 +1,77 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import threading
+from collections import OrderedDict
+
+TAG = "RunEvents"
+
+
+class EventBatcher:
+    """
+    执行进程内的运行事件合并: 每 interval 秒把当前运行的事件作为一条消息发给主进程
+
+    - 同一节点同一变量的 memory_update 只保留最新值
+    - 每批日志超过 max_logs 条时只发送计数 (log_skipped)，界面需要时从数据库补齐
+    - 节点和运行状态事件不会被合并或丢弃
+    """
+
+    def __init__(self, events, pid, interval=0.05, max_logs=200):
+        self.events = events
+        self.pid = pid
+        self.interval = interval
+        self.max_logs = max_logs
+        self._pending = OrderedDict()
+        self._run_id = None
+        self._logs = 0
+        self._skipped = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="run-events", daemon=True)
+        self._thread.start()
+
+    def add(self, run_id, event, info):
+        if run_id is None:
+            return
+        item = dict(info, type=event, time=time.time())
+        with self._lock:
+            if run_id != self._run_id:
+                self._flush_locked()
+                self._run_id = run_id
+            if event == "memory_update":
+                key = ("memory", info.get("node_id"), info.get("var_name"))
+                self._pending.pop(key, None)
+            elif event == "log":
+                if self._logs >= self.max_logs:
+                    self._skipped += 1
+                    return
+                self._logs += 1
+                self._seq += 1
+                key = self._seq
+            else:
+                self._seq += 1
+                key = self._seq
+            self._pending[key] = item
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending and not self._skipped:
+            return
+        batch = list(self._pending.values())
+        if self._skipped:
+            batch.append({"type": "log_skipped", "count": self._skipped, "time": time.time()})
+        self._pending.clear()
+        self._logs = 0
+        self._skipped = 0
+        try:
+            self.events.put(("events", self.pid, {"run_id": self._run_id, "events": batch}))
+        except Exception:
+            pass  # 事件推送失败不影响任务执行
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
@@ -0,0 +1,385 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import os
+import time
+import queue
+import signal
+import threading
+import multiprocessing
+
+from script.log import SLog
+
+TAG = "WorkerPool"
+
+# 进程内超时应先触发，超过任务截止时间该时长后仍未结束则由主进程强制终止
+KILL_GRACE = 10
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _rss_mb():
+    if psutil is None:
+        return 0.0
+    return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+
+
+def _preload():
+    """
+    预热: 导入全部组件模块并加载 OCR 模型，后续任务无需冷启动
+    """
+    start = time.time()
+    try:
+        from ability.component.scan import scan
+        scan()
+    except Exception as e:
+        SLog.w(TAG, f"Preload components failed: {e}")
+    try:
+        from ability.engine.vision.mOcr import get_ocr_engine
+        get_ocr_engine()
+    except Exception as e:
+        SLog.w(TAG, f"Preload OCR failed: {e}")
+    SLog.i(TAG, f"Worker {os.getpid()} warmed up in {time.time() - start:.3f}s")
+
+
+def _worker_main(jobs, events, max_runs, max_rss_mb):
+    """
+    常驻的执行进程: 从队列取任务执行，达到次数或内存上限后退出，由主进程补充新进程
+    """
+    from driver.agent.actuator import process_runner_wrapper
+    from driver.agent.events import EventBatcher
+    from server.services.log_service import log_writer
+    from server.services.run_service import run_writer
+    from script import mTask
+    pid = os.getpid()
+
+    def terminate(signum, frame):
+        # 取消或超时时被主进程终止: 先写入队列中剩余的检查点和日志
+        run_writer.close(timeout=2)
+        log_writer.close(timeout=2)
+        os._exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, terminate)
+    _preload()
+
+    current = {"run_id": None}
+    batcher = EventBatcher(events, pid)
+
+    def forward(event, info):
+        # 把当前节点上报给主进程，取消或超时时用于标记中断位置
+        if event == "node_start":
+            events.put(("node", pid, {"run_id": current["run_id"], "node_id": info.get("node_id")}))
+        # 运行事件 (节点、变量、日志) 合并后推送给订阅的客户端
+        batcher.add(current["run_id"], event, info)
+
+    mTask.listeners.append(forward)
+    events.put(("idle", pid, {"runs": 0, "rss_mb": _rss_mb()}))
+
+    runs = 0
+    reason = "shutdown"
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        run_data, run_id, flow_id = job
+        current["run_id"] = run_id
+        events.put(("busy", pid, {"run_id": run_id, "flow_id": str(flow_id)}))
+        batcher.add(run_id, "run_start", {"flow_id": str(flow_id)})
+        status = "failed"
+        try:
+            status = process_runner_wrapper(run_data, run_id, flow_id, keep_alive=True)
+        except Exception as e:
+            SLog.e(TAG, f"Worker {pid} job crashed: {e}")
+        batcher.add(run_id, "run_end", {"status": status})
+        batcher.flush()
+        current["run_id"] = None
+        runs += 1
+        # 两次运行之间下线长时间未使用的引擎 (如已拔出的设备)
+        try:
+            from ability.core.engine_registry import engine_registry
+            engine_registry.sweep()
+        except Exception as e:
+            SLog.w(TAG, f"Worker {pid} engine sweep failed: {e}")
+        rss = _rss_mb()
+        # 本进程的数据库锁等待和写入队列统计，随进程状态上报 (见 GET /workflow/storage)
+        from server.core.storage import metrics
+        events.put(("idle", pid, {"runs": runs, "rss_mb": rss, "storage": metrics()}))
+        if status == "timeout":
+            # 超时节点的通道线程可能仍卡在引擎调用上，进程不再复用
+            reason = "timeout"
+            break
+        if runs >= max_runs:
+            reason = f"max_runs {max_runs}"
+            break
+        if max_rss_mb and rss > max_rss_mb:
+            reason = f"rss {rss:.0f}MB > {max_rss_mb}MB"
+            break
+
+    try:
+        from ability.manager import Manager
+        Manager().offline()
+    except Exception as e:
+        SLog.w(TAG, f"Worker {pid} offline failed: {e}")
+    run_writer.close()
+    log_writer.close()
+    events.put(("exit", pid, {"reason": reason}))
+    if reason == "timeout":
+        # 跳过解释器退出时对卡死线程的 join
+        events.close()
+        events.join_thread()
+        os._exit(0)
+
+
+class WorkerPool:
+    """
+    受监管的常驻执行进程池
+    """
+
+    def __init__(self, size=2, max_runs=50, max_rss_mb=1024):
+        self.size = size
+        self.max_runs = max_runs
+        self.max_rss_mb = max_rss_mb
+        self._jobs = None
+        self._events = None
+        self._workers = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._supervisor = None
+        # run_id -> 排队中的任务 / 执行中的任务，以及排队期间被取消的任务
+        self._queued = {}
+        self._runs = {}
+        self._cancelled = set()
+        # run_id -> 任务结束 (完成、取消、超时或进程崩溃) 时的回调
+        self._callbacks = {}
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._jobs = multiprocessing.Queue()
+            self._events = multiprocessing.Queue()
+            self._running = True
+            for _ in range(self.size):
+                self._spawn()
+        self._supervisor = threading.Thread(target=self._supervise, name="pool-supervisor", daemon=True)
+        self._supervisor.start()
+        SLog.i(TAG, f"Worker pool started: size={self.size}, max_runs={self.max_runs}, max_rss_mb={self.max_rss_mb}")
+
+    def stop(self):
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            workers = list(self._workers.values())
+        for _ in workers:
+            self._jobs.put(None)
+        for process in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def grow(self, size):
+        """
+        池大小至少为 size (如按设备数扩容)，由监管线程补足进程
+        """
+        with self._lock:
+            if size > self.size:
+                SLog.i(TAG, f"Worker pool resized: {self.size} -> {size}")
+                self.size = size
+
+    def submit(self, run_data, run_id, flow_id, callback=None):
+        """
+        callback(run_id): 任务结束时在监管线程中调用，不应阻塞
+        """
+        if not self._running:
+            self.start()
+        deadline = ((run_data or {}).get("nodes") or {}).get("_deadline") or {}
+        with self._lock:
+            self._queued[run_id] = {"flow_id": str(flow_id), "deadline": deadline.get("run")}
+            if callback is not None:
+                self._callbacks[run_id] = callback
+        self._jobs.put((run_data, run_id, flow_id))
+
+    def _finish(self, run_id):
+        with self._lock:
+            callback = self._callbacks.pop(run_id, None)
+        if callback is not None:
+            try:
+                callback(run_id)
+            except Exception as e:
+                SLog.e(TAG, f"Run {run_id} callback failed: {e}")
+
+    def cancel(self, run_id):
+        """
+        取消任务: 排队中的任务在被取出时跳过，执行中的任务直接终止所在进程
+        返回 queued / running / None (不在池中)
+        """
+        with self._lock:
+            if run_id in self._queued:
+                self._cancelled.add(run_id)
+                flow_id = self._queued[run_id]["flow_id"]
+                state = "queued"
+            elif run_id in self._runs:
+                flow_id = self._runs[run_id]["flow_id"]
+                state = "running"
+            else:
+                return None
+        if state == "running":
+            self._kill(run_id, "cancelled", "cancelled by user")
+        else:
+            # 先写入取消状态，执行进程取到任务时会检查并跳过
+            self._interrupt(run_id, "cancelled", reason="cancelled by user", workflow_id=flow_id)
+        return state
+
+    def _kill(self, run_id, status, reason):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            process = self._workers.get(run["pid"])
+        SLog.w(TAG, f"Terminate worker {run['pid']} for run {run_id}: {reason}")
+        if process is not None and process.is_alive():
+            process.terminate()
+        self._interrupt(run_id, status, run["node_id"], reason, run["flow_id"])
+        self._finish(run_id)
+
+    @classmethod
+    def _interrupt(cls, run_id, status, node_id=None, reason=None, workflow_id=None):
+        try:
+            from server.services.run_service import interrupt_run
+            interrupt_run(run_id, status, node_id=node_id, reason=reason, workflow_id=workflow_id)
+        except Exception as e:
+            SLog.e(TAG, f"Mark run {run_id} as {status} failed: {e}")
+        cls._publish(run_id, [{"type": "run_end", "status": status, "node_id": node_id, "reason": reason,
+                               "time": time.time()}])
+
+    @staticmethod
+    def _publish(run_id, events):
+        # 执行进程上报的运行事件转发给 WebSocket 订阅者
+        try:
+            from server.services.event_service import event_bus
+            event_bus.publish(run_id, events)
+        except Exception as e:
+            SLog.w(TAG, f"Publish events of run {run_id} failed: {e}")
+
+    def _spawn(self):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(self._jobs, self._events, self.max_runs, self.max_rss_mb),
+            daemon=True
+        )
+        process.start()
+        self._workers[process.pid] = process
+        self._status[process.pid] = {
+            "pid": process.pid,
+            "state": "starting",
+            "runs": 0,
+            "rss_mb": 0.0,
+            "run_id": None,
+            "node_id": None,
+            "started_at": time.time(),
+        }
+
+    def _supervise(self):
+        while self._running:
+            try:
+                state, pid, info = self._events.get(timeout=1)
+                self._on_event(state, pid, info)
+            except queue.Empty:
+                pass
+            self._enforce_deadline()
+            self._reap()
+
+    def _enforce_deadline(self):
+        now = time.time()
+        with self._lock:
+            expired = [run_id for run_id, run in self._runs.items()
+                       if run["deadline"] and now - run["started"] > float(run["deadline"]) + KILL_GRACE]
+        for run_id in expired:
+            self._kill(run_id, "timeout", "run deadline exceeded")
+
+    def _on_event(self, state, pid, info):
+        if state == "events":
+            self._publish(info.get("run_id"), info.get("events"))
+            return
+        cancelled = finished = None
+        with self._lock:
+            status = self._status.get(pid)
+            if status is None:
+                return
+            if state == "node":
+                run = self._runs.get(info.get("run_id"))
+                if run is not None:
+                    run["node_id"] = info.get("node_id")
+                    if run["cancelled"]:
+                        cancelled = info.get("run_id")
+                status["node_id"] = info.get("node_id")
+            elif state == "busy":
+                status["state"] = state
+                run_id = info.get("run_id")
+                queued = self._queued.pop(run_id, {})
+                status["run_id"] = run_id
+                status["node_id"] = None
+                self._runs[run_id] = {
+                    "pid": pid,
+                    "flow_id": info.get("flow_id"),
+                    "node_id": None,
+                    "started": time.time(),
+                    "deadline": queued.get("deadline"),
+                    "cancelled": run_id in self._cancelled,
+                }
+                self._cancelled.discard(run_id)
+            elif state == "idle":
+                status["state"] = state
+                if self._runs.pop(status.get("run_id"), None) is not None:
+                    finished = status.get("run_id")
+                status["run_id"] = None
+                status["node_id"] = None
+                status.update(info)
+            elif state == "exit":
+                status["state"] = state
+                SLog.i(TAG, f"Worker {pid} recycled: {info.get('reason')}")
+        if finished is not None:
+            self._finish(finished)
+        if cancelled is not None:
+            # 执行进程取到任务时会检查取消状态并跳过；写入状态前已开始执行的，在第一个节点上报时终止
+            self._kill(cancelled, "cancelled", "cancelled by user")
+
+    def _reap(self):
+        # 回收已退出的进程 (正常回收或崩溃)，并补足池大小
+        crashed = []
+        with self._lock:
+            for pid, process in list(self._workers.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del self._workers[pid]
+                self._status.pop(pid, None)
+                if process.exitcode:
+                    SLog.w(TAG, f"Worker {pid} exited with code {process.exitcode}")
+                for run_id, run in list(self._runs.items()):
+                    if run["pid"] == pid:
+                        crashed.append((run_id, self._runs.pop(run_id)))
+            while self._running and len(self._workers) < self.size:
+                self._spawn()
+        for run_id, run in crashed:
+            self._interrupt(run_id, "failed", run["node_id"], "worker exited unexpectedly", run["flow_id"])
+            self._finish(run_id)
+
+    def snapshot(self):
+        with self._lock:
+            workers = [dict(value) for value in self._status.values()]
+            queued = list(self._queued.keys())
+        return {
+            "running": self._running,
+            "size": self.size,
+            "policy": {"max_runs": self.max_runs, "max_rss_mb": self.max_rss_mb},
+            "workers": workers,
+            "queued": queued,
+        }
+
+
+pool = WorkerPool()
@@ -25,9 +25,43 @@ class TaskDetails:
         self.lastCodes = case_info["lastCodes"]
         self.nextCodes = case_info["nextCodes"]
         self.data = case_info["data"]
+        self.index = None
+        self.handler = None
+        self.bindings = None
+        self.wanted = None
         self.router = None
         self.result = None
 
+    @classmethod
+    def from_plan(cls, node):
+        """
+        基于编译后的只读节点创建本次执行的覆盖层:
+        只有 nextCodes 等运行期会被改写的字段是独立副本，data 与计划共享 (只读)
+        """
+        details = cls.__new__(cls)
+        details.index = node.index
+        details.id = node.id
+        details.nodeType = node.nodeType
+        details.nodeCode = node.nodeCode
+        details.platform = node.platform
+        details.displayName = node.displayName
+        details.lastCodes = node.lastCodes
+        details.nextCodes = list(node.nextCodes)
+        details.data = node.data
+        details.handler = node.handler
+        details.bindings = node.bindings
+        details.wanted = node.wanted
+        details.router = None
+        details.result = None
+        return details
+
+    def reset(self, node):
+        """
+        循环中再次执行同一节点时复用覆盖层: 恢复计划中的走向，清除上一次的结果
+        """
+        self.nextCodes = list(node.nextCodes)
+        self.result = None
+
     def set_result(self, result: TaskResult):
         self.result = result
 
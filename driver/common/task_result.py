@@ -4,6 +4,8 @@ import time
 from typing import Any, Dict, Optional
 from script.log import SLog, current_node_id
 
+TAG = "TaskResult"
+
 # 使用常量提升性能
 _MS_MULTIPLIER = 1000
 
@@ -43,10 +45,12 @@ class TaskResult:
         """获取当前毫秒时间戳 - 使用局部变量提升性能"""
         return int(time.time() * _MS_MULTIPLIER)
 
-    def _add_timestamp(self, key: str) -> None:
-        """添加时间戳记录"""
-        self.timestamp[key] = self._current_ms_timestamp()
-        SLog.i(str(self._token), str(self.timestamp))
+    def _add_timestamp(self, key: str, node_id: Optional[str] = None) -> None:
+        """添加时间戳记录，结束状态以 INFO 记录节点耗时，其余阶段为 DEBUG"""
+        now = self._current_ms_timestamp()
+        self.timestamp[key] = now
+        log = SLog.i if key in ("success", "fail") else SLog.d
+        log(TAG, key, node_id=node_id or self._token, duration_ms=now - self.timestamp.get("start", now))
 
     def _reset_context(self) -> None:
         """重置上下文变量"""
@@ -57,21 +61,23 @@ class TaskResult:
     # =================== 状态设置方法 ===================
     def success(self, message: Optional[str] = None) -> None:
         """设置成功状态"""
+        node_id = self._token
         self._reset_context()
         self._success = True
         self._code = 3
         if message:
             self._message = message
-        self._add_timestamp("success")
+        self._add_timestamp("success", node_id)
 
     def fail(self, message: Optional[str] = None) -> None:
         """设置失败状态"""
+        node_id = self._token
         self._reset_context()
         self._success = False
         self._code = -1
         if message:
             self._message = message
-        self._add_timestamp("fail")
+        self._add_timestamp("fail", node_id)
 
     def accept_order(self, order_info = None, message: Optional[str] = None) -> None:
         """接单状态"""
@@ -1,6 +1,7 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
 from ability.manager import Manager
+from ability.core.result_cache import cached_execute
 from driver.common.task_result import TaskResult
 
 TAG = "Executer"
@@ -16,17 +17,33 @@ class Executer:
         ...
 
     def accept_order(self, order_info):
+        # 每个节点独立的结果对象，避免并行分支之间相互覆盖
+        self.taskResult = TaskResult()
         self.taskResult.accept_order(order_info)
-        self.task = self.center.register_router(order_info)
+        # 循环中再次执行的节点复用上一次创建的组件实例
+        task = getattr(order_info, "router", None)
+        if task is None:
+            task = self.center.register_router(order_info)
+            if task is not None and hasattr(order_info, "router"):
+                order_info.router = task
+        elif hasattr(task, "reset"):
+            task.reset()
+        self.task = task
         self.center.online(order_info)
         return True if self.task else None
 
     def dispatch(self):
         self.taskResult.dispatched()
-        self.task.execute()
+        cached_execute(self.task)
+        return True
 
     def self_check(self):
         self.taskResult.self_check()
+        return True
+
+    def failed(self, message):
+        self.taskResult.fail(message)
+        self.task = None
 
     def completed(self):
         self.taskResult.success()
@@ -34,9 +51,3 @@ class Executer:
 
     def offline(self):
         self.center.offline()
-
-
-
-
-
-
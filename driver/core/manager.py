@@ -1,53 +1,403 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
+import time
+import queue
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
 from script.log import SLog
-from script.sleep import mSleep
 
 from driver.core.executer import Executer
+from driver.core.pacing import Pacing
 from driver.core.memory.checklist import Checklist
-from script.mTask import report
+from script.mTask import report as run_report, emit
+from script.constPath.error_code import ErrorCode
+from ability.core.exeception import MException
 from ability.component.router import BaseRouter
+from ability.core.result_cache import result_cache
+from ability.core.memory import Memory, ROW_SCOPE
+from ability.core.engine_registry import current_device, target_of
+import ability.common.platform as platform_code
 
 TAG = "Manager"
 
+# 非界面节点 (接口、流程控制、通用组件) 的通道并行执行的线程数，界面通道按设备串行
+COMMON_WORKERS = 4
+# 同一节点经回边重新进入的次数上限，超过时任务失败 (循环体不改变走向时防止死循环)
+# 工作流可以在 nodes 的 "_loop" 中覆盖: {"max_rearms": 50000}
+MAX_REARMS = 10000
+
+
+# 界面通道的设备锁 (进程级): 子工作流 (cfs/call) 在独立的 Manager 中执行，与调用方的同一设备通道共用一把锁，
+# 同一台设备上同时只有一个界面节点在执行
+_lane_locks = {}
+_lane_locks_guard = threading.Lock()
+
+
+def lane_lock(lane):
+    with _lane_locks_guard:
+        lock = _lane_locks.get(lane)
+        if lock is None:
+            lock = _lane_locks[lane] = threading.Lock()
+        return lock
+
+
+class RunTimeout(MException):
+    """
+    节点或整个任务超过截止时间，node_id 为超时时正在执行的节点
+    """
+
+    def __init__(self, error: ErrorCode, node_id=None):
+        super().__init__(error)
+        self.node_id = node_id
+
+
+def lane_of(platform, target=None):
+    """
+    节点所属的执行通道: 同一引擎/平台上的节点串行，不同通道之间并行
+    指定设备的节点按设备分通道 ("mobile@序列号")，不同设备上的节点可以并行
+    """
+    if platform in platform_code.MMOBILE:
+        lane = platform_code.MOBILE
+    elif platform in platform_code.MWEB:
+        lane = platform_code.WEB
+    elif platform in platform_code.MPC:
+        lane = platform_code.PC
+    else:
+        return platform_code.COMMON
+    return f"{lane}@{target}" if target else lane
+
 
 class  Manager:
 
-    def __init__(self, case_data=None):
+    def __init__(self, case_data=None, keep_alive=False, checkpoint=None, resume=None, report=None):
         self.case_data = case_data
+        # 节点结果写入的报告，默认为进程级的 mTask.report；子工作流使用独立的报告
+        self.report = run_report if report is None else report
+        # 常驻进程中运行时保留引擎，不在任务结束时下线
+        self.keep_alive = keep_alive
+        # checkpoint(node_id, outputs, result): 节点完成时保存检查点
+        # resume: {"node_id": 从该节点继续, "checkpoints": 上一次运行的检查点}
+        self.checkpoint = checkpoint
+        self.resume = resume
         self.checklist = Checklist()
-        self.jobMarket = []
+        # 每个通道一个 Executer 和一个单线程执行器
+        self.jobMarket = {}
+        self.lanes = {}
+        self.done = queue.Queue()
+        self.pacing = None
+        self.cache_stats = None
+        # 截止时间 (秒): 工作流级写在 nodes 的 "_deadline" 中 {"run": 600, "node": 60}，
+        # 节点级写在 data["deadline"] 中
+        self.run_deadline = None
+        self.node_deadline = None
+        self.has_deadline = False
+        self.running = {}
+        self.max_rearms = MAX_REARMS
 
-    def hiring(self):
-        if not self.jobMarket:
-            self.jobMarket.append(Executer())
-        return self.jobMarket[0]
+    def hiring(self, lane):
+        # 非界面通道多线程执行，Executer 保存当前节点的结果，每个线程一个
+        key = (lane, threading.get_ident()) if lane == platform_code.COMMON else lane
+        if key not in self.jobMarket:
+            self.jobMarket[key] = Executer()
+        return self.jobMarket[key]
 
     def completed(self):
-        for employee in self.jobMarket:
+        self.shutdown()
+        if self.keep_alive:
+            return
+        # 所有 Executer 共享同一个 ability Manager，下线一次即可
+        employee = next(iter(self.jobMarket.values()), None)
+        if employee:
             employee.offline()
 
+    def shutdown(self, wait=True):
+        # 超时时通道线程可能卡死在引擎调用上，此时不等待
+        for lane in self.lanes.values():
+            lane.shutdown(wait=wait)
+        self.lanes.clear()
+
     def run(self):
         if self.case_data:
-            self.checklist.create(self.case_data["nodes"])
-            while True:
-                employee = self.hiring()
-                current_node = self.checklist.peek()
-                if not current_node:
-                    self.completed()
-                    break
-                accept_result = employee.accept_order(current_node)
-                if accept_result:
-                    dispatch_result = employee.dispatch()
-                    if dispatch_result:
-                        self_check_result = employee.self_check()
-                        if self_check_result:
-                            employee.completed()
-                report[current_node.id] = employee.taskResult.to_dict()
-                mSleep(0.3)
+            nodes = self.case_data["nodes"]
+            self.checklist.create(nodes, self._plan_key())
+            self._check_references()
+            self.pacing = Pacing(nodes.get("_pacing"))
+            self.cache_stats = result_cache.stats()
+            self._bind_row(self.case_data.get("row"))
+            # 运行级设备 (如任务分配的 Android 序列号)，节点 data["device"] 可覆盖
+            current_device.set(self.case_data.get("device"))
+            self._apply_deadline(nodes.get("_deadline"))
+            loop = nodes.get("_loop") or {}
+            if loop.get("max_rearms"):
+                self.max_rearms = int(loop["max_rearms"])
+            if self.checklist.root is None:
+                self.completed()
+                return
+            try:
+                if self.resume:
+                    self._schedule(*self._restore())
+                else:
+                    self._schedule()
+            except RunTimeout as e:
+                self.shutdown(wait=False)
+                self.report.setdefault("_run", {})["interrupted"] = {
+                    "reason": e.error_msg,
+                    "node_id": e.node_id
+                }
+                raise
+            except Exception:
+                self.shutdown()
+                raise
+            finally:
+                self._summarize()
+            self.completed()
         else:
             SLog.i(TAG, "run end")
 
+    @staticmethod
+    def _bind_row(row):
+        # 数据集运行: 当前行的字段作为运行级变量 {{$row.field}}
+        if not row:
+            return
+        store = Memory().store()
+        for key, value in row.items():
+            store.set(ROW_SCOPE, key, value)
+
+    def _restore(self):
+        """
+        恢复上一次运行的变量和结果，返回起始节点以及已完成节点走向的节点
+        只恢复恢复区域上游的节点 (区域内的节点会重新执行)，恢复的检查点同时写入本次运行，
+        再次从本次运行恢复时不会丢失
+        """
+        plan = self.checklist.plan
+        node_id = self.resume["node_id"]
+        start = plan.index.get(node_id)
+        if start is None or plan.successors[start] is None:
+            raise ValueError(f"Resume node [{node_id}] not found in workflow")
+        upstream = plan.upstream(plan.reachable(start))
+        store = Memory().store()
+        taken = set()
+        restored = 0
+        for done_id, checkpoint in self.resume["checkpoints"].items():
+            if plan.index.get(done_id) not in upstream:
+                continue
+            for name, value in checkpoint["outputs"].items():
+                store.set(done_id, name, value)
+            self.report[done_id] = checkpoint["result"].get("report")
+            taken.update(code for code in checkpoint["result"].get("next", []) if code in plan.index)
+            if self.checkpoint is not None:
+                self.checkpoint(done_id, checkpoint["outputs"], checkpoint["result"])
+            restored += 1
+        SLog.i(TAG, f"Resume from [{node_id}], restored {restored} checkpoints")
+        return start, {plan.index[code] for code in taken}
+
+    def _check_references(self):
+        # 引用不存在的节点在运行前报错，而不是执行到一半才拿到 None
+        unresolved = self.checklist.plan.unresolved
+        if unresolved:
+            for message in unresolved:
+                SLog.e(TAG, message)
+            raise MException(ErrorCode.RUN_ERROR_UNRESOLVED_REFERENCE)
+
+    def _apply_deadline(self, config):
+        config = config or {}
+        if config.get("run"):
+            self.run_deadline = time.monotonic() + float(config["run"])
+        if config.get("node"):
+            self.node_deadline = float(config["node"])
+        nodes = self.checklist.plan.nodes
+        self.has_deadline = self.run_deadline is not None or self.node_deadline is not None \
+            or any(self._node_deadline(node) for node in nodes)
+
+    def _node_deadline(self, node):
+        value = node.data.get("deadline") if isinstance(node.data, dict) else None
+        return float(value) if value else self.node_deadline
+
+    def _wait_done(self):
+        """
+        等待任意节点结束，同时检查节点和任务的截止时间
+        """
+        while True:
+            now = time.monotonic()
+            limits = []
+            if self.run_deadline is not None:
+                if now >= self.run_deadline:
+                    current = next(iter(self.running.values()), (None, None))[0]
+                    raise RunTimeout(ErrorCode.RUN_ERROR_RUN_TIMEOUT, current.id if current else None)
+                limits.append(self.run_deadline - now)
+            for node, started in list(self.running.values()):
+                deadline = self._node_deadline(node)
+                if deadline is None:
+                    continue
+                if now - started >= deadline:
+                    raise RunTimeout(ErrorCode.RUN_ERROR_NODE_TIMEOUT, node.id)
+                limits.append(started + deadline - now)
+            # 节点可能还在通道中排队，没有截止时间时也定期醒来检查
+            timeout = min(limits) if limits else None
+            if timeout is None and self.has_deadline:
+                timeout = 0.5
+            try:
+                return self.done.get(timeout=timeout)
+            except queue.Empty:
+                continue
+
+    def _plan_key(self):
+        workflow_id = self.case_data.get("id")
+        updated_at = self.case_data.get("updated_at")
+        if workflow_id is None or updated_at is None:
+            return None
+        return workflow_id, str(updated_at)
+
+    def _summarize(self):
+        pacing = self.pacing.summary()
+        self.report.setdefault("_run", {})["pacing"] = pacing
+        SLog.i(TAG, f"Pacing: {pacing['nodes']} nodes, settle {pacing['settle_seconds']}s, saved {pacing['saved_seconds']}s")
+        # 结果缓存计数是进程级的，记录本次运行的增量
+        stats = result_cache.stats()
+        self.report["_run"]["cache"] = {key: stats[key] - self.cache_stats[key] for key in stats}
+
+    def _schedule(self, start=None, taken_before=()):
+        """
+        DAG 调度: 前驱全部结束后节点才就绪；只要有一个前驱走到了它就执行，否则剪枝
+        从中间节点恢复时只调度 start 可达的区域，区域外的前驱视为已完成，taken_before 为它们走向的节点
+        """
+        plan = self.checklist.plan
+        successors = plan.successors
+        if start is None:
+            start = plan.root
+            pending = [len(value) if value is not None else 0 for value in plan.predecessors]
+            activated = set()
+        else:
+            region = plan.reachable(start)
+            pending = [len([pre for pre in value if pre in region]) if index in region else 0
+                       for index, value in enumerate(plan.predecessors)]
+            pending[start] = 0
+            activated = {index for index in taken_before if index in region}
+        resolved = set()
+        in_flight = 0
+        error = None
+        rearms = {}
+
+        def prune(index):
+            # 没有任何前驱走到该节点 (如 IF 未命中的分支)，连同下游一起跳过
+            stack = [index]
+            while stack:
+                current = stack.pop()
+                resolved.add(current)
+                for target in successors[current]:
+                    pending[target] -= 1
+                    if pending[target] == 0:
+                        if target in activated:
+                            ready.append(target)
+                        else:
+                            stack.append(target)
+
+        def rearm(index):
+            # 回边被触发 (循环)，重置循环体内已结束的节点以便再次执行
+            rearms[index] = rearms.get(index, 0) + 1
+            if rearms[index] > self.max_rearms:
+                SLog.e(TAG, f"Node [{plan.nodes[index].id}] re-entered more than {self.max_rearms} times")
+                raise MException(ErrorCode.RUN_ERROR_LOOP_LIMIT)
+            region = {key for key in plan.reachable(index) if key in resolved}
+            for key in region:
+                resolved.discard(key)
+                activated.discard(key)
+                pending[key] = len([pre for pre in plan.predecessors[key] if pre in region])
+            activated.add(index)
+            ready.append(index)
+
+        ready = [start]
+        # 恢复时区域内只依赖区域外前驱、且曾被走到的节点同样直接就绪
+        ready += [index for index in activated if index != start and pending[index] == 0]
+        activated.add(start)
+        while ready or in_flight:
+            while ready and error is None:
+                self._submit(self.checklist.take(ready.pop(0)))
+                in_flight += 1
+            if not in_flight:
+                break
+
+            node, exc = self._wait_done()
+            in_flight -= 1
+            resolved.add(node.index)
+            if exc is not None:
+                error = error or exc
+                ready.clear()
+                continue
+
+            taken = {plan.index[code] for code in node.nextCodes if code in plan.index}
+            for target in successors[node.index]:
+                if target in taken:
+                    activated.add(target)
+                pending[target] -= 1
+                if pending[target] == 0:
+                    if target in activated:
+                        ready.append(target)
+                    else:
+                        prune(target)
+            for target in taken:
+                # 回边或跳转到非直接后继的节点，视为循环重新进入
+                if successors[target] is not None and target not in successors[node.index]:
+                    rearm(target)
+
+        if error is not None:
+            raise error
+
+    def _submit(self, node):
+        lane = lane_of(node.platform, target_of(node))
+        if lane not in self.lanes:
+            workers = COMMON_WORKERS if lane == platform_code.COMMON else 1
+            self.lanes[lane] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lane-{lane}")
+        # 拷贝当前上下文，保证 run_id/flow_id 在通道线程中可见
+        context = contextvars.copy_context()
+        self.lanes[lane].submit(context.run, self._work, lane, node)
+
+    def _work(self, lane, node):
+        # 流程控制节点不占用设备: cfs/call 的子工作流中的界面节点会自行取得设备锁
+        if lane == platform_code.COMMON or (node.nodeCode or "").strip("/").startswith("cfs/"):
+            self._execute(lane, node)
+            return
+        with lane_lock(lane):
+            self._execute(lane, node)
+
+    def _execute(self, lane, node):
+        employee = self.hiring(lane)
+        self.running[node.index] = (node, time.monotonic())
+        emit("node_start", node_id=node.id)
+        try:
+            accept_result = employee.accept_order(node)
+            if accept_result:
+                dispatch_result = employee.dispatch()
+                if dispatch_result:
+                    self_check_result = employee.self_check()
+                    if self_check_result:
+                        employee.completed()
+            self.report[node.id] = employee.taskResult.to_dict()
+            self._save_checkpoint(node)
+            self.pacing.settle(lane, node)
+            self.running.pop(node.index, None)
+            emit("node_end", node_id=node.id, success=True, timestamp=dict(employee.taskResult.timestamp))
+            self.done.put((node, None))
+        except Exception as e:
+            SLog.e(TAG, f"Node [{node.id}] failed: {e}")
+            employee.failed(str(e))
+            self.report[node.id] = employee.taskResult.to_dict()
+            self.running.pop(node.index, None)
+            emit("node_end", node_id=node.id, success=False, timestamp=dict(employee.taskResult.timestamp),
+                 message=str(e))
+            self.done.put((node, e))
+
+    def _save_checkpoint(self, node):
+        if self.checkpoint is None:
+            return
+        try:
+            outputs = Memory().store().get_all_from_node(node.id)
+            self.checkpoint(node.id, outputs, {"report": self.report[node.id], "next": list(node.nextCodes)})
+        except Exception as e:
+            SLog.w(TAG, f"Checkpoint [{node.id}] failed: {e}")
+
     def execute_interface(self, data: dict):
         uri = data.get("nodeCode")
         if not uri:
@@ -1,8 +1,7 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
-import copy
-from script.log import SLog
 from driver.common.task_details import TaskDetails
+from driver.core.memory.plan import compile_plan, plan_cache
 
 TAG = "Checklist"
 
@@ -10,34 +9,29 @@ TAG = "Checklist"
 class Checklist:
 
     def __init__(self):
-        self.checklist = {}
-        self.current_node = None
+        self.plan = None
+        # 本次运行已取出的覆盖层，循环再次执行时复用 (连同其中缓存的组件实例)
+        self._taken = {}
 
-    def create(self, checklist):
+    def create(self, checklist, key=None):
         """
-        Push a message onto the queue.
+        获取执行计划: 提供 key (workflow id + updated_at) 时走缓存
         """
-        for key, value in checklist.items():
-            if key == "_ui_meta": continue
-            self.checklist[key] = TaskDetails(value)
+        self.plan = plan_cache.get(key, checklist) if key else compile_plan(checklist)
+        self._taken = {}
 
-    def peek(self):
+    @property
+    def root(self):
+        return self.plan.root if self.plan else None
+
+    def take(self, index):
         """
-        Peek at the oldest message without removing it from the queue.
+        取出节点的执行覆盖层，组件 (如 cfs/mIf) 对节点的改写不会影响计划
         """
-        if self.current_node is None:
-            trigger = [
-                value
-                for key, value in self.checklist.items()
-                if key.startswith("public-trigger")
-            ]
-            if len(trigger) == 0:
-                return None
-            self.current_node = trigger[0]
+        node = self.plan.nodes[index]
+        details = self._taken.get(index)
+        if details is None:
+            details = self._taken[index] = TaskDetails.from_plan(node)
         else:
-            next_nodes = self.current_node.nextCodes
-            if len(next_nodes) != 0:
-                self.current_node = copy.deepcopy(self.checklist[next_nodes[0]])
-            else:
-                return None
-        return self.current_node
+            details.reset(node)
+        return details
@@ -0,0 +1,215 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import threading
+from collections import OrderedDict
+
+from script.log import SLog
+from ability.common import platform as PLATFORM
+from ability.component.router import BaseRouter
+from ability.core.binding import compile_bindings
+
+TAG = "Plan"
+
+
+class PlanNode:
+    """
+    编译后的只读节点，运行期可变状态放在 TaskDetails 覆盖层中
+    """
+    __slots__ = ("index", "id", "nodeType", "nodeCode", "platform", "displayName",
+                 "lastCodes", "nextCodes", "data", "handler", "bindings", "wanted")
+
+    def __init__(self, index, case_info: dict):
+        self.index = index
+        self.id = case_info["id"]
+        self.nodeType = case_info["nodeType"]
+        self.nodeCode = case_info["nodeCode"]
+        self.platform = case_info["platform"] if case_info.get("platform") else PLATFORM.COMMON
+        self.displayName = case_info["displayName"]
+        self.lastCodes = tuple(case_info["lastCodes"])
+        self.nextCodes = tuple(case_info["nextCodes"])
+        self.data = case_info["data"]
+        # 预先解析的组件类，执行时直接实例化
+        self.handler = BaseRouter.resolve(self.nodeCode)
+        # 预先编译的参数绑定，按组件 META 声明的类型转换
+        self.bindings = compile_bindings(self.data, getattr(self.handler, "META", None))
+        # 下游实际引用的输出变量，编译完全部节点后填充
+        self.wanted = frozenset()
+
+
+class Plan:
+    """
+    工作流执行计划: 节点按整数下标存放，后继/前驱表预先计算
+    """
+    __slots__ = ("nodes", "index", "root", "successors", "predecessors", "back_edges", "unresolved")
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.index = {node.id: node.index for node in nodes}
+        self.root = None
+        self.successors = ()
+        self.predecessors = ()
+        # 回边 (指向祖先节点的边)，用于识别循环，不参与汇合计数
+        self.back_edges = frozenset()
+        # 引用了不存在节点的参数，运行前报错
+        self.unresolved = ()
+
+    def reachable(self, index):
+        """
+        沿前向边可达的全部节点 (包含自身)
+        """
+        result, stack = {index}, [index]
+        while stack:
+            for target in self.successors[stack.pop()]:
+                if target not in result:
+                    result.add(target)
+                    stack.append(target)
+        return result
+
+    def upstream(self, region):
+        """
+        为 region 中的节点提供输入的区域外节点: 沿前驱边回溯，不进入 region
+        """
+        result, stack = set(), list(region)
+        while stack:
+            for source in self.predecessors[stack.pop()] or ():
+                if source not in region and source not in result:
+                    result.add(source)
+                    stack.append(source)
+        return result
+
+
+def compile_plan(checklist: dict) -> Plan:
+    """
+    解析节点 JSON，并根据 lastCodes/nextCodes 构建依赖图
+    """
+    nodes = []
+    for key, value in checklist.items():
+        # "_ui_meta"、"_pacing" 等下划线开头的键是工作流级配置，不是节点
+        if key.startswith("_"): continue
+        nodes.append(PlanNode(len(nodes), value))
+    plan = Plan(nodes)
+    plan.unresolved = tuple(check_references(plan))
+    collect_wanted(plan)
+
+    trigger = [node.index for node in nodes if node.id.startswith("public-trigger")]
+    if len(trigger) == 0:
+        SLog.w(TAG, "No trigger node found")
+        return plan
+    plan.root = trigger[0]
+
+    # 节点的全部出边: nextCodes 以及在 lastCodes 中声明了该节点的下游
+    edges = [[plan.index[code] for code in node.nextCodes if code in plan.index] for node in nodes]
+    for node in nodes:
+        for code in node.lastCodes:
+            source = plan.index.get(code)
+            if source is not None and node.index not in edges[source]:
+                edges[source].append(node.index)
+
+    # 迭代 DFS，栈上的节点为祖先，指向祖先的边即为回边；只保留从 root 可达的节点
+    successors = [None] * len(nodes)
+    back_edges = set()
+    visiting, visited = {plan.root}, set()
+    successors[plan.root] = []
+    stack = [(plan.root, iter(edges[plan.root]))]
+    while stack:
+        index, targets = stack[-1]
+        target = next(targets, None)
+        if target is None:
+            stack.pop()
+            visiting.discard(index)
+            visited.add(index)
+            continue
+        if target in visiting:
+            back_edges.add((index, target))
+            continue
+        successors[index].append(target)
+        if target not in visited:
+            visiting.add(target)
+            successors[target] = []
+            stack.append((target, iter(edges[target])))
+
+    predecessors = [None if value is None else [] for value in successors]
+    for index, targets in enumerate(successors):
+        for target in targets or ():
+            predecessors[target].append(index)
+
+    plan.successors = tuple(None if value is None else tuple(value) for value in successors)
+    plan.predecessors = tuple(None if value is None else tuple(value) for value in predecessors)
+    plan.back_edges = frozenset(back_edges)
+    return plan
+
+
+def check_references(plan):
+    """
+    检查参数中的变量引用: 引用不存在的节点返回错误，引用未声明的输出只记录警告
+    """
+    errors = []
+    for node in plan.nodes:
+        for name, binding in node.bindings.items():
+            for ref in binding.refs():
+                if ref.node_id.startswith("$"):
+                    continue  # 运行级变量 (如 $row) 在运行开始时写入
+                source = plan.index.get(ref.node_id)
+                if source is None:
+                    errors.append(f"Node [{node.id}] param [{name}] references unknown node [{ref.node_id}]")
+                    continue
+                meta = getattr(plan.nodes[source].handler, "META", None) or {}
+                outputs = {item.get("key") for item in meta.get("outputVars", []) if isinstance(item, dict)}
+                # 输出名由节点配置决定的组件 (如 cfs/call 的 outputs 映射)
+                mapped = plan.nodes[source].data.get("outputs") if isinstance(plan.nodes[source].data, dict) else None
+                if isinstance(mapped, dict):
+                    outputs |= set(mapped)
+                if outputs and ref.var_name not in outputs:
+                    SLog.w(TAG, f"Node [{node.id}] param [{name}] references undeclared output [{ref.node_id}.{ref.var_name}]")
+    return errors
+
+
+def collect_wanted(plan):
+    """
+    统计每个节点被下游引用的输出变量，组件据此跳过无人使用的附加输出
+    """
+    wanted = {}
+    for node in plan.nodes:
+        for binding in node.bindings.values():
+            for ref in binding.refs():
+                wanted.setdefault(ref.node_id, set()).add(ref.var_name)
+    for node in plan.nodes:
+        node.wanted = frozenset(wanted.get(node.id, ()))
+
+
+class PlanCache:
+    """
+    按 (workflow id, updated_at) 缓存编译结果，重复执行时跳过解析
+    """
+
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        # 编译串行执行，并发请求同一计划 (如 cfs/call 的 map 模式) 时只编译一次
+        self._compile_lock = threading.Lock()
+
+    def get(self, key, checklist: dict) -> Plan:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+        with self._compile_lock:
+            with self._lock:
+                plan = self._plans.get(key)
+            if plan is not None:
+                return plan
+            plan = compile_plan(checklist)
+            with self._lock:
+                self._plans[key] = plan
+                while len(self._plans) > self.capacity:
+                    self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,160 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import hashlib
+import threading
+
+from script.log import SLog
+from ability.manager import Manager
+import ability.common.platform as platform_code
+
+TAG = "Pacing"
+
+# 旧版本每个节点之后固定等待的时长，用于统计节省的时间
+LEGACY_DELAY = 0.3
+
+# 不会改变界面的节点: 执行后无需等待界面稳定
+PASSIVE_CATEGORIES = {"api", "cfs", "memory"}
+PASSIVE_CODES = {
+    "public/trigger", "public/screenshot", "public/ocr", "public/dump_dom",
+    "mobile/dump_dom", "mobile/dump_hierarchy", "mobile/find", "mobile/wait",
+    "web/find_element", "web/get_local_storage", "web/save_screen",
+    "win/dump_hierarchy",
+}
+
+# 稳定策略
+#   none:      不等待
+#   fixed:     固定等待 delay 秒
+#   screen:    连续两次截图一致即视为稳定
+#   hierarchy: 连续两次布局一致即视为稳定
+# prefetch: 界面稳定后在后台为下一个节点预取截图/布局 (引擎需支持 capture)
+#
+# 界面节点默认与旧版本一致固定等待 LEGACY_DELAY 秒 (非界面节点不再等待)；
+# 按界面稳定等待的策略尚未在各类设备上实测，需要在工作流中选用
+DEFAULT_POLICY = {
+    platform_code.MOBILE: {"strategy": "fixed", "delay": LEGACY_DELAY},
+    platform_code.WEB: {"strategy": "fixed", "delay": LEGACY_DELAY},
+    platform_code.PC: {"strategy": "fixed", "delay": LEGACY_DELAY},
+    platform_code.COMMON: {"strategy": "none"},
+}
+
+# "_pacing" 中某个平台写为 "adaptive" 时使用的策略
+ADAPTIVE_POLICY = {
+    platform_code.MOBILE: {"strategy": "screen", "interval": 0.15, "timeout": 1.5, "prefetch": True},
+    platform_code.WEB: {"strategy": "hierarchy", "interval": 0.1, "timeout": 1.0},
+    platform_code.PC: {"strategy": "screen", "interval": 0.1, "timeout": 1.0},
+}
+
+
+def is_passive(node_code):
+    if not node_code:
+        return True
+    code = node_code.strip("/")
+    return code.split("/")[0] in PASSIVE_CATEGORIES or code in PASSIVE_CODES
+
+
+class Pacing:
+    """
+    节点间节奏控制: 非界面节点不等待，界面动作之后按平台策略等待界面稳定
+
+    工作流级覆盖写在 nodes 的 "_pacing" 中，例如:
+        {"mobile": "adaptive", "web": {"strategy": "hierarchy", "timeout": 2}, "pc": {"delay": 0.5}}
+    """
+
+    def __init__(self, overrides=None):
+        self.policy = {lane: dict(value) for lane, value in DEFAULT_POLICY.items()}
+        for lane, value in (overrides or {}).items():
+            if value == "adaptive" and lane in ADAPTIVE_POLICY:
+                self.policy[lane] = dict(ADAPTIVE_POLICY[lane])
+            elif isinstance(value, dict):
+                self.policy.setdefault(lane, {}).update(value)
+        self._lock = threading.Lock()
+        self.nodes = 0
+        self.spent = 0.0
+
+    def settle(self, lane, node):
+        start = time.perf_counter()
+        if not is_passive(node.nodeCode):
+            # 通道名为 "类别" 或 "类别@设备"，策略按类别
+            family = lane.partition("@")[0]
+            policy = self.policy.get(family) or self.policy[platform_code.COMMON]
+            try:
+                self._invalidate(node)
+                self._wait(node, policy)
+                if policy.get("prefetch"):
+                    self._prefetch(node)
+            except Exception as e:
+                SLog.w(TAG, f"Settle failed on [{lane}]: {e}")
+        with self._lock:
+            self.nodes += 1
+            self.spent += time.perf_counter() - start
+
+    def _wait(self, node, policy):
+        strategy = policy.get("strategy", "none")
+        if strategy == "fixed":
+            time.sleep(float(policy.get("delay", LEGACY_DELAY)))
+        elif strategy in ("screen", "hierarchy"):
+            engine = self._engine(node)
+            if engine is None:
+                return
+            sample = self._screen_hash if strategy == "screen" else self._hierarchy_hash
+            self._wait_stable(engine, sample, float(policy.get("interval", 0.1)), float(policy.get("timeout", 1.0)))
+
+    @staticmethod
+    def _wait_stable(engine, sample, interval, timeout):
+        deadline = time.perf_counter() + timeout
+        last = sample(engine)
+        while time.perf_counter() < deadline:
+            time.sleep(interval)
+            current = sample(engine)
+            if current is not None and current == last:
+                return True
+            last = current
+        return False
+
+    def _invalidate(self, node):
+        # 组件可能绕过引擎方法直接操作 driver，界面节点执行后一律视为界面已变化，丢弃之前的采集结果
+        engine = self._engine(node)
+        if engine is not None:
+            engine.screen.invalidate()
+
+    def _prefetch(self, node):
+        engine = self._engine(node)
+        if engine is not None and engine.PREFETCH and hasattr(engine, "capture"):
+            engine.screen.prefetch(engine.PREFETCH, engine.capture)
+
+    @staticmethod
+    def _engine(node):
+        # 只取节点已经使用过的引擎，不为节奏控制创建新引擎
+        return Manager().engine_for(node, create=False)
+
+    @staticmethod
+    def _screen_hash(engine):
+        # 支持 capture 的引擎把稳定判断用的截图留给下一个节点
+        if hasattr(engine, "capture"):
+            img = engine.screen.refresh("screenshot", engine.capture)
+        else:
+            img = engine.screenshot()
+        if img is None or not hasattr(img, "tobytes"):
+            return None
+        # 缩略图比较，忽略细微噪点并降低哈希开销
+        thumb = img.convert("L").resize((64, 64))
+        return hashlib.md5(thumb.tobytes()).hexdigest()
+
+    @staticmethod
+    def _hierarchy_hash(engine):
+        if hasattr(engine, "dump_hierarchy"):
+            content = engine.dump_hierarchy()
+        elif engine.driver is not None and hasattr(engine.driver, "page_source"):
+            content = engine.driver.page_source
+        else:
+            return None
+        return hashlib.md5(str(content).encode("utf-8", errors="ignore")).hexdigest()
+
+    def summary(self):
+        saved = self.nodes * LEGACY_DELAY - self.spent
+        return {
+            "nodes": self.nodes,
+            "settle_seconds": round(self.spent, 3),
+            "saved_seconds": round(saved, 3),
+        }
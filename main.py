@@ -116,7 +116,19 @@ async def lifespan(app: FastAPI):
     # 初始化数据库
     Base.metadata.create_all(bind=engine)
     LogBase.metadata.create_all(bind=log_engine)
+    # 日志全文索引: 创建并为已有日志补建索引 (后台执行，不阻塞启动)
+    import threading
+    from server.services.log_service import ensure_search_index
+    threading.Thread(target=ensure_search_index, name="log-search-index", daemon=True).start()
+    # 预热常驻执行进程池
+    from driver.agent.pool import pool
+    pool.start()
+    # 定期执行日志/运行记录的保留策略、文件清理和数据库压缩
+    from server.services.maintenance_service import maintenance
+    maintenance.start()
     yield
+    maintenance.stop()
+    pool.stop()
 
 app = FastAPI(lifespan=lifespan)
 
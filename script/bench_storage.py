@@ -0,0 +1,137 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+"""
+数据库写入基准: N 个进程同时模拟运行 (每个节点写日志和检查点)，比较默认设置与 server.core.storage 的调优设置
+
+    python -m script.bench_storage --runs 8 --nodes 50 --logs 20
+
+  - default: SQLite 默认设置 (回滚日志)，每个节点直接提交日志和检查点
+  - tuned:   WAL 等 PRAGMA，日志和检查点经 WriteQueue 由单个写入线程按批提交
+
+数据库建在临时目录中，不影响应用数据
+"""
+import os
+import time
+import pickle
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from server.core.storage import PRAGMAS, WriteQueue, create_sqlite_engine
+from server.core.database import Base
+from server.core.log_database import LogBase
+from server.models.log import WorkflowLog
+from server.models.workflow import Workflow  # noqa: F401 (workflow_run 的外键依赖)
+from server.models.workflow_run import WorkflowRunCheckpoint
+
+MODES = {
+    "default": {"busy_timeout": 5000},
+    "tuned": PRAGMAS,
+}
+
+
+def _simulate(folder, mode, index, nodes, logs, results):
+    pragmas = MODES[mode]
+    main_engine = create_sqlite_engine(os.path.join(folder, "autobots.db"), "autobots", pragmas=pragmas)
+    log_engine = create_sqlite_engine(os.path.join(folder, "logs.db"), "logs", pragmas=pragmas)
+    Session, LogSession = sessionmaker(bind=main_engine), sessionmaker(bind=log_engine)
+    run_writer, log_writer = WriteQueue(Session, "run"), WriteQueue(LogSession, "log")
+    run_id = f"bench-{index}"
+    outputs = pickle.dumps({"text": "x" * 200, "items": list(range(50))})
+    errors = 0
+
+    def write(session_factory, queue, job):
+        nonlocal errors
+        if queue is not None:
+            queue.submit(job)
+            return
+        db = session_factory()
+        try:
+            job(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+
+    tuned = mode == "tuned"
+    started = time.perf_counter()
+    for node in range(nodes):
+        rows = [{"run_id": run_id, "flow_id": "1", "node_id": f"n{node}", "level": "INFO", "tag": "Bench",
+                 "message": f"node {node} step {line} " + "m" * 80, "created_at": datetime.now()}
+                for line in range(logs)]
+        write(LogSession, log_writer if tuned else None,
+              lambda db, rows=rows: db.execute(WorkflowLog.__table__.insert(), rows))
+        write(Session, run_writer if tuned else None,
+              lambda db, node=node: db.add(WorkflowRunCheckpoint(run_uuid=run_id, node_id=f"n{node}",
+                                                                 outputs=outputs, result={"success": True})))
+    run_writer.flush(60)
+    log_writer.flush(60)
+    elapsed = time.perf_counter() - started
+    from server.core.storage import metrics
+    stats = metrics()
+    results.put({
+        "elapsed": elapsed,
+        "rows": nodes * (logs + 1),
+        "errors": errors + run_writer.failed + log_writer.failed,
+        "locked": sum(item["locked_errors"] for item in stats.values()),
+        "lock_waits": sum(item["lock_waits"] for item in stats.values()),
+        "max_lock_wait_ms": max(item["max_lock_wait_ms"] for item in stats.values()),
+    })
+
+
+def bench(mode, runs, nodes, logs):
+    folder = tempfile.mkdtemp(prefix=f"bench-{mode}-")
+    for metadata, name in ((Base.metadata, "autobots"), (LogBase.metadata, "logs")):
+        engine = create_sqlite_engine(os.path.join(folder, f"{name}.db"), f"bench-{name}", pragmas=MODES[mode])
+        metadata.create_all(bind=engine)
+        engine.dispose()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=_simulate, args=(folder, mode, index, nodes, logs, results))
+                 for index in range(runs)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    items = [results.get() for _ in processes]
+    wall = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    rows = sum(item["rows"] for item in items)
+    return {
+        "mode": mode,
+        "rows": rows,
+        "wall_s": round(wall, 2),
+        "rows_per_s": int(rows / max(max(item["elapsed"] for item in items), 1e-6)),
+        "errors": sum(item["errors"] for item in items),
+        "locked": sum(item["locked"] for item in items),
+        "lock_waits": sum(item["lock_waits"] for item in items),
+        "max_lock_wait_ms": max(item["max_lock_wait_ms"] for item in items),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite write throughput with concurrent runs")
+    parser.add_argument("--runs", type=int, default=8, help="concurrent runs (processes)")
+    parser.add_argument("--nodes", type=int, default=50, help="nodes per run (one checkpoint each)")
+    parser.add_argument("--logs", type=int, default=20, help="log lines per node")
+    parser.add_argument("--mode", choices=["default", "tuned", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["default", "tuned"] if args.mode == "both" else [args.mode]
+    print(f"{args.runs} runs x {args.nodes} nodes x ({args.logs} logs + 1 checkpoint)")
+    print(f"{'mode':<8} {'rows':>8} {'wall_s':>7} {'rows/s':>8} {'errors':>7} {'locked':>7} "
+          f"{'waits':>6} {'max_wait_ms':>11}")
+    for mode in modes:
+        r = bench(mode, args.runs, args.nodes, args.logs)
+        print(f"{r['mode']:<8} {r['rows']:>8} {r['wall_s']:>7} {r['rows_per_s']:>8} {r['errors']:>7} "
+              f"{r['locked']:>7} {r['lock_waits']:>6} {r['max_lock_wait_ms']:>11}")
+
+
+if __name__ == "__main__":
+    main()
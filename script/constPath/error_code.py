@@ -4,12 +4,22 @@ from enum import Enum
 
 # 1000 - 1999 engine error
 # 2000 - 2999 component error
+# 4000 - 4999 run error
 
 class ErrorCode(Enum):
     ENGINE_ERROR_NOT_FOUND_CHROME                   =   (1000, "Google browser is not installed on this computer!!!")
 
     COMPONENT_ERROR_FOUND_ELEMENT_TIMEOUT           =   (3000, "Find element timeout Failed!")
 
+    RUN_ERROR_NODE_TIMEOUT                          =   (4000, "Node execution exceeded its deadline!")
+    RUN_ERROR_RUN_TIMEOUT                           =   (4001, "Run exceeded its deadline!")
+    RUN_ERROR_UNRESOLVED_REFERENCE                  =   (4002, "Workflow has unresolved variable references!")
+    RUN_ERROR_CALL_NOT_FOUND                        =   (4003, "Called workflow not found!")
+    RUN_ERROR_CALL_TOO_DEEP                         =   (4004, "Sub-workflow calls nested too deep!")
+    RUN_ERROR_CALL_FAILED                           =   (4005, "Sub-workflow call failed!")
+    RUN_ERROR_LOOP_LIMIT                            =   (4006, "Loop re-entered too many times!")
+    RUN_ERROR_CALL_BAD_OUTPUTS                      =   (4007, "Call outputs must map names to sub-workflow variable paths!")
+
     def __init__(self, code, message):
         self.code = code
         self.message = message
@@ -1,6 +1,5 @@
 import logging
 import os
-import threading
 from datetime import datetime
 import contextvars  # <--- [新增]
 
@@ -17,21 +16,20 @@ YELLOW = "\033[93m"
 WHITE = "\033[37m"
 LIGHT_WHITE = "\033[97m"
 
+COLORS = {'D': WHITE, 'I': LIGHT_WHITE, 'W': YELLOW, 'E': RED}
+
 class LogFormatter(logging.Formatter):
     def format(self, record):
-        date_str = datetime.now().strftime("%m-%d %H:%M:%S.") + datetime.now().strftime("%f")[:3]
-        process_id = os.getpid()
-        thread_id = threading.get_ident()
+        # 使用记录创建时的时间、进程和线程，不再重复取当前时间
+        date_str = datetime.fromtimestamp(record.created).strftime("%m-%d %H:%M:%S.") + f"{int(record.msecs):03d}"
         level = record.levelname[0]
         tag = getattr(record, 'tag', 'default_tag')
-
-        if level == 'D': color = WHITE
-        elif level == 'I': color = LIGHT_WHITE
-        elif level == 'W': color = YELLOW
-        elif level == 'E': color = RED
-        else: color = RESET
-
-        return f"{color}{date_str}  {process_id}  {thread_id} {level} {tag}: {record.getMessage()}{RESET}"
+        color = COLORS.get(level, RESET)
+        fields = getattr(record, 'fields', None)
+        message = record.getMessage()
+        if fields:
+            message += "".join(f"  {key}={value}" for key, value in fields.items() if value is not None)
+        return f"{color}{date_str}  {record.process}  {record.thread} {level} {tag}: {message}{RESET}"
 
 # 配置基础 Logger (只负责控制台输出)
 logger = logging.getLogger("AndroidLog")
@@ -40,45 +38,111 @@ console_handler = logging.StreamHandler()
 console_handler.setFormatter(LogFormatter())
 logger.addHandler(console_handler)
 
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+
+def _level_of(level):
+    if isinstance(level, int):
+        return level
+    return LEVELS[str(level).lower()]
+
+
+# 控制台默认只输出 INFO 及以上，DEBUG 日志不再格式化；排查问题时可用环境变量打开，
+# 如 MINIORANGE_CONSOLE_LEVEL=debug，或在代码中调用 SLog.set_level(console="debug")
+CONSOLE_LEVEL = LEVELS.get(os.environ.get("MINIORANGE_CONSOLE_LEVEL", "").strip().lower(), logging.INFO)
+
+
 # ================= 3. SLog 类改造 =================
 class SLog:
+    """
+    日志输出到控制台和数据库回调两个出口，各自有级别阈值:
+      - message 可以是字符串、%-格式字符串加 args，或返回字符串的函数，
+        只有至少一个出口接受该级别时才会生成 (大对象不必在调用处先转成字符串)
+      - 关键字参数为结构化字段 (node_id / duration_ms / engine 及其他)，
+        写入数据库时作为独立的列，不拼接在消息中
+
+      SLog.d(TAG, "实际值: left=%r, right=%r", left, right)
+      SLog.i(TAG, "识别完成", duration_ms=35, engine="ocr")
+    """
     # 定义一个类变量，用来存回调函数
     _db_write_callback = None
+    # 控制台与数据库的级别阈值
+    console_level = CONSOLE_LEVEL
+    db_level = logging.INFO
 
     @classmethod
     def set_log_callback(cls, callback):
         """
         供外部(主进程或子进程Wrapper)调用，注入写入数据库的方法
+        callback(run_id, flow_id, node_id, level, tag, message, fields)
         """
         cls._db_write_callback = callback
 
     @classmethod
-    def _log(cls, level, tag, message):
+    def set_level(cls, console=None, db=None):
+        """
+        设置级别阈值，可以是 'debug' / 'info' / 'warning' / 'error' 或 logging 的级别常量
+        """
+        if console is not None:
+            cls.console_level = _level_of(console)
+        if db is not None:
+            cls.db_level = _level_of(db)
+
+    @classmethod
+    def enabled(cls, level):
+        """
+        是否有出口接受该级别，调用处需要额外计算 (而非仅拼接消息) 时可先判断
+        """
+        level = _level_of(level)
+        if level >= cls.console_level:
+            return True
+        return level >= cls.db_level and cls._db_write_callback is not None and current_run_id.get() is not None
+
+    @classmethod
+    def _log(cls, level, tag, message, args=(), fields=None):
+        levelno = LEVELS[level]
+        to_console = levelno >= cls.console_level
+        run_id = None
+        if levelno >= cls.db_level and cls._db_write_callback:
+            run_id = current_run_id.get()
+        if not to_console and not run_id:
+            return
+
+        try:
+            if callable(message):
+                message = message()
+            elif args:
+                message = message % args
+        except Exception as e:
+            message = f"{message!r} {args!r} (format error: {e})"
+
         # --- A. 原有的控制台输出 ---
-        extra = {'tag': tag}
-        if level == 'debug': logger.debug(message, extra=extra)
-        elif level == 'info': logger.info(message, extra=extra)
-        elif level == 'warning': logger.warning(message, extra=extra)
-        elif level == 'error': logger.error(message, extra=extra)
+        if to_console:
+            logger.log(levelno, "%s", message, extra={'tag': tag, 'fields': fields})
 
         # --- B. [新增] 数据库回调逻辑 ---
         # 只有当 set_log_callback 被调用过，且上下文里有 run_id 时才写入
-        run_id = current_run_id.get()
-        if cls._db_write_callback and run_id:
+        if run_id:
             try:
+                fields = dict(fields) if fields else {}
                 flow_id = current_flow_id.get()
-                node_id = current_node_id.get()
+                node_id = fields.pop('node_id', None) or current_node_id.get()
                 # 调用注入的回调函数
-                cls._db_write_callback(run_id, flow_id, node_id, level.upper(), tag, message)
+                cls._db_write_callback(run_id, flow_id, node_id, level.upper(), tag, message, fields)
             except Exception:
                 pass # 忽略日志写入错误，防止影响业务
 
-    # 静态方法接口保持不变
+    # 静态方法接口保持不变，新增可选的格式参数和结构化字段
     @staticmethod
-    def d(tag, message): SLog._log('debug', tag, message)
+    def d(tag, message, *args, **fields): SLog._log('debug', tag, message, args, fields)
     @staticmethod
-    def i(tag, message): SLog._log('info', tag, message)
+    def i(tag, message, *args, **fields): SLog._log('info', tag, message, args, fields)
     @staticmethod
-    def w(tag, message): SLog._log('warning', tag, message)
+    def w(tag, message, *args, **fields): SLog._log('warning', tag, message, args, fields)
     @staticmethod
-    def e(tag, message): SLog._log('error', tag, message)
\ No newline at end of file
+    def e(tag, message, *args, **fields): SLog._log('error', tag, message, args, fields)
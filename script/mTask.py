@@ -1 +1,12 @@
-report = {}
\ No newline at end of file
+report = {}
+
+# 运行事件监听器，例如常驻进程把节点进度转发给主进程
+listeners = []
+
+
+def emit(event, **info):
+    for listener in listeners:
+        try:
+            listener(event, info)
+        except Exception:
+            pass  # 监听器异常不影响任务执行
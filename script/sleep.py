@@ -1,13 +1,11 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
 
-import asyncio
+import time
 
 
 
 def mSleep(seconds):
-    async def _sleep(seconds):
-        await asyncio.sleep(seconds)  # 非阻塞等待
-
-    asyncio.run(_sleep(seconds))
-
+    # 直接阻塞当前线程，不再为每次等待创建新的事件循环
+    if seconds and seconds > 0:
+        time.sleep(seconds)
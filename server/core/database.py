@@ -1,8 +1,8 @@
 import os
 import sys
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from server.core.storage import create_sqlite_engine
 
 # 1. 🔥 核心修复：使用系统用户数据目录 (User Data Directory)
 # 解决软件更新后数据丢失的问题。数据将存储在:
@@ -41,11 +41,8 @@ DB_PATH = os.path.join(DATA_DIR, "autobots.db")
 # 使用 3 个斜杠 /// 表示绝对路径
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-# --- 以下代码保持不变 ---
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+# API 进程和执行进程共用数据库文件: WAL、busy_timeout 等设置见 server.core.storage
+engine = create_sqlite_engine(DB_PATH, "autobots")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
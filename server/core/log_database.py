@@ -1,9 +1,9 @@
 # server/app/core/log_database.py
 import os
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from server.core.database import APP_DATA_DIR
+from server.core.storage import create_sqlite_engine
 
 # 1. 使用统一的用户数据目录，确保日志在更新后不丢失
 DATA_DIR = os.path.join(APP_DATA_DIR, "data")
@@ -16,10 +16,7 @@ DB_PATH = os.path.join(DATA_DIR, "logs.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 # 4. 【关键修改】变量名加 Log 前缀，防止导入时搞混
-log_engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} # SQLite 必须加这个
-)
+log_engine = create_sqlite_engine(DB_PATH, "logs")
 
 # 独立的 Session 和 Base
 LogSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=log_engine)
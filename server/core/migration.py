@@ -1,9 +1,14 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
 import os
+import gzip
+import json
 import uuid
+import pickle
 import sqlite3
+from datetime import datetime
 from script.log import SLog
+from ability.core.artifact import references
 from server.core.database import APP_DATA_DIR
 
 TAG = "Migration"
@@ -53,9 +58,30 @@ def _check_and_migrate(db_path):
             ],
             'tasks': [
                 ('uid', 'TEXT', None),
-                ('result_summary', 'JSON', None)
+                ('result_summary', 'JSON', None),
+                ('workflow_ids', 'JSON', None)
+            ],
+            'workflow_run': [
+                ('parent_uuid', 'TEXT', None)
+            ],
+            'workflow_logs': [
+                ('duration_ms', 'INTEGER', None),
+                ('engine', 'TEXT', None),
+                ('extra', 'JSON', None)
+            ]
+        }
+
+        # 索引: '表名': [('索引名', '字段')]，以及被替代后删除的旧索引
+        index_changes = {
+            'workflow_run': [
+                ('ix_workflow_run_parent_uuid', 'parent_uuid')
+            ],
+            'workflow_logs': [
+                ('ix_workflow_logs_run_id_id', 'run_id, id'),
+                ('ix_workflow_logs_run_id_node_id', 'run_id, node_id')
             ]
         }
+        dropped_indexes = ['ix_workflow_logs_run_id']
 
         for table, columns in schema_changes.items():
             # 1. 检查表是否存在
@@ -88,6 +114,96 @@ def _check_and_migrate(db_path):
                     elif col_name == 'app_id':
                         cursor.execute(f"UPDATE {table} SET {col_name} = 'default_app' WHERE {col_name} IS NULL")
 
+        for table, indexes in index_changes.items():
+            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'")
+            if not cursor.fetchone():
+                continue
+            cursor.execute(f"PRAGMA index_list({table})")
+            existing_indexes = {row[1] for row in cursor.fetchall()}
+            for index_name, index_columns in indexes:
+                if index_name not in existing_indexes:
+                    SLog.i(TAG, f"🛠️ Migrating: Creating index '{index_name}' on table '{table}' in {os.path.basename(db_path)}")
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({index_columns})")
+            for index_name in dropped_indexes:
+                if index_name in existing_indexes:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+        _create_run_files(cursor, db_path)
+
         conn.commit()
     finally:
         conn.close()
+
+
+def _create_run_files(cursor, db_path):
+    """
+    新增运行文件引用表 (workflow_run_file) 时，从已有的检查点、结果摘要和日志 (含归档) 中补齐引用，
+    否则升级后第一次清理会删除旧运行仍在使用的文件
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='workflow_run'")
+    if not cursor.fetchone():
+        return
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='workflow_run_file'")
+    if cursor.fetchone():
+        return
+    SLog.i(TAG, f"🛠️ Migrating: Creating table 'workflow_run_file' in {os.path.basename(db_path)}")
+    # 与 server.models.workflow_run.WorkflowRunFile 一致
+    cursor.execute("CREATE TABLE workflow_run_file (id INTEGER NOT NULL, run_uuid VARCHAR, name VARCHAR, "
+                   "kind VARCHAR, created_at DATETIME, PRIMARY KEY (id), UNIQUE (run_uuid, name))")
+    cursor.execute("CREATE INDEX ix_workflow_run_file_run_uuid ON workflow_run_file (run_uuid)")
+    cursor.execute("CREATE INDEX ix_workflow_run_file_name ON workflow_run_file (name)")
+
+    files = {}
+
+    def add(run_uuid, value):
+        if run_uuid and value:
+            references(value, files.setdefault(run_uuid, {}))
+
+    cursor.execute("PRAGMA table_info(workflow_run)")
+    if "result_summary" in {row[1] for row in cursor.fetchall()}:
+        for run_uuid, summary in cursor.execute("SELECT run_uuid, result_summary FROM workflow_run").fetchall():
+            add(run_uuid, summary)
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='workflow_run_checkpoint'")
+    if cursor.fetchone():
+        for run_uuid, outputs, result in cursor.execute(
+                "SELECT run_uuid, outputs, result FROM workflow_run_checkpoint").fetchall():
+            add(run_uuid, result)
+            try:
+                add(run_uuid, pickle.loads(outputs) if outputs else None)
+            except Exception:
+                add(run_uuid, bytes(outputs).decode("utf-8", "ignore"))
+
+    # 日志库和归档文件与主库在同一目录 (见 server.services.log_service)
+    data_dir = os.path.dirname(db_path)
+    log_path = os.path.join(data_dir, "logs.db")
+    if os.path.exists(log_path):
+        log_conn = sqlite3.connect(log_path)
+        try:
+            rows = log_conn.execute("SELECT run_id, message FROM workflow_logs "
+                                    "WHERE message LIKE '%uploads%' OR message LIKE '%/file/%'").fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            log_conn.close()
+        for run_id, message in rows:
+            add(run_id, message)
+    archive_dir = os.path.join(data_dir, "archive")
+    if os.path.isdir(archive_dir):
+        for root, _, names in os.walk(archive_dir):
+            for name in names:
+                if not name.endswith(".jsonl.gz"):
+                    continue
+                try:
+                    with gzip.open(os.path.join(root, name), "rt", encoding="utf-8") as f:
+                        for line in f:
+                            if "uploads" in line or "/file/" in line:
+                                add(name[:-len(".jsonl.gz")], json.loads(line).get("message"))
+                except (OSError, ValueError) as e:
+                    SLog.w(TAG, f"Read archive {name} failed: {e}")
+
+    now = datetime.now().isoformat(sep=" ")
+    rows = [(run_uuid, name, kind, now) for run_uuid, names in files.items() for name, kind in names.items()]
+    cursor.executemany("INSERT OR IGNORE INTO workflow_run_file (run_uuid, name, kind, created_at) "
+                       "VALUES (?, ?, ?, ?)", rows)
+    SLog.i(TAG, f"   -> Backfilled {len(rows)} file references")
+
@@ -0,0 +1,276 @@
+# server/core/storage.py
+import time
+import queue
+import atexit
+import threading
+
+from sqlalchemy import create_engine, event
+
+from script.log import SLog
+
+TAG = "Storage"
+
+# 每个连接建立时设置的 PRAGMA (API 进程和各执行进程同时读写同一个数据库文件):
+#   - WAL: 读不阻塞写、写不阻塞读，多个写入方仍然串行
+#   - busy_timeout: 等待其他进程释放写锁的最长时间 (毫秒)，超时才报 database is locked
+#   - synchronous=NORMAL: WAL 模式下只在检查点时 fsync，断电最多丢失最近提交的事务，不会损坏数据库
+#   - mmap_size / cache_size: 读取走内存映射，每个连接 16MB 页缓存 (负数表示 KB)
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 10000,
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,
+    "temp_store": "MEMORY",
+}
+
+# 单次写入耗时超过该值 (毫秒) 计为一次锁等待
+LOCK_WAIT_MS = 50
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# name -> engine，metrics() 汇总
+_engines = {}
+
+
+class _Stats:
+    """
+    单个引擎的计数: 连接池的使用情况，以及每个事务第一条写语句的耗时 (包含等待写锁的时间)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.peak_checked_out = 0
+        self.checked_out = 0
+        self.writes = 0
+        self.write_ms = 0.0
+        self.lock_waits = 0
+        self.lock_wait_ms = 0.0
+        self.max_lock_wait_ms = 0.0
+        self.locked_errors = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "peak_checked_out": self.peak_checked_out,
+                "transactions": self.writes,
+                "avg_begin_write_ms": round(self.write_ms / self.writes, 2) if self.writes else 0.0,
+                "lock_waits": self.lock_waits,
+                "lock_wait_ms": round(self.lock_wait_ms, 1),
+                "max_lock_wait_ms": round(self.max_lock_wait_ms, 1),
+                "locked_errors": self.locked_errors,
+            }
+
+
+def apply_pragmas(dbapi_connection, pragmas=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for key, value in (PRAGMAS if pragmas is None else pragmas).items():
+            cursor.execute(f"PRAGMA {key}={value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(path, name, pragmas=None, pool_size=5, max_overflow=10, **kwargs):
+    """
+    创建 SQLite 引擎: 连接时设置 PRAGMA，并记录连接池和锁等待指标 (见 metrics)
+    pragmas 为 None 时使用 PRAGMAS
+    """
+    pragmas = PRAGMAS if pragmas is None else pragmas
+    timeout = pragmas.get("busy_timeout", 5000) / 1000
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": timeout},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        **kwargs
+    )
+    stats = _Stats()
+    engine.storage_stats = stats
+    _engines[name] = engine
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+        with stats.lock:
+            stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        with stats.lock:
+            stats.checkouts += 1
+            stats.checked_out += 1
+            stats.peak_checked_out = max(stats.peak_checked_out, stats.checked_out)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        with stats.lock:
+            stats.checked_out = max(stats.checked_out - 1, 0)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # 事务中的第一条写语句需要取得写锁，其他进程持有写锁时在这里等待
+        if statement.lstrip()[:7].upper().startswith(_WRITES) \
+                and not conn.connection.dbapi_connection.in_transaction:
+            conn.info["storage_write_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("storage_write_start", None)
+        if started is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        with stats.lock:
+            stats.writes += 1
+            stats.write_ms += elapsed
+            if elapsed >= LOCK_WAIT_MS:
+                stats.lock_waits += 1
+                stats.lock_wait_ms += elapsed
+                stats.max_lock_wait_ms = max(stats.max_lock_wait_ms, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            context.connection.info.pop("storage_write_start", None)
+        if "database is locked" in str(context.original_exception):
+            with stats.lock:
+                stats.locked_errors += 1
+
+    return engine
+
+
+def metrics() -> dict:
+    """
+    当前进程中各数据库的连接池状态和锁等待统计
+    """
+    result = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        data = engine.storage_stats.snapshot()
+        data["pool"] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        }
+        result[name] = data
+    return result
+
+
+class WriteQueue:
+    """
+    单写入线程: 高频写入 (检查点、运行状态) 放入队列，由后台线程按批在一个事务中执行，
+    同一进程内的写入不再互相争抢写锁，每批只提交一次
+
+    - submit(job): job(db) 在写入线程中执行，不需要提交；调用方不等待结果
+    - 同一批中某个 job 失败时回滚整批，再逐个重试，只丢弃失败的 job
+    - flush() 等待已提交的写入完成 (运行结束、进程退出时调用)
+    """
+
+    def __init__(self, session_factory, name, capacity=10000, batch_size=200, interval=0.05):
+        self.session_factory = session_factory
+        self.name = name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=capacity)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+            self._thread.start()
+        atexit.unregister(self.close)
+        atexit.register(self.close)
+
+    def submit(self, job):
+        """
+        队列已满时阻塞等待，检查点和运行状态不能丢弃
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        self._queue.put(job)
+
+    def flush(self, timeout=10):
+        """
+        等待已提交的写入完成，返回是否在 timeout 秒内完成
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        self.flush(timeout)
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            jobs, waiters = [], []
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                jobs.append(item)
+                if len(jobs) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if jobs:
+                self._execute(jobs)
+            for waiter in waiters:
+                waiter.set()
+
+    def _execute(self, jobs):
+        db = self.session_factory()
+        try:
+            try:
+                for job in jobs:
+                    job(db)
+                db.commit()
+                self.written += len(jobs)
+                self.batches += 1
+                return
+            except Exception:
+                db.rollback()
+            for job in jobs:
+                try:
+                    job(db)
+                    db.commit()
+                    self.written += 1
+                except Exception as e:
+                    db.rollback()
+                    self.failed += 1
+                    SLog.e(TAG, f"{self.name} write failed: {e}")
+        finally:
+            db.close()
+
+    def snapshot(self):
+        return {"queued": self._queue.qsize(), "written": self.written, "batches": self.batches,
+                "failed": self.failed}
@@ -1,16 +1,24 @@
 # server/app/models/rLog.py
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
 from datetime import datetime
 from server.core.log_database import LogBase
 
 class WorkflowLog(LogBase):
     __tablename__ = "workflow_logs"
+    # 按运行分页 (id 游标) 和按节点筛选，(run_id, id) 同时覆盖按 run_id 的查询
+    __table_args__ = (
+        Index("ix_workflow_logs_run_id_id", "run_id", "id"),
+        Index("ix_workflow_logs_run_id_node_id", "run_id", "node_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    run_id = Column(String, index=True)       # 运行批次ID
+    run_id = Column(String)                   # 运行批次ID
     flow_id = Column(String, index=True)      # 哪个工作流
     node_id = Column(String, nullable=True)   # 哪个节点
     tag = Column(String, nullable=True)       # 标签
     level = Column(String, default="INFO")    # INFO, ERROR
     message = Column(Text)                    # 日志内容
+    duration_ms = Column(Integer, nullable=True)  # 耗时 (毫秒)
+    engine = Column(String, nullable=True)    # 执行引擎
+    extra = Column(JSON(none_as_null=True), nullable=True)  # 其他结构化字段
     created_at = Column(DateTime, default=datetime.now)
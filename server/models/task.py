@@ -1,7 +1,7 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
 import uuid
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, JSON
 from datetime import datetime
 from server.core.database import Base
 
@@ -18,5 +18,9 @@ class Task(Base):
     pass_rate = Column(Integer, default=0)
     completed_count = Column(Integer, default=0)
     total_count = Column(Integer, default=0)
+    # 任务包含的工作流 id 列表
+    workflow_ids = Column(JSON, nullable=True)
+    # 最近一次执行的汇总: 每个工作流的结果、每台设备的负载
+    result_summary = Column(JSON, nullable=True)
     start_time = Column(DateTime)
     created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
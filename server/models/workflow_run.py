@@ -1,5 +1,5 @@
 # models/workflow_run.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float,JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, JSON, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from server.core.database import Base
@@ -16,6 +16,9 @@ class WorkflowRun(Base):
     # 业务ID：用来和日志系统(logs.db)关联的唯一UUID
     run_uuid = Column(String, unique=True, index=True)
 
+    # 数据集运行中每一行的子运行指向父运行的 run_uuid
+    parent_uuid = Column(String, nullable=True, index=True)
+
     # 核心统计字段
     status = Column(String, default="pending")  # pending, running, success, failed
     trigger_type = Column(String, default="manual")  # manual(手动), schedule(定时), api(接口)
@@ -29,4 +32,39 @@ class WorkflowRun(Base):
     result_summary = Column(JSON, nullable=True)
 
     # 建立反向关系
-    workflow = relationship("Workflow", back_populates="runs")
\ No newline at end of file
+    workflow = relationship("Workflow", back_populates="runs")
+
+
+class WorkflowRunCheckpoint(Base):
+    """
+    节点完成时的检查点: 节点写入的变量和执行结果，用于从失败节点恢复执行
+    """
+    __tablename__ = "workflow_run_checkpoint"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_uuid = Column(String, index=True)
+    node_id = Column(String)
+
+    # 节点写入 Memory 的变量 (pickle，大变量为 artifact 引用)
+    outputs = Column(LargeBinary, nullable=True)
+    # TaskResult 以及节点实际走向的 nextCodes
+    result = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class WorkflowRunFile(Base):
+    """
+    运行引用的文件: 写入检查点、结果摘要和日志时记录 artifact 摘要和 uploads 中的文件名，
+    运行被删除前 (包括日志归档之后) 这些文件不会被清理
+    """
+    __tablename__ = "workflow_run_file"
+    __table_args__ = (UniqueConstraint("run_uuid", "name"),)
+
+    id = Column(Integer, primary_key=True)
+    run_uuid = Column(String, index=True)
+    name = Column(String, index=True)
+    kind = Column(String)  # artifact, upload
+
+    created_at = Column(DateTime, default=datetime.now)
+
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from ..core.log_database import get_log_db
 from ..models.log import WorkflowLog
+from ..services import log_service
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
@@ -29,11 +31,59 @@ def create_log(
     db.commit()
     return  {"code": 200, "msg": "ok"}
 
-# 2. 查询日志 (供前端看板调用)
+# 2. 全文搜索 (需在 /{run_id} 之前注册)
+# q 按子串匹配，至少 3 个字符；by_run=true 时按运行汇总命中数
+@router.get("/search", response_model=dict)
+def search_logs(
+    q: str,
+    start: datetime = None,
+    end: datetime = None,
+    workflow_id: str = None,
+    level: str = None,
+    by_run: bool = False,
+    limit: int = Query(50, ge=1, le=log_service.MAX_PAGE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_log_db)
+):
+    try:
+        result = log_service.search_logs(q, start=start, end=end, workflow_id=workflow_id, level=level,
+                                         by_run=by_run, limit=limit, offset=offset, db=db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"code": 200, **result}
+
+
+# 3. 查询运行日志 (供前端看板调用)
+#   - 不带分页参数: 旧格式，按时间升序的日志列表，最多 LIST_LIMIT 条，超出时响应头 X-Has-More: true
+#   - 带 limit / cursor / 筛选参数: 按 id 游标分页，下一页传入返回的 next_cursor；tail=true 时返回最新的 limit 条
 @router.get("/{run_id}")
-def read_logs(run_id: str, db: Session = Depends(get_log_db)):
-    logs = db.query(WorkflowLog)\
-             .filter(WorkflowLog.run_id == run_id)\
-             .order_by(WorkflowLog.created_at.asc())\
-             .all()
-    return logs
\ No newline at end of file
+def read_logs(
+    run_id: str,
+    response: Response,
+    limit: int = Query(None, ge=1, le=log_service.MAX_PAGE),
+    cursor: int = None,
+    level: str = None,
+    tag: str = None,
+    node_id: str = None,
+    tail: bool = False,
+    db: Session = Depends(get_log_db)
+):
+    if limit is None and cursor is None and not (level or tag or node_id or tail):
+        logs = log_service.list_logs(run_id, limit=log_service.LIST_LIMIT + 1, db=db)
+        if len(logs) > log_service.LIST_LIMIT:
+            response.headers["X-Has-More"] = "true"
+            logs = logs[:log_service.LIST_LIMIT]
+        return logs
+    page = log_service.query_logs(run_id, after_id=cursor, limit=limit or log_service.PAGE_SIZE, level=level,
+                                  tag=tag, node_id=node_id, tail=tail, db=db)
+    page["next_cursor"] = page.pop("next_after_id")
+    return {"code": 200, **page}
+
+
+# 4. 单条日志的完整内容 (列表中被截断的消息)，已归档运行的日志需要传 run_id
+@router.get("/message/{log_id}", response_model=dict)
+def read_log_message(log_id: int, run_id: str = None, db: Session = Depends(get_log_db)):
+    log = log_service.get_log(log_id, run_id=run_id, db=db)
+    if not log:
+        raise HTTPException(status_code=404, detail="日志不存在")
+    return {"code": 200, "data": log}
\ No newline at end of file
@@ -1,13 +1,17 @@
 # !/usr/bin/env python
 # -*-coding:utf-8 -*-
 import uuid
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from server.core.database import get_db
 from server.models.task import Task
+from server.services.task_service import TaskRun, tasks, lease_devices, release_devices, device_status
+
+# 常驻执行进程池 (由 driver.agent.actuator.process_runner_wrapper 执行任务)
+from driver.agent.pool import pool
 
 router = APIRouter(prefix="/task", tags=["Task Management"])
 
@@ -15,6 +19,11 @@ class TaskCreate(BaseModel):
     app_id: str
     name: str
     type: str
+    workflow_ids: List[int] = []
+
+class TaskRunCreate(BaseModel):
+    # 指定设备序列号，为空时使用全部已连接的空闲设备
+    devices: List[str] = []
 
 @router.post("/create")
 def create_task(item: TaskCreate, db: Session = Depends(get_db)):
@@ -23,6 +32,7 @@ def create_task(item: TaskCreate, db: Session = Depends(get_db)):
         app_id=item.app_id,
         name=item.name,
         type=item.type,
+        workflow_ids=item.workflow_ids,
         status="pending",
         created_at=datetime.now()
     )
@@ -50,4 +60,44 @@ def list_tasks(
         query = query.filter(Task.name.contains(keyword))
         
     tasks = query.order_by(Task.created_at.desc()).all()
-    return tasks
\ No newline at end of file
+    return tasks
+
+
+@router.get("/devices")
+def list_devices():
+    """
+    已连接的 Android 设备以及是否被任务占用
+    """
+    return {"code": 200, "data": device_status()}
+
+
+@router.post("/{task_id}/run")
+def run_task(task_id: str, item: TaskRunCreate = None, db: Session = Depends(get_db)):
+    """
+    在多台设备上并行执行任务中的工作流，按历史耗时最长优先分配
+    """
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if task_id in tasks:
+        return {"code": 400, "msg": "任务正在执行"}
+    if not task.workflow_ids:
+        return {"code": 400, "msg": "任务未包含工作流"}
+
+    devices = lease_devices(item.devices if item else None)
+    if not devices:
+        return {"code": 400, "msg": "没有可用的设备"}
+    try:
+        started = TaskRun(pool, task_id, task.workflow_ids, devices).start()
+    except Exception:
+        release_devices(devices)
+        raise
+    if not started:
+        release_devices(devices)
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    return {
+        "code": 200,
+        "message": "Task started",
+        "data": {"workflows": len(task.workflow_ids), "devices": devices}
+    }
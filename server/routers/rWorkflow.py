@@ -3,16 +3,17 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 import json
-from multiprocessing import Process
 import uuid
 
 from server.core.database import get_db
 from server.models.workflow import Workflow
 from server.models.workflow_run import WorkflowRun
 from server.schemas.workflow import WorkflowCreate, WorkflowItem, WorkflowDetail, WorkflowSave, WorkflowSaveSimple
+from server.schemas.run import DatasetRunCreate
+from server.services.dataset_service import DatasetRun, parse_rows
 
-# 引入你的包装器
-from driver.agent.actuator import process_runner_wrapper
+# 常驻执行进程池 (由 driver.agent.actuator.process_runner_wrapper 执行任务)
+from driver.agent.pool import pool
 
 router = APIRouter(prefix="/workflow", tags=["Workflow"])
 
@@ -164,25 +165,71 @@ def run_workflow(workflow_id: str, db: Session = Depends(get_db)):
         "nodes": nodes_json,  #
         "updated_at": wf.updated_at
     }
-    # 3. 创建子进程
-    # target 指向包装器，args 把真正的脚本函数传进去
-    p = Process(
-        target=process_runner_wrapper,
-        args=(data, run_id, workflow_id)
-    )
+    # 3. 投递到常驻进程池，由预热好的进程执行
+    pool.submit(data, run_id, workflow_id)
 
-    # 4. 启动进程 (非阻塞，瞬间完成)
-    p.start()
-
-    # 5. 立刻返回，前端不需要等待脚本跑完
+    # 4. 立刻返回，前端不需要等待脚本跑完
     return {
         "code": 200,
         "message": "Task started",
         "run_id": run_id,
-        "pid": p.pid
+        "pid": None
+    }
+
+
+@router.post("/{workflow_id}/dataset_run")
+def run_workflow_dataset(workflow_id: str, item: DatasetRunCreate, db: Session = Depends(get_db)):
+    """
+    数据集运行: 每行作为运行级变量 {{$row.字段}} 执行一次工作流，结果汇总到父运行
+    """
+    wf = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    if not wf:
+        raise HTTPException(status_code=404, detail="工作流不存在")
+
+    try:
+        rows = parse_rows(item.rows, item.csv)
+    except Exception as e:
+        return {"code": 400, "msg": f"数据集解析失败: {e}"}
+    if not rows:
+        return {"code": 400, "msg": "数据集为空"}
+
+    try:
+        nodes_json = json.loads(wf.nodes) if wf.nodes else {}
+    except json.JSONDecodeError:
+        nodes_json = {}
+    data = {
+        "id": wf.id,
+        "name": wf.name,
+        "nodes": nodes_json,
+        "updated_at": wf.updated_at
+    }
+    parent_uuid = DatasetRun(pool, data, wf.id, rows, item.concurrency).start()
+
+    return {
+        "code": 200,
+        "message": "Dataset run started",
+        "run_id": parent_uuid,
+        "data": {"rows": len(rows), "concurrency": item.concurrency}
     }
 
 
+@router.get("/pool")
+def get_pool_status():
+    """
+    进程池状态: 池大小、回收策略以及每个进程的运行次数/内存
+    """
+    return {"code": 200, "data": pool.snapshot()}
+
+
+@router.get("/storage")
+def get_storage_metrics():
+    """
+    数据库指标: 主进程的连接池和锁等待统计，以及各执行进程上一次运行结束时上报的统计
+    """
+    from server.core.storage import metrics
+    workers = {worker["pid"]: worker.get("storage") for worker in pool.snapshot()["workers"]}
+    return {"code": 200, "data": {"server": metrics(), "workers": workers}}
+
 
 @router.get("/dom")
 def get_dom():
@@ -242,20 +289,13 @@ def get_dom():
             }
         },
     }
-    # 3. 创建子进程
-    # target 指向包装器，args 把真正的脚本函数传进去
-    p = Process(
-        target=process_runner_wrapper,
-        args=(data, run_id, "dump_dom")
-    )
+    # 3. 投递到常驻进程池
+    pool.submit(data, run_id, "dump_dom")
 
-    # 4. 启动进程 (非阻塞，瞬间完成)
-    p.start()
-
-    # 5. 立刻返回，前端不需要等待脚本跑完
+    # 4. 立刻返回，前端不需要等待脚本跑完
     return {
         "code": 200,
         "message": "Task started",
         "run_id": run_id,
-        "pid": p.pid
-    }
\ No newline at end of file
+        "pid": None
+    }
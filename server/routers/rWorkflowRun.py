@@ -1,11 +1,14 @@
 # app/routers/rWorkflow.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 import json
+import uuid
 
 from server.core.database import get_db
-from server.models.workflow_run import WorkflowRun
+from server.models.workflow import Workflow
+from server.models.workflow_run import WorkflowRun, WorkflowRunCheckpoint
 from server.schemas.run import RunList
+from driver.agent.pool import pool
 
 router = APIRouter(prefix="/workflow_run", tags=["Workflow run"])
 
@@ -62,4 +65,74 @@ def get_workflow_run_detail(run_uuid: str, db: Session = Depends(get_db)):
             "duration": wf.duration,
             "result_summary": wf.result_summary
         }
-    }
\ No newline at end of file
+    }
+
+@router.post("/{run_uuid}/cancel")
+def cancel_workflow_run(run_uuid: str, db: Session = Depends(get_db)):
+    """
+    取消排队中或执行中的任务
+    """
+    state = pool.cancel(run_uuid)
+    if state is None:
+        wf = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == run_uuid).first()
+        if not wf:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return {"code": 400, "msg": f"任务已结束: {wf.status}"}
+
+    return {"code": 200, "msg": "任务已取消", "data": {"run_uuid": run_uuid, "state": state}}
+
+
+@router.post("/{run_uuid}/resume")
+def resume_workflow_run(run_uuid: str, from_node: str = Query(..., alias="from"), db: Session = Depends(get_db)):
+    """
+    从指定节点恢复执行: 还原上一次运行在检查点中保存的变量，只执行该节点及其下游
+    """
+    run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == run_uuid).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if run.status == "pending":
+        return {"code": 400, "msg": "任务仍在执行中"}
+    if ((run.result_summary or {}).get("_run") or {}).get("archived"):
+        return {"code": 400, "msg": "任务已归档，检查点已清理，无法恢复"}
+
+    wf = db.query(Workflow).filter(Workflow.id == run.workflow_id).first()
+    if not wf:
+        raise HTTPException(status_code=404, detail="工作流不存在")
+    try:
+        nodes_json = json.loads(wf.nodes) if wf.nodes else {}
+    except json.JSONDecodeError:
+        nodes_json = {}
+    if from_node not in nodes_json:
+        return {"code": 400, "msg": f"节点不存在: {from_node}"}
+
+    checkpoints = db.query(WorkflowRunCheckpoint.node_id).filter(WorkflowRunCheckpoint.run_uuid == run_uuid).count()
+    new_run_id = str(uuid.uuid4())
+    data = {
+        "id": wf.id,
+        "name": wf.name,
+        "nodes": nodes_json,
+        "updated_at": wf.updated_at,
+        "resume": {"run_uuid": run_uuid, "node_id": from_node}
+    }
+    # 数据集子运行的当前行、任务运行的设备
+    context = ((run.result_summary or {}).get("_run") or {}).get("context") or {}
+    data.update(context)
+    pool.submit(data, new_run_id, wf.id)
+
+    return {
+        "code": 200,
+        "message": "Task resumed",
+        "run_id": new_run_id,
+        "data": {"from": from_node, "checkpoints": checkpoints}
+    }
+
+
+@router.post("/maintenance")
+def run_maintenance(force: bool = False):
+    """
+    立即执行一次维护: 归档/删除过期的运行、清理无引用的文件、压缩数据库
+    force=true 时即使有任务在执行也压缩数据库
+    """
+    from server.services.maintenance_service import maintenance
+    stats = maintenance.run_once(force=force)
+    return {"code": 200, "data": stats}
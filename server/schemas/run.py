@@ -1,6 +1,6 @@
 # server/schemas/run.py
 from pydantic import BaseModel, ConfigDict # 导入 ConfigDict
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
 
 class RunCreate(BaseModel):
@@ -8,6 +8,14 @@ class RunCreate(BaseModel):
     params: Optional[Dict[str, Any]] = {}
 
 
+class DatasetRunCreate(BaseModel):
+    # 数据集: JSON 行列表，或带表头的 CSV 文本 (二选一)
+    rows: Optional[List[Dict[str, Any]]] = None
+    csv: Optional[str] = None
+    # 同时执行的行数
+    concurrency: int = 2
+
+
 class RunResponse(BaseModel):
     run_id: str
     status: str
@@ -0,0 +1,112 @@
+# server/services/dataset_service.py
+import io
+import csv
+import uuid
+import threading
+from datetime import datetime
+
+from server.core.database import SessionLocal
+from server.models.workflow_run import WorkflowRun
+from script.log import SLog
+
+TAG = "DatasetRun"
+
+# 正在执行的数据集运行: parent_uuid -> DatasetRun
+datasets = {}
+
+
+def parse_rows(rows=None, csv_text=None):
+    """
+    数据集: JSON 行列表，或带表头的 CSV 文本
+    """
+    if rows:
+        return [dict(row) for row in rows]
+    if csv_text:
+        return [dict(row) for row in csv.DictReader(io.StringIO(csv_text.strip()))]
+    return []
+
+
+class DatasetRun:
+    """
+    用同一个工作流逐行执行数据集: 每行一个子运行，最多 concurrency 行同时执行，全部结束后汇总到父运行
+    """
+
+    def __init__(self, pool, workflow_data, workflow_id, rows, concurrency=2):
+        self.pool = pool
+        self.workflow_data = workflow_data
+        self.workflow_id = workflow_id
+        self.rows = rows
+        self.concurrency = max(1, int(concurrency))
+        self.parent_uuid = str(uuid.uuid4())
+        self.children = []
+        self.done = 0
+        self._slots = threading.Semaphore(self.concurrency)
+        self._lock = threading.Lock()
+
+    def start(self):
+        db = SessionLocal()
+        try:
+            db.add(WorkflowRun(
+                workflow_id=self.workflow_id,
+                run_uuid=self.parent_uuid,
+                status="pending",
+                trigger_type="dataset",
+                start_time=datetime.now(),
+                result_summary={"_run": {"dataset": {"rows": len(self.rows), "concurrency": self.concurrency}}}
+            ))
+            db.commit()
+        finally:
+            db.close()
+        datasets[self.parent_uuid] = self
+        threading.Thread(target=self._dispatch, name=f"dataset-{self.parent_uuid[:8]}", daemon=True).start()
+        return self.parent_uuid
+
+    def _dispatch(self):
+        for row in self.rows:
+            self._slots.acquire()
+            child_uuid = str(uuid.uuid4())
+            with self._lock:
+                self.children.append(child_uuid)
+            data = dict(self.workflow_data, row=row, parent_uuid=self.parent_uuid, trigger="dataset")
+            self.pool.submit(data, child_uuid, self.workflow_id, callback=self._on_done)
+
+    def _on_done(self, child_uuid):
+        self._slots.release()
+        with self._lock:
+            self.done += 1
+            finished = self.done == len(self.rows)
+        if finished:
+            self._finalize()
+
+    def _finalize(self):
+        db = SessionLocal()
+        try:
+            runs = {run.run_uuid: run for run in
+                    db.query(WorkflowRun).filter(WorkflowRun.parent_uuid == self.parent_uuid).all()}
+            results = []
+            for index, child_uuid in enumerate(self.children):
+                run = runs.get(child_uuid)
+                results.append({
+                    "row": index,
+                    "run_uuid": child_uuid,
+                    "status": run.status if run else "missing",
+                    "duration": run.duration if run else None,
+                })
+            passed = sum(1 for item in results if item["status"] == "success")
+            parent = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == self.parent_uuid).first()
+            if parent:
+                parent.end_time = datetime.now()
+                parent.duration = (parent.end_time - parent.start_time).total_seconds()
+                parent.status = "success" if passed == len(results) else "failed"
+                parent.result_summary = {
+                    "_run": {"dataset": {"rows": len(results), "concurrency": self.concurrency,
+                                         "passed": passed, "failed": len(results) - passed}},
+                    "rows": results,
+                }
+                db.commit()
+            SLog.i(TAG, f"Dataset run {self.parent_uuid} finished: {passed}/{len(results)} passed")
+        except Exception as e:
+            SLog.e(TAG, f"Dataset run {self.parent_uuid} summary failed: {e}")
+        finally:
+            db.close()
+            datasets.pop(self.parent_uuid, None)
@@ -0,0 +1,147 @@
+# server/services/event_service.py
+import asyncio
+import threading
+from datetime import datetime
+
+from server.core.database import SessionLocal
+from server.core.log_database import LogSessionLocal
+from server.models.log import WorkflowLog
+from server.models.workflow_run import WorkflowRun, WorkflowRunCheckpoint
+from server.services.log_service import read_archive
+from script.log import SLog
+
+TAG = "EventBus"
+
+# 订阅时从数据库补齐的最近日志条数
+BACKFILL_LOGS = 500
+# 每个订阅者缓存的消息数，客户端处理不过来时丢弃并标记 lagged，由客户端重新订阅补齐
+SUBSCRIBER_QUEUE = 1000
+
+
+class Subscription:
+    """
+    单个客户端对单次运行的订阅，消息在订阅者所在的事件循环中入队
+    """
+
+    def __init__(self, run_uuid, loop):
+        self.run_uuid = run_uuid
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self.lagged = False
+
+    def _put(self, events):
+        try:
+            self.queue.put_nowait(events)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+class RunEventBus:
+    """
+    运行事件总线 (主进程): 执行进程上报的事件经进程池监管线程 publish，按 run_uuid 分发给 WebSocket 订阅者
+    """
+
+    def __init__(self):
+        # run_uuid -> {Subscription}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, run_uuid) -> Subscription:
+        """
+        在事件循环中调用
+        """
+        subscription = Subscription(run_uuid, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(run_uuid, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.run_uuid)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.run_uuid]
+
+    def publish(self, run_uuid, events):
+        """
+        可在任意线程调用，没有订阅者时直接返回
+        """
+        if not events:
+            return
+        with self._lock:
+            subscriptions = list(self._subscribers.get(run_uuid, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, events)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(subscription)
+
+    def snapshot(self):
+        with self._lock:
+            return {run_uuid: len(subscriptions) for run_uuid, subscriptions in self._subscribers.items()}
+
+
+def backfill(run_uuid, limit=BACKFILL_LOGS):
+    """
+    订阅时的初始状态: 运行状态、已结束节点的结果和最近 limit 条日志，与实时事件的格式一致
+    """
+    events = []
+    db = SessionLocal()
+    try:
+        run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == run_uuid).first()
+        if run is not None:
+            if run.status == "pending":
+                # 执行中: 已完成节点的结果在检查点中
+                rows = db.query(WorkflowRunCheckpoint.node_id, WorkflowRunCheckpoint.result).filter(
+                    WorkflowRunCheckpoint.run_uuid == run_uuid
+                ).order_by(WorkflowRunCheckpoint.id).all()
+                results = {node_id: (result or {}).get("report") or {} for node_id, result in rows}
+            else:
+                results = {node_id: value for node_id, value in (run.result_summary or {}).items()
+                           if not node_id.startswith("_") and isinstance(value, dict)}
+            for node_id, result in results.items():
+                events.append({"type": "node_end", "node_id": node_id, "success": result.get("success"),
+                               "timestamp": result.get("timestamp"), "message": result.get("message")})
+            if run.status != "pending":
+                events.append({"type": "run_end", "status": run.status, "duration": run.duration})
+    finally:
+        db.close()
+
+    log_db = LogSessionLocal()
+    try:
+        rows = log_db.query(WorkflowLog).filter(WorkflowLog.run_id == run_uuid) \
+            .order_by(WorkflowLog.id.desc()).limit(limit + 1).all()
+    finally:
+        log_db.close()
+    truncated = len(rows) > limit
+    logs = [{
+        "type": "log",
+        "id": row.id,
+        "node_id": row.node_id,
+        "level": row.level,
+        "tag": row.tag,
+        "message": row.message,
+        "time": row.created_at.timestamp() if row.created_at else None
+    } for row in reversed(rows[:limit])]
+    if not rows:
+        # 已归档的运行从归档文件补齐
+        archived = read_archive(run_uuid) or []
+        truncated = len(archived) > limit
+        logs = [{
+            "type": "log",
+            "id": row["id"],
+            "node_id": row.get("node_id"),
+            "level": row.get("level"),
+            "tag": row.get("tag"),
+            "message": row.get("message"),
+            "time": datetime.fromisoformat(row["created_at"]).timestamp() if row.get("created_at") else None
+        } for row in archived[-limit:]]
+    if truncated:
+        SLog.d(TAG, "Backfill of run %s truncated to %d logs", run_uuid, limit)
+    return {"events": events + logs, "truncated": truncated}
+
+
+event_bus = RunEventBus()
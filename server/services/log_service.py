@@ -0,0 +1,590 @@
+# server/services/log_service.py
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ability.core.artifact import references
+from server.core.log_database import LogSessionLocal, DATA_DIR
+from server.models.log import WorkflowLog
+from server.services import run_service
+from script.log import SLog
+
+TAG = "LogWriter"
+
+# 列表中每条消息返回的最大字符数，完整内容通过 get_log 获取
+MESSAGE_PREVIEW = 2000
+# 默认每页条数 / 每页条数上限
+PAGE_SIZE = 200
+MAX_PAGE = 1000
+# 不分页读取运行日志 (旧接口) 时最多返回的条数
+LIST_LIMIT = 10000
+
+# 日志全文索引: FTS5 外部内容表 (内容在 workflow_logs 中)，trigram 分词支持中文和任意子串匹配
+FTS_TABLE = "workflow_logs_fts"
+# 已建立索引的最大日志 id，写入进程和启动时的补建按该游标增量建立索引
+FTS_STATE = "workflow_logs_fts_state"
+# 每个事务最多建立索引的日志条数，避免长时间占用写锁
+FTS_CHUNK = 5000
+# trigram 分词的最短查询长度
+MIN_QUERY = 3
+
+# 归档的运行日志: 每次运行一个 gzip 压缩的 JSON Lines 文件，日志接口可以直接读取
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+
+
+class LogWriter:
+    """
+    执行进程的日志写入: SLog 回调只把日志放入有界队列，由后台线程按批写入 logs.db
+
+    - 攒够 batch_size 条或距上次写入超过 interval 秒时写入一批 (一次提交)
+    - 队列超过 sample_at 比例时 DEBUG 日志只保留 1/sample_rate，队列已满时丢弃，调用方不会阻塞
+    - 丢弃的条数在队列恢复后按运行记录一条 WARNING
+    - 每次运行结束、进程退出 (atexit) 和被终止 (SIGTERM，见 driver.agent.pool) 时写入剩余日志
+    """
+
+    def __init__(self, capacity=10000, batch_size=500, interval=0.5, sample_at=0.5, sample_rate=10):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.sample_at = sample_at
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=capacity)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._sampled = 0
+        # run_id -> (flow_id, 丢弃条数)
+        self._dropped = {}
+        self.written = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+        atexit.unregister(self.close)
+        atexit.register(self.close)
+
+    def write(self, run_id, flow_id, node_id, level, tag, message, fields=None):
+        """
+        SLog 回调，签名与 SLog.set_log_callback 一致；duration_ms / engine 写入各自的列，其余字段写入 extra
+        """
+        if level == "DEBUG" and self._queue.qsize() >= self.capacity * self.sample_at:
+            self._sampled += 1
+            if self._sampled % self.sample_rate:
+                self._drop(run_id, flow_id)
+                return
+        row = {
+            "run_id": run_id,
+            "flow_id": flow_id,
+            "node_id": node_id,
+            "level": level,
+            "tag": tag,
+            "message": message,
+            "duration_ms": None,
+            "engine": None,
+            "extra": None,
+            "created_at": datetime.now()
+        }
+        if fields:
+            fields = dict(fields)
+            row["duration_ms"] = fields.pop("duration_ms", None)
+            row["engine"] = fields.pop("engine", None)
+            # extra 以 JSON 写入，无法序列化的值转为字符串，避免整批写入失败
+            row["extra"] = {key: value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+                            for key, value in fields.items()} or None
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._drop(run_id, flow_id)
+
+    def _drop(self, run_id, flow_id):
+        with self._lock:
+            _, count = self._dropped.get(run_id, (flow_id, 0))
+            self._dropped[run_id] = (flow_id, count + 1)
+
+    def flush(self, timeout=5):
+        """
+        等待已入队的日志写入完成，返回是否在 timeout 秒内完成
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        self.flush(timeout)
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def _run(self):
+        running = True
+        while running:
+            rows, waiters = [], []
+            deadline = time.monotonic() + self.interval
+            while len(rows) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                rows.append(item)
+            rows.extend(self._dropped_rows())
+            if rows:
+                self._insert(rows)
+            for waiter in waiters:
+                waiter.set()
+
+    def _dropped_rows(self):
+        with self._lock:
+            dropped, self._dropped = self._dropped, {}
+        now = datetime.now()
+        return [{
+            "run_id": run_id,
+            "flow_id": flow_id,
+            "node_id": None,
+            "level": "WARNING",
+            "tag": TAG,
+            "message": f"日志写入繁忙，丢弃 {count} 条日志",
+            "duration_ms": None,
+            "engine": None,
+            "extra": {"dropped": count},
+            "created_at": now
+        } for run_id, (flow_id, count) in dropped.items()]
+
+    def _insert(self, rows):
+        db = LogSessionLocal()
+        try:
+            db.execute(WorkflowLog.__table__.insert(), rows)
+            # 同一事务内为新日志建立全文索引
+            if search_available(db):
+                index_pending(db, max(FTS_CHUNK, len(rows)))
+            db.commit()
+            self.written += len(rows)
+        except Exception as e:
+            db.rollback()
+            # 写入失败时只输出到控制台，避免回调再次入队
+            SLog.e(TAG, f"Log Write Error ({len(rows)} rows): {e}")
+            return
+        finally:
+            db.close()
+        self._record_files(rows)
+
+    @staticmethod
+    def _record_files(rows):
+        """
+        日志中出现的上传文件 (如截图的保存路径) 记为运行的引用，日志归档后文件仍然保留
+        """
+        files = {}
+        for row in rows:
+            message = row.get("message")
+            if row.get("run_id") and isinstance(message, str) and ("uploads" in message or "/file/" in message):
+                references(message, files.setdefault(row["run_id"], {}))
+        files = {run_id: names for run_id, names in files.items() if names}
+        if files:
+            run_service.record_files(files)
+
+
+log_writer = LogWriter()
+
+# 全文索引是否可用: 只缓存可用的结果，不可用时每隔 60 秒重新检查 (服务启动时才创建)
+_search = {"available": False, "checked": 0.0}
+
+
+def search_available(db: Session) -> bool:
+    if _search["available"]:
+        return True
+    now = time.monotonic()
+    if _search["checked"] and now - _search["checked"] < 60:
+        return False
+    _search["checked"] = now
+    exists = db.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
+                        {"name": FTS_STATE}).first()
+    _search["available"] = exists is not None
+    return _search["available"]
+
+
+def index_pending(db: Session, chunk=FTS_CHUNK) -> int:
+    """
+    为游标之后的日志建立全文索引 (最多 chunk 条)，返回建立的条数，由调用方提交
+    先更新游标表取得写锁，多个进程同时执行时不会重复建立
+    """
+    db.execute(text(f"UPDATE {FTS_STATE} SET last_id = last_id"))
+    last_id = db.execute(text(f"SELECT last_id FROM {FTS_STATE}")).scalar() or 0
+    upto = db.execute(text(
+        f"SELECT max(id) FROM (SELECT id FROM workflow_logs WHERE id > :last ORDER BY id LIMIT :chunk)"
+    ), {"last": last_id, "chunk": chunk}).scalar()
+    if upto is None:
+        return 0
+    result = db.execute(text(
+        f"INSERT INTO {FTS_TABLE} (rowid, message) "
+        f"SELECT id, coalesce(message, '') FROM workflow_logs WHERE id > :last AND id <= :upto"
+    ), {"last": last_id, "upto": upto})
+    db.execute(text(f"UPDATE {FTS_STATE} SET last_id = :upto"), {"upto": upto})
+    return result.rowcount
+
+
+def ensure_search_index():
+    """
+    服务启动时调用: 创建全文索引表，并为已有日志分批补建索引 (可在后台线程执行)
+    SQLite 不支持 FTS5 或 trigram 时返回 False，搜索退化为 LIKE 扫描
+    """
+    db = LogSessionLocal()
+    try:
+        try:
+            db.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"message, content='workflow_logs', content_rowid='id', tokenize='trigram')"
+            ))
+        except Exception as e:
+            db.rollback()
+            SLog.w(TAG, f"Full-text search unavailable: {e}")
+            return False
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {FTS_STATE} (last_id INTEGER NOT NULL)"))
+        if db.execute(text(f"SELECT count(*) FROM {FTS_STATE}")).scalar() == 0:
+            db.execute(text(f"INSERT INTO {FTS_STATE} (last_id) VALUES (0)"))
+        # 删除日志 (清理、归档) 时同步删除已建立的索引，外部内容表需要原始内容才能删除；
+        # 末尾的日志被删除后 id 会被复用，游标退回到剩余的最大 id
+        db.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON workflow_logs "
+            f"WHEN old.id <= (SELECT last_id FROM {FTS_STATE}) BEGIN "
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, message) VALUES ('delete', old.id, coalesce(old.message, '')); "
+            f"UPDATE {FTS_STATE} SET last_id = min(last_id, (SELECT coalesce(max(id), 0) FROM workflow_logs)); "
+            f"END"
+        ))
+        db.commit()
+
+        start = time.time()
+        total = 0
+        while True:
+            count = index_pending(db)
+            db.commit()
+            if not count:
+                break
+            total += count
+        if total:
+            SLog.i(TAG, f"Full-text index built for {total} logs in {time.time() - start:.1f}s")
+        return True
+    finally:
+        db.close()
+
+
+def search_logs(q: str, start: datetime = None, end: datetime = None, workflow_id=None, level: str = None,
+                by_run: bool = False, limit: int = 50, offset: int = 0, db: Session = None) -> dict:
+    """
+    全文搜索日志，q 按短语 (子串) 匹配，结果按相关度 (bm25) 排序，snippet 中命中部分以 <mark> 标记
+      - start / end: 日志时间范围
+      - workflow_id / level: 逗号分隔的多个值
+      - by_run: 按运行汇总，返回每次运行的命中数和首末命中时间 (按最近命中排序)
+    """
+    q = (q or "").strip()
+    if len(q) < MIN_QUERY:
+        raise ValueError(f"搜索内容至少 {MIN_QUERY} 个字符")
+    close_session = False
+    if db is None:
+        db = LogSessionLocal()
+        close_session = True
+    try:
+        limit = max(1, min(int(limit or 1), MAX_PAGE))
+        params = {"limit": limit + 1, "offset": max(int(offset or 0), 0)}
+        conditions = []
+        if start is not None:
+            conditions.append("l.created_at >= :start")
+            params["start"] = str(start)
+        if end is not None:
+            conditions.append("l.created_at <= :end")
+            params["end"] = str(end)
+        for column, value in (("flow_id", workflow_id), ("level", level)):
+            values = _split(value)
+            if values:
+                names = [f"{column}_{index}" for index in range(len(values))]
+                conditions.append(f"l.{column} IN ({', '.join(':' + name for name in names)})")
+                params.update(zip(names, values))
+
+        if search_available(db):
+            # 整体作为一个短语，双引号转义
+            params["q"] = '"' + q.replace('"', '""') + '"'
+            source = f"{FTS_TABLE} JOIN workflow_logs l ON l.id = {FTS_TABLE}.rowid"
+            conditions.insert(0, f"{FTS_TABLE} MATCH :q")
+            snippet = f"snippet({FTS_TABLE}, 0, '<mark>', '</mark>', '...', 24)"
+            rank = f"bm25({FTS_TABLE})"
+        else:
+            params["q"] = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            source = "workflow_logs l"
+            conditions.insert(0, "l.message LIKE :q ESCAPE '\\'")
+            snippet = f"substr(l.message, 1, {MESSAGE_PREVIEW})"
+            rank = "-l.id"
+        where = " AND ".join(conditions)
+
+        if by_run:
+            rows = db.execute(text(
+                f"SELECT l.run_id, l.flow_id, count(*) AS hits, min(l.created_at) AS first_at, "
+                f"max(l.created_at) AS last_at FROM {source} WHERE {where} "
+                f"GROUP BY l.run_id ORDER BY last_at DESC LIMIT :limit OFFSET :offset"
+            ), params).mappings().all()
+        else:
+            rows = db.execute(text(
+                f"SELECT l.id, l.run_id, l.flow_id, l.node_id, l.level, l.tag, l.created_at, "
+                f"{snippet} AS snippet, {rank} AS rank FROM {source} WHERE {where} "
+                f"ORDER BY rank, l.id DESC LIMIT :limit OFFSET :offset"
+            ), params).mappings().all()
+        return {
+            "data": [dict(row) for row in rows[:limit]],
+            "has_more": len(rows) > limit
+        }
+    finally:
+        if close_session:
+            db.close()
+
+
+def _split(value):
+    """
+    筛选参数: 逗号分隔的多个值
+    """
+    if not value:
+        return []
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def query_logs(run_id: str, after_id: int = None, limit: int = PAGE_SIZE, level: str = None, tag: str = None,
+               node_id: str = None, tail: bool = False, db: Session = None) -> dict:
+    """
+    按运行分页查询日志 (id 游标)
+      - after_id: 只返回 id 大于该值的日志，下一页传入返回的 next_after_id
+      - tail: 返回最新的 limit 条 (仍按 id 升序)，之后用 next_after_id 继续追加
+      - level / tag / node_id: 逗号分隔的多个值
+    消息超过 MESSAGE_PREVIEW 个字符时截断并标记 truncated
+    """
+    close_session = False
+    if db is None:
+        db = LogSessionLocal()
+        close_session = True
+    try:
+        limit = max(1, min(int(limit or 1), MAX_PAGE))
+        if not db.query(WorkflowLog.id).filter(WorkflowLog.run_id == run_id).first():
+            archived = read_archive(run_id)
+            if archived is not None:
+                return _page_archive(archived, after_id, limit, level, tag, node_id, tail)
+        length = func.length(WorkflowLog.message)
+        query = db.query(
+            WorkflowLog.id, WorkflowLog.node_id, WorkflowLog.level, WorkflowLog.tag,
+            func.substr(WorkflowLog.message, 1, MESSAGE_PREVIEW).label("message"), length.label("length"),
+            WorkflowLog.duration_ms, WorkflowLog.engine, WorkflowLog.extra, WorkflowLog.created_at
+        ).filter(WorkflowLog.run_id == run_id)
+        for column, value in ((WorkflowLog.level, level), (WorkflowLog.tag, tag), (WorkflowLog.node_id, node_id)):
+            values = _split(value)
+            if values:
+                query = query.filter(column.in_(values))
+        if after_id is not None:
+            query = query.filter(WorkflowLog.id > after_id)
+
+        if tail:
+            rows = query.order_by(WorkflowLog.id.desc()).limit(limit).all()
+            rows.reverse()
+            has_more = False
+        else:
+            rows = query.order_by(WorkflowLog.id.asc()).limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+        data = [{
+            "id": row.id,
+            "node_id": row.node_id,
+            "level": row.level,
+            "tag": row.tag,
+            "message": row.message,
+            "truncated": (row.length or 0) > MESSAGE_PREVIEW,
+            "duration_ms": row.duration_ms,
+            "engine": row.engine,
+            "extra": row.extra,
+            "created_at": row.created_at
+        } for row in rows]
+        return {
+            "data": data,
+            "next_after_id": rows[-1].id if rows else after_id,
+            "has_more": has_more
+        }
+    finally:
+        if close_session:
+            db.close()
+
+
+def list_logs(run_id: str, limit: int = None, db: Session = None):
+    """
+    运行的日志 (按时间升序，消息不截断)，最多 limit 条，已归档的运行从归档文件读取
+    """
+    close_session = False
+    if db is None:
+        db = LogSessionLocal()
+        close_session = True
+    try:
+        query = db.query(WorkflowLog).filter(WorkflowLog.run_id == run_id) \
+            .order_by(WorkflowLog.created_at.asc(), WorkflowLog.id.asc())
+        logs = query.limit(limit).all() if limit else query.all()
+    finally:
+        if close_session:
+            db.close()
+    if logs:
+        return logs
+    return [dict(row, run_id=run_id) for row in (read_archive(run_id) or [])[:limit]]
+
+
+def _page_archive(rows, after_id, limit, level, tag, node_id, tail):
+    """
+    已归档运行的分页查询，参数和返回格式与 query_logs 一致
+    """
+    for key, value in (("level", level), ("tag", tag), ("node_id", node_id)):
+        values = _split(value)
+        if values:
+            rows = [row for row in rows if row.get(key) in values]
+    if after_id is not None:
+        rows = [row for row in rows if row["id"] > after_id]
+    if tail:
+        rows, has_more = rows[-limit:], False
+    else:
+        rows, has_more = rows[:limit], len(rows) > limit
+    data = [dict(row, message=(row.get("message") or "")[:MESSAGE_PREVIEW],
+                 truncated=len(row.get("message") or "") > MESSAGE_PREVIEW) for row in rows]
+    return {
+        "data": data,
+        "next_after_id": rows[-1]["id"] if rows else after_id,
+        "has_more": has_more,
+        "archived": True
+    }
+
+
+def _log_dict(log):
+    return {
+        "id": log.id,
+        "run_id": log.run_id,
+        "flow_id": log.flow_id,
+        "node_id": log.node_id,
+        "level": log.level,
+        "tag": log.tag,
+        "message": log.message,
+        "duration_ms": log.duration_ms,
+        "engine": log.engine,
+        "extra": log.extra,
+        "created_at": log.created_at.isoformat() if log.created_at else None
+    }
+
+
+def get_log(log_id: int, run_id: str = None, db: Session = None):
+    """
+    单条日志的完整内容，不存在时返回 None
+    指定 run_id 时只返回该运行的日志 (归档或删除后 id 可能被其他运行的日志重用)，并查找已归档的日志
+    """
+    close_session = False
+    if db is None:
+        db = LogSessionLocal()
+        close_session = True
+    try:
+        query = db.query(WorkflowLog).filter(WorkflowLog.id == log_id)
+        if run_id:
+            query = query.filter(WorkflowLog.run_id == run_id)
+        log = query.first()
+        if log is not None:
+            return _log_dict(log)
+    finally:
+        if close_session:
+            db.close()
+    if run_id:
+        for row in read_archive(run_id) or []:
+            if row["id"] == log_id:
+                return dict(row, run_id=run_id)
+    return None
+
+
+def archive_path(run_id: str) -> str:
+    name = os.path.basename(str(run_id))
+    return os.path.join(ARCHIVE_DIR, name[:2], f"{name}.jsonl.gz")
+
+
+def read_archive(run_id: str):
+    """
+    读取已归档运行的全部日志 (按 id 升序)，未归档时返回 None
+    """
+    path = archive_path(run_id)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def archive_logs(run_id: str, db: Session = None) -> int:
+    """
+    把运行的日志写入归档文件并从数据库删除 (全文索引由触发器同步删除)，返回归档的条数
+    文件写完后才删除数据库中的日志；重复归档时追加，已归档的 id 不会重复写入
+    """
+    close_session = False
+    if db is None:
+        db = LogSessionLocal()
+        close_session = True
+    try:
+        logs = db.query(WorkflowLog).filter(WorkflowLog.run_id == run_id).order_by(WorkflowLog.id.asc()).all()
+        if not logs:
+            return 0
+        path = archive_path(run_id)
+        archived = {row["id"] for row in read_archive(run_id) or []}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 追加为新的 gzip 成员，读取时自动连接
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for log in logs:
+                if log.id in archived:
+                    continue
+                row = _log_dict(log)
+                del row["run_id"]
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        db.query(WorkflowLog).filter(WorkflowLog.run_id == run_id).delete(synchronize_session=False)
+        db.commit()
+        return len(logs)
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        if close_session:
+            db.close()
+
+
+def delete_logs(run_id: str, db: Session = None) -> int:
+    """
+    删除运行在数据库中的日志和归档文件
+    """
+    close_session = False
+    if db is None:
+        db = LogSessionLocal()
+        close_session = True
+    try:
+        count = db.query(WorkflowLog).filter(WorkflowLog.run_id == run_id).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        if close_session:
+            db.close()
+    path = archive_path(run_id)
+    if os.path.exists(path):
+        os.remove(path)
+    return count
@@ -0,0 +1,340 @@
+# server/services/maintenance_service.py
+import os
+import re
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from ability.core.artifact import DIGEST
+from server.core.database import SessionLocal, engine, APP_DATA_DIR
+from server.core.log_database import LogSessionLocal, log_engine
+from server.models.log import WorkflowLog
+from server.models.workflow import Workflow
+from server.models.workflow_run import WorkflowRun, WorkflowRunCheckpoint, WorkflowRunFile
+from server.services import log_service
+from script.log import SLog
+
+TAG = "Maintenance"
+
+# 默认保留策略，工作流可以在 nodes 的 "_retention" 中覆盖部分字段:
+#   keep_runs: 每个工作流始终保留最近的 N 次运行 (日志、检查点都在数据库中)
+#   keep_days: 在该天数内结束的运行保留在数据库中，失败 (非 success) 的运行按 keep_failed_days
+#   purge_days: 超过该天数的运行连同归档日志一起删除，其余超出保留范围的运行只归档日志
+RETENTION = {
+    "keep_runs": 50,
+    "keep_days": 30,
+    "keep_failed_days": 90,
+    "purge_days": 365,
+}
+
+UPLOAD_DIR = os.path.join(APP_DATA_DIR, "uploads")
+ARTIFACT_DIR = os.path.join(APP_DATA_DIR, "artifacts")
+# 未被引用的上传文件和 artifact 超过该天数才删除 (执行中的运行可能尚未写入检查点)
+ARTIFACT_GRACE_DAYS = 7
+# 日志库中找不到运行记录的日志，超过该天数后删除
+ORPHAN_LOG_DAYS = 1
+# 每次增量回收的最大页数
+VACUUM_PAGES = 5000
+# 批量删除时每条 SQL 的参数个数
+CHUNK = 500
+
+# 运行数据 (运行记录、检查点、引用的文件) 由 workflow_run_file 记录引用，不再逐行扫描
+RUN_TABLES = {WorkflowRun.__tablename__, WorkflowRunCheckpoint.__tablename__, WorkflowRunFile.__tablename__}
+# 配置表中的文件名: 按路径分隔符、引号、空白等切分后的片段
+_TOKEN = re.compile(r"[^\s\\/\"'<>|?*:,;=()\[\]{}]+")
+
+
+def retention_policy(nodes) -> dict:
+    policy = dict(RETENTION)
+    config = (nodes or {}).get("_retention") if isinstance(nodes, dict) else None
+    if isinstance(config, dict):
+        for key in RETENTION:
+            if isinstance(config.get(key), (int, float)) and config[key] >= 0:
+                policy[key] = config[key]
+    return policy
+
+
+def plan_retention(runs, policy, now) -> dict:
+    """
+    runs: 同一工作流已结束的运行 [(run_uuid, parent_uuid, status, 结束时间)]，按开始时间倒序
+    返回 {run_uuid: "keep" / "archive" / "purge"}；数据集的子运行跟随父运行
+    """
+    plan = {}
+    index = 0
+    for run_uuid, parent_uuid, status, ended in runs:
+        if parent_uuid:
+            continue
+        age = (now - ended).total_seconds() / 86400 if ended else 0
+        keep_days = policy["keep_days"] if status == "success" else policy["keep_failed_days"]
+        if index < policy["keep_runs"] or age <= keep_days:
+            plan[run_uuid] = "keep"
+        elif age > policy["purge_days"]:
+            plan[run_uuid] = "purge"
+        else:
+            plan[run_uuid] = "archive"
+        index += 1
+    for run_uuid, parent_uuid, status, ended in runs:
+        if parent_uuid:
+            plan[run_uuid] = plan.get(parent_uuid, "keep")
+    return plan
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), CHUNK):
+        yield items[start:start + CHUNK]
+
+
+def apply_retention(now=None) -> dict:
+    """
+    按保留策略归档或删除已结束的运行:
+      - 归档: 日志写入归档文件后从日志库删除，删除检查点，运行记录、结果摘要和文件引用保留
+      - 删除: 删除运行记录、检查点、文件引用和日志 (含归档文件)
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=ORPHAN_LOG_DAYS)
+    stats = {"archived_runs": 0, "archived_logs": 0, "purged_runs": 0, "orphan_logs": 0, "orphan_files": 0}
+    db = SessionLocal()
+    try:
+        workflows = db.query(Workflow.id, Workflow.nodes).all()
+        for workflow_id, nodes in workflows:
+            try:
+                policy = retention_policy(json.loads(nodes) if nodes else {})
+            except (json.JSONDecodeError, TypeError):
+                policy = dict(RETENTION)
+            runs = db.query(WorkflowRun.run_uuid, WorkflowRun.parent_uuid, WorkflowRun.status,
+                            WorkflowRun.end_time, WorkflowRun.start_time).filter(
+                WorkflowRun.workflow_id == workflow_id,
+                WorkflowRun.status != "pending"
+            ).order_by(WorkflowRun.start_time.desc()).all()
+            plan = plan_retention([(run_uuid, parent_uuid, status, end_time or start_time)
+                                   for run_uuid, parent_uuid, status, end_time, start_time in runs], policy, now)
+
+            purge = [run_uuid for run_uuid, action in plan.items() if action == "purge"]
+            for run_uuids in _chunks(purge):
+                for run_uuid in run_uuids:
+                    log_service.delete_logs(run_uuid)
+                db.query(WorkflowRunCheckpoint).filter(WorkflowRunCheckpoint.run_uuid.in_(run_uuids)) \
+                    .delete(synchronize_session=False)
+                db.query(WorkflowRun).filter(WorkflowRun.run_uuid.in_(run_uuids)).delete(synchronize_session=False)
+                db.query(WorkflowRunFile).filter(WorkflowRunFile.run_uuid.in_(run_uuids)) \
+                    .delete(synchronize_session=False)
+                db.commit()
+            stats["purged_runs"] += len(purge)
+
+            archive = [run_uuid for run_uuid, action in plan.items() if action == "archive"]
+            for run_uuids in _chunks(archive):
+                for run in db.query(WorkflowRun).filter(WorkflowRun.run_uuid.in_(run_uuids)).all():
+                    summary = dict(run.result_summary or {})
+                    meta = dict(summary.get("_run") or {})
+                    if meta.get("archived"):
+                        continue
+                    count = log_service.archive_logs(run.run_uuid)
+                    db.query(WorkflowRunCheckpoint).filter(WorkflowRunCheckpoint.run_uuid == run.run_uuid) \
+                        .delete(synchronize_session=False)
+                    meta["archived"] = {"logs": count, "at": now.isoformat(timespec="seconds")}
+                    summary["_run"] = meta
+                    # 重新赋值，JSON 列才会被标记为已修改
+                    run.result_summary = summary
+                    stats["archived_runs"] += 1
+                    stats["archived_logs"] += count
+                db.commit()
+
+        # 工作流被删除后 (运行记录级联删除) 遗留的日志和文件引用
+        known = {run_uuid for run_uuid, in db.query(WorkflowRun.run_uuid).all()}
+        orphans = [run_uuid for run_uuid, in db.query(WorkflowRunFile.run_uuid).distinct().all()
+                   if run_uuid not in known]
+        for run_uuids in _chunks(orphans):
+            stats["orphan_files"] += db.query(WorkflowRunFile).filter(
+                WorkflowRunFile.run_uuid.in_(run_uuids), WorkflowRunFile.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+    log_db = LogSessionLocal()
+    try:
+        orphans = [run_id for run_id, in log_db.query(WorkflowLog.run_id).distinct().all() if run_id not in known]
+        for run_ids in _chunks(orphans):
+            stats["orphan_logs"] += log_db.query(WorkflowLog).filter(
+                WorkflowLog.run_id.in_(run_ids), WorkflowLog.created_at < cutoff
+            ).delete(synchronize_session=False)
+            log_db.commit()
+    except Exception as e:
+        log_db.rollback()
+        raise e
+    finally:
+        log_db.close()
+    return stats
+
+
+def _references(candidates):
+    """
+    被引用的 artifact 摘要，以及 candidates (上传文件名) 中被引用的文件:
+      - 运行 (包括已归档的运行) 写入时记录在 workflow_run_file 中的引用
+      - 其它表 (工作流、应用节点等配置) 中出现的摘要和文件名
+    """
+    digests, names = set(), set()
+    db = SessionLocal()
+    try:
+        for name, kind in db.query(WorkflowRunFile.name, WorkflowRunFile.kind).distinct():
+            (digests if kind == "artifact" else names).add(name)
+    finally:
+        db.close()
+
+    tokens = set()
+    with engine.connect() as conn:
+        tables = [row[0] for row in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"))]
+        for table in tables:
+            if table in RUN_TABLES:
+                continue
+            columns = [row[1] for row in conn.execute(text(f'PRAGMA table_info("{table}")'))]
+            if not columns:
+                continue
+            select = ", ".join(f'"{column}"' for column in columns)
+            for row in conn.execute(text(f'SELECT {select} FROM "{table}"')):
+                for value in row:
+                    if isinstance(value, (bytes, memoryview)):
+                        value = bytes(value).decode("utf-8", "ignore")
+                    elif not isinstance(value, str):
+                        continue
+                    tokens.update(_TOKEN.findall(value))
+    candidates = set(candidates)
+    return digests | {token for token in tokens if DIGEST.fullmatch(token)}, \
+        (names | tokens) & candidates
+
+
+def collect_artifacts(now=None) -> dict:
+    """
+    删除不再被任何记录引用且超过保留期的 artifact 和上传文件
+    """
+    cutoff = (now or datetime.now()).timestamp() - ARTIFACT_GRACE_DAYS * 86400
+    uploads = [name for name in os.listdir(UPLOAD_DIR)
+               if os.path.isfile(os.path.join(UPLOAD_DIR, name))] if os.path.isdir(UPLOAD_DIR) else []
+    digests, names = _references(uploads)
+    stats = {"artifacts": 0, "uploads": 0, "bytes": 0}
+
+    def remove(path, key):
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                return
+            size = os.path.getsize(path)
+            os.remove(path)
+            stats[key] += 1
+            stats["bytes"] += size
+        except OSError as e:
+            SLog.w(TAG, f"Remove {path} failed: {e}")
+
+    if os.path.isdir(ARTIFACT_DIR):
+        for prefix in os.listdir(ARTIFACT_DIR):
+            folder = os.path.join(ARTIFACT_DIR, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for digest in os.listdir(folder):
+                if digest not in digests:
+                    remove(os.path.join(folder, digest), "artifacts")
+            if not os.listdir(folder):
+                os.rmdir(folder)
+    for name in uploads:
+        if name not in names:
+            remove(os.path.join(UPLOAD_DIR, name), "uploads")
+    return stats
+
+
+def _pool_idle() -> bool:
+    from driver.agent.pool import pool
+    snapshot = pool.snapshot()
+    return not snapshot["queued"] and all(worker["state"] != "busy" for worker in snapshot["workers"])
+
+
+def compact(force=False) -> dict:
+    """
+    回收删除后留下的空闲页并合并全文索引的分段，只在没有任务执行时进行
+    首次执行时把数据库切换为增量回收模式 (需要一次完整的 VACUUM)
+    """
+    if not force and not _pool_idle():
+        return {"skipped": "busy"}
+    stats = {}
+    for name, db_engine in (("autobots", engine), ("logs", log_engine)):
+        conn = db_engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            before = cursor.execute("PRAGMA page_count").fetchone()[0]
+            if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.commit()
+                cursor.execute("VACUUM")
+            else:
+                cursor.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES})").fetchall()
+            fts = cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+                                 (log_service.FTS_TABLE,)).fetchone()
+            if name == "logs" and fts:
+                cursor.execute(f"INSERT INTO {log_service.FTS_TABLE}({log_service.FTS_TABLE}, rank) "
+                               f"VALUES('merge', 500)")
+            conn.commit()
+            cursor.execute("PRAGMA optimize")
+            after = cursor.execute("PRAGMA page_count").fetchone()[0]
+            stats[name] = {"pages": after, "freed_pages": before - after}
+        finally:
+            conn.close()
+    return stats
+
+
+class MaintenanceService:
+    """
+    定期维护 (主进程后台线程): 运行保留策略、清理无引用的文件、压缩数据库
+    """
+
+    def __init__(self, interval=3600, delay=300):
+        self.interval = interval
+        self.delay = delay
+        self._stop = threading.Event()
+        self._running = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self, force=False) -> dict:
+        if not self._running.acquire(blocking=False):
+            return {"skipped": "running"}
+        try:
+            started = time.time()
+            stats = {}
+            for name, step in (("retention", apply_retention), ("artifacts", collect_artifacts),
+                               ("compact", lambda: compact(force=force))):
+                try:
+                    stats[name] = step()
+                except Exception as e:
+                    SLog.e(TAG, f"Maintenance step {name} failed: {e}")
+                    stats[name] = {"error": str(e)}
+            stats["duration_ms"] = int((time.time() - started) * 1000)
+            SLog.i(TAG, "Maintenance finished: %s", stats)
+            return stats
+        finally:
+            self._running.release()
+
+    def _loop(self):
+        if self._stop.wait(self.delay):
+            return
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+
+maintenance = MaintenanceService()
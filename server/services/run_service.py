@@ -1,15 +1,22 @@
 # server/services/run_service.py
 from fastapi import Depends
+from sqlalchemy import func, and_
 from datetime import datetime
 from server.core.database import SessionLocal
+from server.core.storage import WriteQueue
 from sqlalchemy.orm import Session
-from server.models.workflow_run import WorkflowRun
+from sqlalchemy.dialects.sqlite import insert
+import copy
+import pickle
+from ability.core.artifact import references
+from server.models.workflow_run import WorkflowRun, WorkflowRunCheckpoint, WorkflowRunFile
 from script.log import SLog, current_run_id, current_flow_id
 
+# 执行进程中的检查点和结束状态由单个写入线程按批写入，运行结束时 flush (见 driver.agent.actuator)
+run_writer = WriteQueue(SessionLocal, "run")
 
 
-
-def create_run(trigger="manual", db: Session = None):
+def create_run(trigger="manual", summary=None, parent_uuid=None, db: Session = None):
     """1. 开始执行时：创建记录"""
     close_session = False
     if db is None:
@@ -21,7 +28,9 @@ def create_run(trigger="manual", db: Session = None):
             run_uuid=current_run_id.get(),
             status="pending",
             trigger_type=trigger,
-            start_time=datetime.now()
+            start_time=datetime.now(),
+            result_summary=summary,
+            parent_uuid=parent_uuid
         )
         db.add(new_run)
         db.commit()
@@ -40,30 +49,167 @@ def create_run(trigger="manual", db: Session = None):
 
 
 def finish_run(status: str, summary: str = None, db: Session = None):
-    """2. 执行结束时：更新状态和耗时"""
+    """2. 执行结束时：更新状态和耗时 (未传 db 时放入写入队列，不等待写入完成)"""
+    run_uuid = current_run_id.get()
+    end_time = datetime.now()
+    if db is None:
+        # 结果摘要在下一次运行时会被清空，入队前复制
+        summary = dict(summary) if isinstance(summary, dict) else summary
+        run_writer.submit(lambda session: _finish(session, run_uuid, status, summary, end_time))
+        return None
+    run = _finish(db, run_uuid, status, summary, end_time)
+    db.commit()
+    return run
+
+
+def _finish(db: Session, run_uuid, status, summary, end_time):
+    add_files(db, run_uuid, references(summary))
+    run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == run_uuid).first()
+    if run:
+        run.end_time = end_time
+        run.status = status  # 'success' or 'failed'
+        run.result_summary = summary
+
+        # 计算耗时
+        delta = run.end_time - run.start_time
+        run.duration = delta.total_seconds()
+    return run
+
+
+def get_status(run_uuid: str, db: Session = None):
+    """查询运行状态，记录不存在时返回 None"""
     close_session = False
     if db is None:
         db = SessionLocal()
         close_session = True
     try:
-        run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == current_run_id.get()).first()
-        if run:
-            run.end_time = datetime.now()
-            run.status = status  # 'success' or 'failed'
-            run.result_summary = summary
+        run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == run_uuid).first()
+        return run.status if run else None
+    finally:
+        if close_session:
+            db.close()
+
 
-            # 计算耗时
-            delta = run.end_time - run.start_time
-            run.duration = delta.total_seconds()
+def average_durations(workflow_ids, db: Session = None) -> dict:
+    """历史平均耗时 (秒): { workflow_id: 平均耗时 }，只统计已结束的运行，不含数据集的父运行"""
+    close_session = False
+    if db is None:
+        db = SessionLocal()
+        close_session = True
+    try:
+        rows = db.query(WorkflowRun.workflow_id, func.avg(WorkflowRun.duration)).filter(
+            WorkflowRun.workflow_id.in_(list(workflow_ids)),
+            WorkflowRun.status.in_(("success", "failed")),
+            ~and_(WorkflowRun.trigger_type == "dataset", WorkflowRun.parent_uuid.is_(None))
+        ).group_by(WorkflowRun.workflow_id).all()
+        return {workflow_id: float(duration) for workflow_id, duration in rows if duration}
+    finally:
+        if close_session:
+            db.close()
+
+
+def interrupt_run(run_uuid: str, status: str, node_id=None, reason=None, workflow_id=None, db: Session = None):
+    """3. 取消 / 超时 / 进程崩溃：由主进程标记结束状态以及中断时所在的节点"""
+    close_session = False
+    if db is None:
+        db = SessionLocal()
+        close_session = True
+    try:
+        run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == run_uuid).first()
+        now = datetime.now()
+        if run is None:
+            # 任务还在排队，尚未创建记录
+            run = WorkflowRun(
+                workflow_id=workflow_id,
+                run_uuid=run_uuid,
+                status="pending",
+                trigger_type="manual",
+                start_time=now
+            )
+            db.add(run)
+        elif run.status != "pending":
+            # 已经结束的任务不再修改
+            return run
 
-            db.commit()
+        summary = dict(run.result_summary or {})
+        summary.setdefault("_run", {})
+        summary["_run"] = dict(summary["_run"], interrupted={"reason": reason or status, "node_id": node_id})
+        run.status = status
+        run.end_time = now
+        run.result_summary = summary
+        run.duration = (now - run.start_time).total_seconds()
+        db.commit()
+        db.refresh(run)
     except Exception as e:
-        # 如果是本地创建的 session，出错时回滚
         if close_session:
             db.rollback()
         raise e
     finally:
-        # 3. 关闭 Session
         if close_session:
             db.close()
     return run
+
+
+def save_checkpoint(node_id: str, outputs: dict, result: dict, db: Session = None):
+    """4. 节点完成时：保存检查点 (未传 db 时放入写入队列，不等待写入完成)"""
+    checkpoint = WorkflowRunCheckpoint(
+        run_uuid=current_run_id.get(),
+        node_id=node_id,
+        outputs=pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL),
+        result=result
+    )
+    files = references(result, references(outputs))
+    if db is None:
+        # 节点结果在循环中可能被修改，入队前复制
+        checkpoint.result = copy.deepcopy(result)
+
+        def job(session):
+            session.add(checkpoint)
+            add_files(session, checkpoint.run_uuid, files)
+
+        run_writer.submit(job)
+        return
+    db.add(checkpoint)
+    add_files(db, checkpoint.run_uuid, files)
+    db.commit()
+
+
+def add_files(db: Session, run_uuid: str, files: dict):
+    """记录运行引用的文件 { 名称: 类型 } (见 ability.core.artifact.references)，已记录的忽略，不提交"""
+    if not files or not run_uuid:
+        return
+    now = datetime.now()
+    rows = [{"run_uuid": run_uuid, "name": name, "kind": kind, "created_at": now} for name, kind in files.items()]
+    # 每条 SQL 的参数个数受 SQLite 限制
+    for start in range(0, len(rows), 100):
+        db.execute(insert(WorkflowRunFile).values(rows[start:start + 100]).on_conflict_do_nothing())
+
+
+def record_files(files_by_run: dict):
+    """放入写入队列: { run_uuid: { 名称: 类型 } } (日志中出现的截图路径等)"""
+    def job(session):
+        for run_uuid, files in files_by_run.items():
+            add_files(session, run_uuid, files)
+    run_writer.submit(job)
+
+
+def load_checkpoints(run_uuid: str, db: Session = None) -> dict:
+    """读取运行的全部检查点: { node_id: {"outputs": {...}, "result": {...}} }，同一节点 (循环) 取最后一次"""
+    close_session = False
+    if db is None:
+        db = SessionLocal()
+        close_session = True
+    try:
+        rows = db.query(WorkflowRunCheckpoint).filter(
+            WorkflowRunCheckpoint.run_uuid == run_uuid
+        ).order_by(WorkflowRunCheckpoint.id).all()
+        return {
+            row.node_id: {
+                "outputs": pickle.loads(row.outputs) if row.outputs else {},
+                "result": row.result or {}
+            }
+            for row in rows
+        }
+    finally:
+        if close_session:
+            db.close()
@@ -0,0 +1,221 @@
+# server/services/task_service.py
+import time
+import uuid
+import threading
+from datetime import datetime
+
+from server.core.database import SessionLocal
+from server.models.task import Task
+from server.services import run_service
+from server.services.workflow_service import load_workflow
+from script.log import SLog
+
+TAG = "TaskRunner"
+
+# 没有历史记录的工作流按已知平均耗时估算，全部未知时使用该值 (秒)
+DEFAULT_DURATION = 60.0
+
+# 等待单个工作流结束的时间 (秒): 工作流设置了运行截止时间 (nodes 的 "_deadline.run") 时在其基础上
+# 加 RUN_WAIT_GRACE (排队和终止进程的余量)，否则使用 RUN_WAIT_TIMEOUT；超时后标记运行失败并从池中取消
+RUN_WAIT_TIMEOUT = 3600.0
+RUN_WAIT_GRACE = 60.0
+
+# 正在执行的任务: task_id -> TaskRun
+tasks = {}
+
+# 已被任务占用的设备序列号，同一台设备同时只分配给一个任务
+_leased = set()
+_lease_lock = threading.Lock()
+
+
+def lease_devices(requested=None):
+    """
+    租用设备: 指定序列号时只取其中已连接的，否则取全部已连接的空闲设备
+    """
+    from ability.engine.mobile.mAndroidADB import list_devices
+    attached = list_devices()
+    if requested:
+        attached = [serial for serial in requested if serial in attached]
+    with _lease_lock:
+        devices = [serial for serial in attached if serial not in _leased]
+        _leased.update(devices)
+    return devices
+
+
+def release_devices(devices):
+    with _lease_lock:
+        _leased.difference_update(devices)
+
+
+def device_status():
+    from ability.engine.mobile.mAndroidADB import list_devices
+    with _lease_lock:
+        leased = set(_leased)
+    return [{"serial": serial, "leased": serial in leased} for serial in list_devices()]
+
+
+def plan_lpt(workflow_ids, estimates):
+    """
+    最长处理时间优先 (LPT): 按历史耗时从长到短排列，空闲设备依次领取下一个
+    """
+    known = [estimates[workflow_id] for workflow_id in workflow_ids if workflow_id in estimates]
+    fallback = sum(known) / len(known) if known else DEFAULT_DURATION
+    jobs = [(workflow_id, estimates.get(workflow_id, fallback)) for workflow_id in workflow_ids]
+    return sorted(jobs, key=lambda job: job[1], reverse=True)
+
+
+class TaskRun:
+    """
+    在多台设备上执行任务中的工作流: 每台设备一个通道，依次领取 LPT 队列中的下一个工作流，
+    每完成一个更新任务的进度、完成数和通过率
+    """
+
+    def __init__(self, pool, task_id, workflow_ids, devices):
+        self.pool = pool
+        self.task_id = task_id
+        self.workflow_ids = list(workflow_ids)
+        self.devices = list(devices)
+        self.queue = []
+        self.results = []
+        self.load = {serial: {"runs": 0, "busy": 0.0} for serial in self.devices}
+        self._lock = threading.Lock()
+        self._lanes = 0
+
+    def start(self):
+        """
+        任务不存在时返回 False，不启动任何通道
+        """
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.id == self.task_id).first()
+            if task is None:
+                SLog.w(TAG, f"Task {self.task_id} not found")
+                return False
+            estimates = run_service.average_durations(self.workflow_ids, db=db)
+            self.queue = plan_lpt(self.workflow_ids, estimates)
+            task.status = "running"
+            task.start_time = datetime.now()
+            task.total_count = len(self.queue)
+            task.completed_count = 0
+            task.progress = 0
+            task.pass_rate = 0
+            task.result_summary = {"devices": self.devices, "schedule": "lpt"}
+            db.commit()
+        finally:
+            db.close()
+
+        tasks[self.task_id] = self
+        # 每台设备需要一个执行进程
+        self.pool.grow(len(self.devices))
+        self._lanes = len(self.devices)
+        for serial in self.devices:
+            threading.Thread(target=self._lane, args=(serial,), name=f"task-{serial}", daemon=True).start()
+        SLog.i(TAG, f"Task {self.task_id} started: {len(self.queue)} workflows on {len(self.devices)} devices")
+        return True
+
+    def _next(self):
+        with self._lock:
+            return self.queue.pop(0) if self.queue else None
+
+    def _lane(self, serial):
+        try:
+            while True:
+                job = self._next()
+                if job is None:
+                    break
+                workflow_id, estimate = job
+                self._run_one(serial, workflow_id, estimate)
+        finally:
+            with self._lock:
+                self._lanes -= 1
+                finished = self._lanes == 0
+            if finished:
+                self._finalize()
+
+    def _run_one(self, serial, workflow_id, estimate):
+        run_id = str(uuid.uuid4())
+        data = load_workflow(workflow_id)
+        started = time.time()
+        if data is None:
+            status = "missing"
+        else:
+            done = threading.Event()
+            self.pool.submit(dict(data, device=serial, trigger="task"), run_id, workflow_id,
+                             callback=lambda _: done.set())
+            if done.wait(self._wait_timeout(data)):
+                status = run_service.get_status(run_id) or "failed"
+            else:
+                status = self._expire(run_id, workflow_id)
+        elapsed = time.time() - started
+        with self._lock:
+            self.results.append({
+                "workflow_id": workflow_id,
+                "run_uuid": run_id,
+                "device": serial,
+                "status": status,
+                "estimate": round(estimate, 3),
+                "duration": round(elapsed, 3),
+            })
+            self.load[serial]["runs"] += 1
+            self.load[serial]["busy"] += elapsed
+            completed = len(self.results)
+            passed = sum(1 for item in self.results if item["status"] == "success")
+        self._progress(completed, passed)
+
+    @staticmethod
+    def _wait_timeout(data):
+        deadline = ((data.get("nodes") or {}).get("_deadline") or {}).get("run")
+        try:
+            return float(deadline) + RUN_WAIT_GRACE if deadline else RUN_WAIT_TIMEOUT
+        except (TypeError, ValueError):
+            return RUN_WAIT_TIMEOUT
+
+    def _expire(self, run_id, workflow_id):
+        """
+        等待超时: 先标记运行失败，再从池中取消 (排队中跳过 / 执行中终止进程)，通道继续领取下一个工作流
+        """
+        SLog.e(TAG, f"Task {self.task_id} run {run_id} did not finish in time, marked as failed")
+        try:
+            run_service.interrupt_run(run_id, "failed", reason="task wait timeout", workflow_id=workflow_id)
+        except Exception as e:
+            SLog.e(TAG, f"Mark run {run_id} as failed failed: {e}")
+        self.pool.cancel(run_id)
+        return "failed"
+
+    def _progress(self, completed, passed):
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.id == self.task_id).first()
+            if task:
+                task.completed_count = completed
+                task.progress = completed * 100 // max(task.total_count or 0, 1)
+                task.pass_rate = passed * 100 // completed
+                db.commit()
+        except Exception as e:
+            SLog.e(TAG, f"Task {self.task_id} progress update failed: {e}")
+        finally:
+            db.close()
+
+    def _finalize(self):
+        release_devices(self.devices)
+        db = SessionLocal()
+        try:
+            passed = sum(1 for item in self.results if item["status"] == "success")
+            task = db.query(Task).filter(Task.id == self.task_id).first()
+            if task:
+                task.status = "success" if passed == len(self.results) else "failed"
+                task.result_summary = {
+                    "devices": self.devices,
+                    "schedule": "lpt",
+                    "duration": round((datetime.now() - task.start_time).total_seconds(), 3),
+                    "load": {serial: dict(load, busy=round(load["busy"], 3)) for serial, load in self.load.items()},
+                    "runs": self.results,
+                }
+                db.commit()
+            SLog.i(TAG, f"Task {self.task_id} finished: {passed}/{len(self.results)} passed")
+        except Exception as e:
+            SLog.e(TAG, f"Task {self.task_id} summary failed: {e}")
+        finally:
+            db.close()
+            tasks.pop(self.task_id, None)
+
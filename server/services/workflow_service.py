@@ -0,0 +1,48 @@
+# server/services/workflow_service.py
+import json
+import threading
+from collections import OrderedDict
+
+from server.core.database import SessionLocal
+from server.models.workflow import Workflow
+
+# workflow_id -> 运行数据，按 updated_at 判断是否需要重新读取
+_workflows = OrderedDict()
+_lock = threading.Lock()
+CAPACITY = 64
+
+
+def load_workflow(workflow_id):
+    """
+    读取工作流的运行数据 {"id", "name", "nodes", "updated_at"}，不存在时返回 None
+    未修改的工作流只查询 updated_at，不重复解析 nodes；
+    执行时 (id, updated_at) 同样作为编译计划的缓存键
+    """
+    db = SessionLocal()
+    try:
+        row = db.query(Workflow.id, Workflow.updated_at).filter(Workflow.id == workflow_id).first()
+        if not row:
+            return None
+        with _lock:
+            cached = _workflows.get(row.id)
+            if cached is not None and cached["updated_at"] == row.updated_at:
+                _workflows.move_to_end(row.id)
+                return cached
+        wf = db.query(Workflow).filter(Workflow.id == row.id).first()
+        try:
+            nodes_json = json.loads(wf.nodes) if wf.nodes else {}
+        except json.JSONDecodeError:
+            nodes_json = {}
+        data = {
+            "id": wf.id,
+            "name": wf.name,
+            "nodes": nodes_json,
+            "updated_at": wf.updated_at
+        }
+        with _lock:
+            _workflows[wf.id] = data
+            while len(_workflows) > CAPACITY:
+                _workflows.popitem(last=False)
+        return data
+    finally:
+        db.close()
@@ -2,7 +2,8 @@ import json
 import time
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from script.log import SLog
-from server.websocket.wsMap import HANDLERS
+from server.websocket.wsMap import HANDLERS, SESSION_HANDLERS
+from server.websocket.wsRun import RunSubscriptions
 
 router = APIRouter()
 
@@ -13,6 +14,8 @@ TAG = "rWebSocket"
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     SLog.i(TAG, "Client connected")
+    # 该连接订阅的运行事件，断开时全部取消
+    subscriptions = RunSubscriptions(websocket)
     try:
         while True:
             text_data = await websocket.receive_text()
@@ -37,6 +40,9 @@ async def websocket_endpoint(websocket: WebSocket):
                 # 执行对应的处理函数
                 result = await HANDLERS[action](data)
                 response.update(result)
+            elif action in SESSION_HANDLERS:
+                result = await getattr(subscriptions, SESSION_HANDLERS[action])(data)
+                response.update(result)
             else:
                 response.update({"code": 404, "msg": f"Action '{action}' not supported"})
             
@@ -46,4 +52,6 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         SLog.i(TAG, "Client disconnected")
     except Exception as e:
-        SLog.e(TAG, f"WebSocket error: {e}")
\ No newline at end of file
+        SLog.e(TAG, f"WebSocket error: {e}")
+    finally:
+        subscriptions.close()
@@ -4,4 +4,10 @@ from server.websocket.wsFile import handle_upload, handle_get_file
 HANDLERS = {
     "upload": handle_upload,
     "get_file": handle_get_file
+}
+
+# 需要当前连接的动作，处理函数为 RunSubscriptions 的方法
+SESSION_HANDLERS = {
+    "subscribe_run": "subscribe",
+    "unsubscribe_run": "unsubscribe"
 }
\ No newline at end of file
@@ -0,0 +1,81 @@
+# --- 运行事件订阅 ---
+import json
+import asyncio
+from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
+from script.log import SLog
+from server.services.event_service import event_bus, backfill
+
+TAG = "rWebSocket"
+
+
+class RunSubscriptions:
+    """
+    单个 WebSocket 连接上的运行订阅
+    协议: {"action": "subscribe_run", "data": {"run_uuid": "..."}}
+    推送: {"action": "run_events", "run_uuid": "...", "events": [...], "backfill": true/false}
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        # run_uuid -> (Subscription, 推送任务)
+        self._subscriptions = {}
+
+    async def subscribe(self, data: dict):
+        run_uuid = data.get("run_uuid")
+        if not run_uuid:
+            return {"code": 400, "msg": "Missing 'run_uuid' in data"}
+        if run_uuid in self._subscriptions:
+            return {"code": 200, "msg": "already subscribed"}
+        # 先订阅再查询数据库，查询期间的实时事件缓存在队列中，补齐后再推送
+        subscription = event_bus.subscribe(run_uuid)
+        task = asyncio.create_task(self._pump(subscription))
+        self._subscriptions[run_uuid] = (subscription, task)
+        return {"code": 200, "msg": "subscribed"}
+
+    async def unsubscribe(self, data: dict):
+        self._stop(data.get("run_uuid"))
+        return {"code": 200, "msg": "unsubscribed"}
+
+    def close(self):
+        for run_uuid in list(self._subscriptions):
+            self._stop(run_uuid)
+
+    def _stop(self, run_uuid):
+        entry = self._subscriptions.pop(run_uuid, None)
+        if entry is not None:
+            subscription, task = entry
+            event_bus.unsubscribe(subscription)
+            task.cancel()
+
+    async def _send(self, run_uuid, events, **extra):
+        message = {"action": "run_events", "run_uuid": run_uuid, "events": events}
+        message.update(extra)
+        await self.websocket.send_text(json.dumps(message, ensure_ascii=False, default=str))
+
+    async def _pump(self, subscription):
+        run_uuid = subscription.run_uuid
+        try:
+            initial = await run_in_threadpool(backfill, run_uuid)
+            await self._send(run_uuid, initial["events"], backfill=True, truncated=initial["truncated"])
+            # 补齐前已入队的日志可能已经写入数据库，跳过不晚于最后一条补齐日志的部分
+            last = max((item["time"] for item in initial["events"]
+                        if item.get("type") == "log" and item.get("time")), default=None)
+            while True:
+                events = await subscription.queue.get()
+                if last is not None:
+                    events = [item for item in events
+                              if item.get("type") != "log" or (item.get("time") or 0) > last]
+                    if subscription.queue.empty():
+                        last = None
+                if subscription.lagged:
+                    subscription.lagged = False
+                    await self._send(run_uuid, [], lagged=True)
+                if events:
+                    await self._send(run_uuid, events, backfill=False)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            SLog.w(TAG, f"Run [{run_uuid}] event push stopped: {e}")
+            event_bus.unsubscribe(subscription)
+            self._subscriptions.pop(run_uuid, None)
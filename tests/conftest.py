@@ -0,0 +1,63 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import os
+import sys
+import tempfile
+
+# 应用数据目录在导入 server.core.database 时由 HOME 决定，测试使用临时目录，不影响本机数据
+os.environ["HOME"] = tempfile.mkdtemp(prefix="miniorange-test-")
+os.environ.pop("APPDATA", None)
+os.environ.pop("LOCALAPPDATA", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+def make_node(node_id, next_codes, last_codes, code="test/work", platform="common", **data):
+    return {
+        "id": node_id,
+        "nodeType": 200,
+        "nodeCode": code,
+        "displayName": node_id,
+        "lastCodes": last_codes,
+        "nextCodes": next_codes,
+        "data": data,
+        "platform": platform,
+    }
+
+
+@pytest.fixture
+def run_context():
+    """
+    设置运行上下文 (run_id / flow_id)，结束时清理报告和本次运行的变量
+    """
+    from script.log import current_run_id, current_flow_id
+    from script.mTask import report
+    from ability.core.memory import Memory
+    report.clear()
+    token_run = current_run_id.set("test-run")
+    token_flow = current_flow_id.set("1")
+    yield "test-run"
+    Memory().release("test-run")
+    report.clear()
+    current_run_id.reset(token_run)
+    current_flow_id.reset(token_flow)
+
+
+@pytest.fixture(scope="session")
+def databases():
+    """
+    在临时数据目录中建表 (与服务启动时一致)
+    """
+    from server.core.migration import run_auto_migration
+    from server.core.database import engine, Base
+    from server.core.log_database import log_engine, LogBase
+    import server.models.workflow  # noqa: F401
+    import server.models.workflow_run  # noqa: F401
+    import server.models.task  # noqa: F401
+    import server.models.project  # noqa: F401
+    import server.models.log  # noqa: F401
+    run_auto_migration()
+    Base.metadata.create_all(bind=engine)
+    LogBase.metadata.create_all(bind=log_engine)
+    return engine, log_engine
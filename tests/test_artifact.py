@@ -0,0 +1,44 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import os
+import time
+import threading
+
+from ability.core import artifact
+from ability.core.artifact import ArtifactRef, spill
+
+
+def test_concurrent_spills_of_same_value_in_one_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact, "ARTIFACT_DIR", str(tmp_path))
+    value = "x" * artifact.SPILL_THRESHOLD
+    refs, errors = [], []
+    start = threading.Barrier(8)
+
+    def work():
+        start.wait()
+        try:
+            refs.append(spill(value))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert all(isinstance(ref, ArtifactRef) and ref.load() == value for ref in refs)
+    # 同一进程的多个线程各自使用临时文件，不会残留
+    assert os.listdir(os.path.dirname(refs[0].path)) == [refs[0].digest]
+
+
+def test_spill_of_existing_value_refreshes_mtime(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact, "ARTIFACT_DIR", str(tmp_path))
+    value = b"y" * artifact.SPILL_THRESHOLD
+    ref = spill(value)
+    old = time.time() - 30 * 86400
+    os.utime(ref.path, (old, old))
+
+    assert spill(value).digest == ref.digest
+    assert os.path.getmtime(ref.path) > old + 86400
@@ -0,0 +1,46 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import pytest
+
+from conftest import make_node
+from ability.component.map import MAP
+from ability.component.router import BaseRouter
+from ability.component.template import Template
+from ability.core.binding import Literal, Text, compile_value
+from ability.core.memory import Memory
+from driver.core.manager import Manager
+
+
+class Echo(Template):
+    """
+    把参数 value 解析后写入变量 v
+    """
+
+    def execute(self):
+        self.memory.set(self.info, "v", self.get_param_value("value"))
+
+
+@pytest.fixture(autouse=True)
+def routes():
+    MAP["test"] = {"details": {"echo": {"address": "test/echo"}}}
+    BaseRouter.routes["test/echo"] = Echo
+    yield
+    MAP.pop("test", None)
+
+
+def test_unparsable_expression_compiles_to_literal_text():
+    assert isinstance(compile_value('{{ "a": 1 }}'), Literal)
+    assert compile_value('{{ "a": 1 }}').value == '{{ "a": 1 }}'
+    # 同一文本中可以解析的表达式照常解析
+    assert isinstance(compile_value('{{ "a": 1 }} {{src.v}}'), Text)
+
+
+def test_unparsable_expression_does_not_abort_the_run(run_context):
+    nodes = {
+        "public-trigger-1": make_node("public-trigger-1", ["src"], []),
+        "src": make_node("src", ["dst"], ["public-trigger-1"], code="test/echo", value="7"),
+        "dst": make_node("dst", [], ["src"], code="test/echo", value='{{ "a": 1 }} n={{src.v}}'),
+    }
+    Manager({"nodes": nodes}, keep_alive=True).run()
+
+    assert Memory().lookup("dst", "v") == '{{ "a": 1 }} n=7'
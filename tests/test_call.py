@@ -0,0 +1,152 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import threading
+
+import pytest
+
+from conftest import make_node
+from ability.component.cfs import call as call_module
+from ability.component.map import MAP
+from ability.component.router import BaseRouter
+from ability.component.template import Template
+from ability.core.exeception import MException
+from ability.core.memory import Memory
+from driver.core.manager import Manager
+from script.constPath.error_code import ErrorCode
+from server.services import workflow_service
+
+scopes = []
+spans = []
+
+
+class Echo(Template):
+    """
+    子工作流中的节点: item 为 "bad" 时失败，否则把 item 写入变量 v，并记录所在的变量作用域
+    """
+
+    def execute(self):
+        scopes.append(self.memory.store().run_id)
+        item = self.get_param_value("item")
+        if item == "bad":
+            raise RuntimeError("bad item")
+        self.memory.set(self.info, "v", f"got:{item}")
+
+
+class Tap:
+    """
+    界面节点: 记录在设备上执行的时间段
+    """
+
+    def __init__(self, info):
+        self.info = info
+
+    def execute(self):
+        started = time.monotonic()
+        time.sleep(0.1)
+        spans.append((self.info.id, started, time.monotonic(), threading.current_thread().name))
+
+
+def ui_callee():
+    return {"nodes": {
+        "public-trigger-1": make_node("public-trigger-1", ["tap"], []),
+        "tap": make_node("tap", [], ["public-trigger-1"], code="test/tap", platform="mobile"),
+    }}
+
+
+def callee():
+    return {"nodes": {
+        "public-trigger-1": make_node("public-trigger-1", ["k"], []),
+        "k": make_node("k", [], ["public-trigger-1"], code="test/echo", item="{{$args.item}}"),
+    }}
+
+
+def recursive():
+    # 调用自身的工作流: 每一层先执行 k，再调用下一层
+    return {"nodes": {
+        "public-trigger-1": make_node("public-trigger-1", ["k"], []),
+        "k": make_node("k", ["c"], ["public-trigger-1"], code="test/echo", item="deep"),
+        "c": make_node("c", [], ["k"], code="cfs/call", workflow_id="self", outputs={}),
+    }}
+
+
+@pytest.fixture(autouse=True)
+def routes(monkeypatch):
+    MAP["test"] = {"details": {"echo": {"address": "test/echo"}, "tap": {"address": "test/tap"}}}
+    BaseRouter.routes["test/echo"] = Echo
+    BaseRouter.routes["test/tap"] = Tap
+    workflows = {"callee": callee, "self": recursive, "ui": ui_callee}
+    monkeypatch.setattr(workflow_service, "load_workflow",
+                        lambda workflow_id: workflows[workflow_id]() if workflow_id in workflows else None)
+    scopes.clear()
+    spans.clear()
+    yield
+    MAP.pop("test", None)
+
+
+def run(**data):
+    nodes = {
+        "public-trigger-1": make_node("public-trigger-1", ["c"], []),
+        "c": make_node("c", [], ["public-trigger-1"], code="cfs/call", **data),
+    }
+    Manager({"nodes": nodes}, keep_alive=True).run()
+
+
+def child_scopes():
+    return [scope for scope in Memory()._runs if scope.startswith("test-run/")]
+
+
+def test_single_call_returns_outputs_and_releases_scope(run_context):
+    run(workflow_id="callee", inputs={"item": "a"}, outputs={"got": "k.v"})
+
+    assert Memory().lookup("c", "got") == "got:a"
+    assert scopes == ["test-run/c#0"]
+    assert child_scopes() == []
+
+
+def test_map_keeps_order_and_reports_failed_item(run_context):
+    with pytest.raises(MException) as error:
+        run(workflow_id="callee", mode="map", items=["a", "bad", "c"], workers=3, outputs={"v": "k.v"})
+
+    assert error.value.error_code == ErrorCode.RUN_ERROR_CALL_FAILED.value[0]
+    # 失败的一项不影响其他项，结果按 items 顺序写入
+    assert Memory().lookup("c", "results") == [
+        {"v": "got:a", "status": "success"},
+        {"status": "failed"},
+        {"v": "got:c", "status": "success"},
+    ]
+    assert sorted(scopes) == ["test-run/c#0", "test-run/c#1", "test-run/c#2"]
+    assert child_scopes() == []
+
+
+def test_recursive_call_stops_at_max_depth(run_context, monkeypatch):
+    monkeypatch.setattr(call_module, "MAX_DEPTH", 3)
+    with pytest.raises(MException) as error:
+        run(workflow_id="self", outputs={})
+
+    assert error.value.error_code == ErrorCode.RUN_ERROR_CALL_FAILED.value[0]
+    assert len(scopes) == 3
+    assert child_scopes() == []
+
+
+def test_outputs_must_be_literal_paths(run_context):
+    with pytest.raises(MException) as error:
+        run(workflow_id="callee", outputs={"got": ""})
+    assert error.value.error_code == ErrorCode.RUN_ERROR_CALL_BAD_OUTPUTS.value[0]
+    assert scopes == []
+
+
+def test_mapped_ui_callee_shares_the_device_with_the_caller(run_context):
+    # 调用方的界面节点与 map 的各项子工作流同时就绪，同一台设备上的界面节点仍然逐个执行
+    nodes = {
+        "public-trigger-1": make_node("public-trigger-1", ["c", "own"], []),
+        "c": make_node("c", [], ["public-trigger-1"], code="cfs/call", workflow_id="ui", mode="map",
+                       items=[1, 2, 3], workers=3, outputs={}),
+        "own": make_node("own", [], ["public-trigger-1"], code="test/tap", platform="mobile"),
+    }
+    Manager({"nodes": nodes}, keep_alive=True).run()
+
+    assert sorted(node_id for node_id, *_ in spans) == ["own", "tap", "tap", "tap"]
+    ordered = sorted(spans, key=lambda span: span[1])
+    for previous, current in zip(ordered, ordered[1:]):
+        assert current[1] >= previous[2]
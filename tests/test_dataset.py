@@ -0,0 +1,73 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import threading
+from datetime import datetime
+
+from server.core.database import SessionLocal
+from server.models.workflow_run import WorkflowRun
+from server.services.dataset_service import DatasetRun, datasets, parse_rows
+
+
+class FakePool:
+    """
+    每个子运行在后台线程中执行 0.1 秒，row["ok"] 为 "0" 时失败；记录同时执行的最大数量
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def submit(self, run_data, run_id, flow_id, callback=None):
+        self.rows.append(run_data["row"])
+        threading.Thread(target=self._run, args=(run_data, run_id, flow_id, callback), daemon=True).start()
+
+    def _run(self, run_data, run_id, flow_id, callback):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.1)
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            db.add(WorkflowRun(workflow_id=flow_id, run_uuid=run_id, parent_uuid=run_data["parent_uuid"],
+                               status="success" if run_data["row"]["ok"] == "1" else "failed",
+                               trigger_type=run_data["trigger"], start_time=now, end_time=now, duration=0.1))
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self.active -= 1
+        callback(run_id)
+
+
+def test_parse_rows_from_json_or_csv():
+    assert parse_rows(rows=[{"a": 1}]) == [{"a": 1}]
+    assert parse_rows(csv_text="user,ok\nbob,1\namy,0\n") == [{"user": "bob", "ok": "1"}, {"user": "amy", "ok": "0"}]
+    assert parse_rows() == []
+
+
+def test_dataset_run_bounds_concurrency_and_summarizes_rows(databases):
+    pool = FakePool()
+    rows = parse_rows(csv_text="user,ok\n" + "\n".join(f"u{index},{0 if index == 2 else 1}" for index in range(5)))
+    parent_uuid = DatasetRun(pool, {"nodes": {}}, 1, rows, concurrency=2).start()
+
+    end = time.time() + 5
+    while parent_uuid in datasets and time.time() < end:
+        time.sleep(0.02)
+    db = SessionLocal()
+    try:
+        parent = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == parent_uuid).first()
+        children = db.query(WorkflowRun).filter(WorkflowRun.parent_uuid == parent_uuid).count()
+    finally:
+        db.close()
+
+    assert pool.peak == 2
+    assert pool.rows == rows
+    assert children == 5
+    assert parent.status == "failed"
+    assert parent.result_summary["_run"]["dataset"] == {"rows": 5, "concurrency": 2, "passed": 4, "failed": 1}
+    assert [item["status"] for item in parent.result_summary["rows"]] == \
+           ["success", "success", "failed", "success", "success"]
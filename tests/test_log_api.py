@@ -0,0 +1,105 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+
+from server.core.log_database import LogSessionLocal
+from server.models.log import WorkflowLog
+from server.routers import rLog
+from server.services import log_service
+
+
+@pytest.fixture
+def run_logs(databases):
+    """
+    250 条日志，created_at 与 id 顺序相反的一条用于验证按时间排序
+    """
+    run_id = "log-api-run"
+    now = datetime.now()
+    db = LogSessionLocal()
+    rows = [dict(run_id=run_id, flow_id="1", node_id=f"n{i % 3}", level="ERROR" if i % 50 == 0 else "INFO",
+                 tag="T", message=f"line {i}" + ("x" * 3000 if i == 7 else ""),
+                 created_at=now + timedelta(milliseconds=i)) for i in range(250)]
+    rows.append(dict(run_id=run_id, flow_id="1", node_id="n0", level="INFO", tag="T", message="earliest",
+                     created_at=now - timedelta(seconds=1)))
+    db.execute(WorkflowLog.__table__.insert(), rows)
+    db.commit()
+    yield run_id
+    db.query(WorkflowLog).filter(WorkflowLog.run_id == run_id).delete()
+    db.commit()
+    db.close()
+
+
+def read(run_id, db, limit=None, cursor=None, level=None, tail=False):
+    response = Response()
+    result = rLog.read_logs(run_id, response, limit=limit, cursor=cursor, level=level, tag=None, node_id=None,
+                            tail=tail, db=db)
+    return result, response
+
+
+def test_route_without_paging_params_keeps_the_list_shape(run_logs):
+    db = LogSessionLocal()
+    try:
+        logs, response = read(run_logs, db)
+    finally:
+        db.close()
+    assert isinstance(logs, list)
+    assert len(logs) == 251
+    assert "x-has-more" not in response.headers
+    assert logs[0].message == "earliest"
+    assert [log.message for log in logs[1:4]] == ["line 0", "line 1", "line 2"]
+    # 旧格式不截断消息
+    assert len(logs[8].message) > log_service.MESSAGE_PREVIEW
+
+
+def test_route_without_paging_params_is_capped(run_logs, monkeypatch):
+    monkeypatch.setattr(log_service, "LIST_LIMIT", 100)
+    db = LogSessionLocal()
+    try:
+        logs, response = read(run_logs, db)
+    finally:
+        db.close()
+    assert len(logs) == 100
+    assert response.headers["x-has-more"] == "true"
+
+
+def test_route_pages_by_cursor(run_logs):
+    db = LogSessionLocal()
+    try:
+        first, _ = read(run_logs, db, limit=200)
+        second, _ = read(run_logs, db, limit=200, cursor=first["next_cursor"])
+        errors, _ = read(run_logs, db, level="ERROR")
+        default, _ = read(run_logs, db, cursor=0)
+        tail, _ = read(run_logs, db, limit=2, tail=True)
+    finally:
+        db.close()
+    assert first["code"] == 200 and first["has_more"] and len(first["data"]) == 200
+    assert not second["has_more"] and len(second["data"]) == 51
+    ids = [row["id"] for row in first["data"] + second["data"]]
+    assert ids == sorted(ids) and len(set(ids)) == 251
+    assert [row["message"] for row in errors["data"]] == ["line 0", "line 50", "line 100", "line 150", "line 200"]
+    # 只传 cursor 时每页默认 PAGE_SIZE 条
+    assert len(default["data"]) == log_service.PAGE_SIZE and default["has_more"]
+    assert [row["message"] for row in tail["data"]] == ["line 249", "earliest"]
+    truncated = [row for row in first["data"] if row["truncated"]]
+    assert len(truncated) == 1 and len(truncated[0]["message"]) == log_service.MESSAGE_PREVIEW
+
+
+def test_static_routes_are_not_shadowed_by_run_id():
+    paths = [route.path for route in rLog.router.routes]
+    assert paths.index("/logs/search") < paths.index("/logs/{run_id}")
+
+
+def test_message_route_checks_the_run(run_logs):
+    db = LogSessionLocal()
+    try:
+        log_id = db.query(WorkflowLog.id).filter(WorkflowLog.run_id == run_logs).first()[0]
+        assert rLog.read_log_message(log_id, run_id=run_logs, db=db)["data"]["run_id"] == run_logs
+        # id 属于其他运行时返回 404，不返回其他运行的日志
+        with pytest.raises(HTTPException) as error:
+            rLog.read_log_message(log_id, run_id="another-run", db=db)
+        assert error.value.status_code == 404
+    finally:
+        db.close()
@@ -0,0 +1,230 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import os
+import gzip
+import json
+import time
+import uuid
+import pickle
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from ability.core.artifact import ArtifactRef
+from script.log import current_run_id
+from server.core import migration
+from server.core.database import SessionLocal
+from server.core.log_database import LogSessionLocal
+from server.models.log import WorkflowLog
+from server.models.workflow import Workflow
+from server.models.workflow_run import WorkflowRun, WorkflowRunCheckpoint
+from server.services import log_service, maintenance_service, run_service
+from server.services.maintenance_service import RETENTION, apply_retention, collect_artifacts, plan_retention
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+
+
+def messages(rows):
+    # 数据库中的日志为模型对象，归档日志为字典
+    return [row["message"] if isinstance(row, dict) else row.message for row in rows]
+
+
+def test_plan_retention_keeps_recent_archives_old_and_purges_expired():
+    policy = dict(RETENTION, keep_runs=1, keep_days=30, keep_failed_days=90, purge_days=365)
+    runs = [
+        ("latest", None, "success", NOW - timedelta(days=100)),
+        ("recent", None, "success", NOW - timedelta(days=10)),
+        ("old", None, "success", NOW - timedelta(days=40)),
+        ("old-failed", None, "failed", NOW - timedelta(days=40)),
+        ("expired", None, "success", NOW - timedelta(days=400)),
+        ("child", "old", "success", NOW - timedelta(days=1)),
+    ]
+    assert plan_retention(runs, policy, NOW) == {
+        "latest": "keep",
+        "recent": "keep",
+        "old": "archive",
+        "old-failed": "keep",
+        "expired": "purge",
+        # 数据集的子运行跟随父运行
+        "child": "archive",
+    }
+
+
+@pytest.fixture
+def history(databases):
+    """
+    一个只保留最近 1 次运行的工作流: 0 / 40 / 400 天前各一次运行，每次 3 条日志和 1 个检查点，
+    另有 3 天前的孤立日志 (运行记录已不存在)
+    """
+    marker = uuid.uuid4().hex
+    db, log_db = SessionLocal(), LogSessionLocal()
+    try:
+        workflow = Workflow(name="retention", nodes=json.dumps({"_retention": {"keep_runs": 1}}))
+        db.add(workflow)
+        db.commit()
+        runs = {}
+        for age in (0, 40, 400):
+            run_uuid = f"{marker}-{age}"
+            ended = NOW - timedelta(days=age)
+            db.add(WorkflowRun(workflow_id=workflow.id, run_uuid=run_uuid, status="success", trigger_type="manual",
+                               start_time=ended, end_time=ended, result_summary={"_run": {}}))
+            db.add(WorkflowRunCheckpoint(run_uuid=run_uuid, node_id="a", result={"success": True}))
+            log_db.execute(WorkflowLog.__table__.insert(), [
+                {"run_id": run_uuid, "flow_id": str(workflow.id), "node_id": "a", "level": "INFO", "tag": "T",
+                 "message": f"{marker} line {line}", "created_at": ended} for line in range(3)])
+            runs[age] = run_uuid
+        log_db.execute(WorkflowLog.__table__.insert(), [
+            {"run_id": f"{marker}-orphan", "level": "INFO", "tag": "T", "message": f"{marker} orphan",
+             "created_at": NOW - timedelta(days=3)}])
+        db.commit()
+        log_db.commit()
+    finally:
+        db.close()
+        log_db.close()
+    return marker, runs
+
+
+def test_apply_retention_archives_and_purges(history):
+    marker, runs = history
+    log_service.ensure_search_index()
+    stats = apply_retention(now=NOW)
+
+    assert stats["archived_runs"] >= 1 and stats["purged_runs"] >= 1 and stats["orphan_logs"] >= 1
+    db = SessionLocal()
+    try:
+        checkpoints = {run_uuid: db.query(WorkflowRunCheckpoint).filter_by(run_uuid=run_uuid).count()
+                       for run_uuid in runs.values()}
+        archived = db.query(WorkflowRun).filter_by(run_uuid=runs[40]).first()
+        assert archived.result_summary["_run"]["archived"]["logs"] == 3
+        assert db.query(WorkflowRun).filter_by(run_uuid=runs[400]).first() is None
+    finally:
+        db.close()
+    assert checkpoints == {runs[0]: 1, runs[40]: 0, runs[400]: 0}
+
+    # 保留的运行日志仍在数据库中，归档的运行从归档文件读取，两种接口结果一致
+    assert messages(log_service.list_logs(runs[0])) == [f"{marker} line {i}" for i in range(3)]
+    assert messages(log_service.list_logs(runs[40])) == [f"{marker} line {i}" for i in range(3)]
+    page = log_service.query_logs(runs[40], limit=2)
+    assert page["archived"] is True
+    assert [row["message"] for row in page["data"]] == [f"{marker} line 0", f"{marker} line 1"]
+    assert page["has_more"] is True
+    assert log_service.list_logs(runs[400]) == []
+    assert log_service.list_logs(f"{marker}-orphan") == []
+
+    # 全文索引与日志表一致: 只能搜到仍在数据库中的日志
+    log_db = LogSessionLocal()
+    try:
+        log_service.index_pending(log_db)
+        log_db.commit()
+        log_db.execute(text(f"INSERT INTO {log_service.FTS_TABLE}({log_service.FTS_TABLE}, rank) "
+                            f"VALUES('integrity-check', 1)"))
+    finally:
+        log_db.close()
+    hits = log_service.search_logs(marker, limit=50)["data"]
+    assert {hit["run_id"] for hit in hits} == {runs[0]}
+
+    # 再次执行不会重复归档
+    assert apply_retention(now=NOW)["archived_runs"] == 0
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    uploads, artifacts = tmp_path / "uploads", tmp_path / "artifacts"
+    monkeypatch.setattr(maintenance_service, "UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(maintenance_service, "ARTIFACT_DIR", str(artifacts))
+    return uploads, artifacts
+
+
+def make_files(files, fresh=()):
+    old = time.time() - (maintenance_service.ARTIFACT_GRACE_DAYS + 1) * 86400
+    for key, path in files.items():
+        os.makedirs(path.parent, exist_ok=True)
+        path.write_bytes(b"x")
+        if key not in fresh:
+            os.utime(path, (old, old))
+
+
+def test_collect_artifacts_removes_only_old_unreferenced_files(databases, storage):
+    uploads, artifacts = storage
+    kept_digest, dropped_digest = uuid.uuid4().hex * 2, uuid.uuid4().hex * 2
+    name, shot = f"kept-{uuid.uuid4().hex}.png", f"shot-{uuid.uuid4().hex}.png"
+    db = SessionLocal()
+    token = current_run_id.set(str(uuid.uuid4()))
+    try:
+        db.add(Workflow(name="artifacts", nodes=json.dumps({"a": {"data": {"image": name}}})))
+        # 检查点写入时记录引用: 大变量的 artifact 和截图的链接
+        run_service.save_checkpoint("a", {"a": {"big": ArtifactRef(kept_digest, "text", 1, "")}},
+                                    {"success": True, "url": f"/file/{shot}"}, db=db)
+    finally:
+        current_run_id.reset(token)
+        db.close()
+
+    files = {
+        "kept_upload": uploads / name,
+        "kept_shot": uploads / shot,
+        "dropped_upload": uploads / "dropped.png",
+        "fresh_upload": uploads / "fresh.png",
+        "kept_artifact": artifacts / kept_digest[:2] / kept_digest,
+        "dropped_artifact": artifacts / dropped_digest[:2] / dropped_digest,
+    }
+    make_files(files, fresh=("fresh_upload",))
+
+    stats = collect_artifacts()
+
+    assert stats["uploads"] == 1 and stats["artifacts"] == 1
+    assert {key for key, path in files.items() if path.exists()} == \
+        {"kept_upload", "kept_shot", "fresh_upload", "kept_artifact"}
+
+
+def test_archived_run_keeps_screenshots_until_purged(history, storage):
+    marker, runs = history
+    uploads, _ = storage
+    files = {age: uploads / f"{marker}-{age}.png" for age in (40, 400)}
+    make_files(files)
+    # 截图只出现在日志中 (检查点归档时被删除)
+    log_service.log_writer.start()
+    for age, path in files.items():
+        log_service.log_writer.write(runs[age], None, "a", "INFO", "Screenshot", f"Saved at: {path}.")
+    assert log_service.log_writer.flush()
+    assert run_service.run_writer.flush()
+
+    apply_retention(now=NOW)
+    collect_artifacts()
+
+    assert files[40].exists()
+    assert not files[400].exists()
+
+
+def test_migration_backfills_references_of_existing_runs(tmp_path):
+    digest = uuid.uuid4().hex * 2
+    db_path = str(tmp_path / "autobots.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE workflow_run (id INTEGER PRIMARY KEY, run_uuid VARCHAR, result_summary JSON)")
+    conn.execute("CREATE TABLE workflow_run_checkpoint "
+                 "(id INTEGER PRIMARY KEY, run_uuid VARCHAR, outputs BLOB, result JSON)")
+    conn.execute("INSERT INTO workflow_run (run_uuid, result_summary) VALUES ('r1', ?)",
+                 (json.dumps({"report": "/file/summary.png"}),))
+    conn.execute("INSERT INTO workflow_run_checkpoint (run_uuid, outputs, result) VALUES ('r1', ?, '{}')",
+                 (pickle.dumps({"a": {"v": ArtifactRef(digest, "text", 1, "")}}),))
+    conn.commit()
+    conn.close()
+    log_conn = sqlite3.connect(str(tmp_path / "logs.db"))
+    log_conn.execute("CREATE TABLE workflow_logs (id INTEGER PRIMARY KEY, run_id VARCHAR, message TEXT)")
+    log_conn.execute("INSERT INTO workflow_logs (run_id, message) VALUES ('r2', 'Saved at: /data/uploads/live.png')")
+    log_conn.commit()
+    log_conn.close()
+    os.makedirs(tmp_path / "archive" / "r3")
+    with gzip.open(tmp_path / "archive" / "r3" / "r3.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"id": 1, "message": "Saved at: C:\\data\\uploads\\old.png"}) + "\n")
+
+    migration._check_and_migrate(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = set(conn.execute("SELECT run_uuid, name, kind FROM workflow_run_file").fetchall())
+    finally:
+        conn.close()
+    assert rows == {("r1", "summary.png", "upload"), ("r1", digest, "artifact"),
+                    ("r2", "live.png", "upload"), ("r3", "old.png", "upload")}
@@ -0,0 +1,52 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+from types import SimpleNamespace
+
+from ability.core import memory as memory_module
+from ability.core.memory import Memory, current_scope
+
+
+def node(node_id):
+    return SimpleNamespace(id=node_id)
+
+
+def test_child_scopes_do_not_evict_the_running_run(run_context):
+    memory = Memory()
+    memory.set(node("a"), "v", "parent")
+    # map 调用: 每一项一个子作用域，数量超过 MAX_RUNS
+    for index in range(Memory.MAX_RUNS * 2):
+        token = current_scope.set(f"{run_context}/c#{index}")
+        try:
+            memory.set(node("k"), "v", index)
+        finally:
+            current_scope.reset(token)
+
+    assert memory.lookup("a", "v") == "parent"
+    memory.release()
+    assert not [scope for scope in memory._runs if scope.startswith(f"{run_context}/")]
+
+
+def test_other_runs_evict_oldest_but_never_the_current_one(run_context):
+    memory = Memory()
+    memory.set(node("a"), "v", "current")
+    others = [f"other-{index}" for index in range(Memory.MAX_RUNS + 2)]
+    try:
+        for run_id in others:
+            memory.store(run_id).set("a", "v", run_id)
+            memory.store(f"{run_id}/c#0").set("k", "v", run_id)
+        roots = [scope for scope in memory._runs if "/" not in scope]
+        assert len(roots) == Memory.MAX_RUNS
+        assert others[0] not in memory._runs and f"{others[0]}/c#0" not in memory._runs
+        assert others[-1] in memory._runs
+        assert memory.lookup("a", "v") == "current"
+    finally:
+        for run_id in others:
+            memory.release(run_id)
+
+
+def test_set_previews_each_value_once(run_context, monkeypatch):
+    calls = []
+    original = memory_module.preview
+    monkeypatch.setattr(memory_module, "preview", lambda value: calls.append(value) or original(value))
+    Memory().set(node("a"), "v", "x" * 100)
+    assert len(calls) == 1
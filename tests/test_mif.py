@@ -0,0 +1,75 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import pytest
+
+from conftest import make_node
+from ability.component.map import MAP
+from ability.component.router import BaseRouter
+from ability.component.template import Template
+from driver.core.manager import Manager
+
+ran = []
+
+
+class Source(Template):
+    """
+    把 data 中的 value 原样写入变量 v (字符串保持字符串)
+    """
+
+    def execute(self):
+        ran.append(self.info.id)
+        self.memory.set(self.info, "v", self.info.data.get("value"))
+
+
+@pytest.fixture(autouse=True)
+def routes():
+    MAP["test"] = {"details": {"source": {"address": "test/source"}}}
+    BaseRouter.routes["test/source"] = Source
+    ran.clear()
+    yield
+    MAP.pop("test", None)
+
+
+def branch(value, left, op, right, branches=None):
+    """
+    src 写入 value，cfs/if 比较 left op right，返回走到的分支 yes / no
+    """
+    ran.clear()
+    nodes = {
+        "public-trigger-1": make_node("public-trigger-1", ["src"], []),
+        "src": make_node("src", ["if"], ["public-trigger-1"], code="test/source", value=value),
+        "if": make_node("if", ["yes", "no"], ["src"], code="cfs/if", platform="cfs",
+                        conditions=[{"left": left, "op": op, "right": right}],
+                        branches={"0": "yes", "else": "no"} if branches is None else branches),
+        "yes": make_node("yes", [], ["if"], code="test/source"),
+        "no": make_node("no", [], ["if"], code="test/source"),
+    }
+    nodes["if"]["nodeType"] = 101
+    Manager({"nodes": nodes}, keep_alive=True).run()
+    return [node_id for node_id in ran if node_id in ("yes", "no")]
+
+
+@pytest.mark.parametrize("value, op, right, expected", [
+    ("1", "=", "1", "yes"),
+    ("true", "=", "true", "yes"),
+    ("1.50", ">", "1", "yes"),
+    ("abc", "contains", "b", "yes"),
+    ("abc", "=", "1", "no"),
+])
+def test_string_variable_compares_like_legacy(run_context, value, op, right, expected):
+    assert branch(value, "{{src.v}}", op, right) == [expected]
+
+
+def test_variable_value_is_not_resolved_again(run_context):
+    # 变量的值恰好是模板文本时按文本比较，不再当作变量引用二次解析
+    assert branch("{{src.other}}", "{{src.v}}", "contains", "other") == ["yes"]
+
+
+def test_text_with_variable_compares_as_text(run_context):
+    assert branch("7", "v={{src.v}}", "=", "v=7") == ["yes"]
+
+
+def test_no_match_without_else_follows_first_next_node(run_context):
+    # 旧的顺序执行在未命中且没有 else 时走 nextCodes[0]，其余分支不执行
+    assert branch("abc", "{{src.v}}", "=", "1", branches={"0": "no"}) == ["yes"]
+    assert branch("abc", "{{src.v}}", "=", "1", branches={}) == ["yes"]
@@ -0,0 +1,28 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import sqlite3
+
+from server.core.migration import _check_and_migrate
+
+
+def test_parent_uuid_column_and_index_added(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE workflow_run (id INTEGER PRIMARY KEY, run_uuid TEXT, status TEXT)")
+    conn.commit()
+    conn.close()
+
+    _check_and_migrate(path)
+    # 再次执行不报错 (列和索引已存在)
+    _check_and_migrate(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(workflow_run)")}
+        indexes = {row[1]: row[2] for row in conn.execute("PRAGMA index_list(workflow_run)")}
+        index_columns = [row[2] for row in conn.execute("PRAGMA index_info(ix_workflow_run_parent_uuid)")]
+    finally:
+        conn.close()
+    assert "parent_uuid" in columns
+    assert "ix_workflow_run_parent_uuid" in indexes
+    assert index_columns == ["parent_uuid"]
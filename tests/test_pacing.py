@@ -0,0 +1,58 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+
+from ability.core.screen_state import ScreenState
+from driver.core import pacing as pacing_module
+from driver.core.pacing import Pacing
+
+
+class FakeEngine:
+    PREFETCH = ()
+
+    def __init__(self):
+        self.driver = object()
+        self.screen = ScreenState()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(pacing_module.Pacing, "_engine", staticmethod(lambda node: engine))
+    return engine
+
+
+def node(code):
+    return SimpleNamespace(id="n", nodeCode=code, platform="mobile", data={})
+
+
+def test_ui_node_invalidates_screen_state(engine):
+    # 组件直接调用 engine.driver 操作界面时引擎不会 invalidate，由节奏控制在节点之后统一处理
+    engine.screen.put("screenshot", "before-click")
+    version = engine.screen.version
+    Pacing({"mobile": {"strategy": "none", "prefetch": False}}).settle("mobile@d1", node("mobile/click"))
+
+    assert engine.screen.version == version + 1
+    assert engine.screen.get("screenshot", lambda kind: "after-click") == "after-click"
+
+
+def test_passive_node_keeps_screen_state(engine):
+    engine.screen.put("screenshot", "current")
+    version = engine.screen.version
+    Pacing().settle("mobile@d1", node("mobile/find"))
+
+    assert engine.screen.version == version
+    assert engine.screen.get("screenshot", lambda kind: "captured") == "current"
+
+
+def test_ui_node_waits_like_legacy_unless_adaptive_is_chosen(engine, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(pacing_module.time, "sleep", sleeps.append)
+    Pacing().settle("mobile@d1", node("mobile/click"))
+    assert sleeps == [pacing_module.LEGACY_DELAY]
+
+    pacing = Pacing({"mobile": "adaptive", "web": {"delay": 0.5}})
+    assert pacing.policy["mobile"] == pacing_module.ADAPTIVE_POLICY["mobile"]
+    assert pacing.policy["web"] == {"strategy": "fixed", "delay": 0.5}
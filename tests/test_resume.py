@@ -0,0 +1,130 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import json
+
+import pytest
+
+from conftest import make_node
+from ability.component.map import MAP
+from ability.component.router import BaseRouter
+from ability.component.template import Template
+from ability.core.memory import Memory
+from driver.core.manager import Manager
+from script.mTask import report
+
+failing = set()
+ran = []
+
+
+class Step(Template):
+    def execute(self):
+        ran.append(self.info.id)
+        if self.info.id in failing:
+            raise RuntimeError(f"{self.info.id} failed")
+        self.memory.set(self.info, "v", f"{self.info.id}:{self.get_param_value('x')}")
+
+
+@pytest.fixture(autouse=True)
+def routes():
+    MAP["test"] = {"details": {"step": {"address": "test/step"}}}
+    BaseRouter.routes["test/step"] = Step
+    failing.clear()
+    ran.clear()
+    yield
+    MAP.pop("test", None)
+
+
+def workflow():
+    def step(node_id, next_codes, last_codes, x):
+        return make_node(node_id, next_codes, last_codes, code="test/step", x=x)
+    return {
+        "public-trigger-1": step("public-trigger-1", ["a", "b"], [], "t"),
+        "a": step("a", ["f"], ["public-trigger-1"], "1"),
+        "b": step("b", ["j"], ["public-trigger-1"], "2"),
+        "f": step("f", ["j"], ["a"], "{{a.v}}"),
+        "j": step("j", [], ["f", "b"], "{{f.v}}+{{b.v}}"),
+    }
+
+
+def run(resume=None):
+    """
+    执行一次运行，返回写入的检查点 {node_id: {"outputs", "result"}}
+    """
+    checkpoints = {}
+
+    def save(node_id, outputs, result):
+        checkpoints[node_id] = {"outputs": dict(outputs), "result": result}
+
+    Memory().release()
+    report.clear()
+    manager = Manager({"nodes": workflow()}, keep_alive=True, checkpoint=save, resume=resume)
+    try:
+        manager.run()
+    except RuntimeError:
+        pass
+    return checkpoints
+
+
+def test_resume_of_a_resume_keeps_restored_outputs(run_context):
+    failing.update({"f"})
+    first = run()
+    assert sorted(first) == ["a", "b", "public-trigger-1"]
+
+    # 第一次恢复: f 成功，j 失败；恢复的上游节点同时写入本次运行的检查点
+    failing.clear()
+    failing.add("j")
+    second = run({"node_id": "f", "checkpoints": first})
+    assert sorted(second) == ["a", "b", "f", "public-trigger-1"]
+
+    # 第二次恢复只使用第二次运行的检查点
+    failing.clear()
+    ran.clear()
+    run({"node_id": "j", "checkpoints": second})
+    assert ran == ["j"]
+    assert Memory().store().get_all_from_node("j") == {"v": "j:f:a:1+b:2"}
+
+
+def test_resume_restores_only_upstream_checkpoints(run_context):
+    completed = run()
+    assert "j" in completed
+
+    failing.add("f")
+    run({"node_id": "f", "checkpoints": completed})
+    # j 在恢复区域内且未执行，不保留上一次运行的结果
+    assert "j" not in report
+    assert Memory().store().get_all_from_node("j") == {}
+    assert report["b"] == completed["b"]["result"]["report"]
+
+
+def test_resume_carries_row_and_device(databases, monkeypatch):
+    from server.core.database import SessionLocal
+    from server.models.workflow import Workflow
+    from server.models.workflow_run import WorkflowRun
+    from server.routers import rWorkflowRun
+    from server.services.run_service import run_writer
+    from driver.agent.actuator import process_runner_wrapper
+
+    db = SessionLocal()
+    try:
+        nodes = workflow()
+        wf = Workflow(name="resume", nodes=json.dumps(nodes))
+        db.add(wf)
+        db.commit()
+        run_data = {"id": wf.id, "nodes": nodes, "row": {"name": "r1"}, "device": "serial-1",
+                    "trigger": "dataset", "parent_uuid": None}
+        failing.add("f")
+        assert process_runner_wrapper(run_data, "carry-1", wf.id, keep_alive=True) == "failed"
+        run_writer.flush()
+
+        run = db.query(WorkflowRun).filter(WorkflowRun.run_uuid == "carry-1").first()
+        assert run.result_summary["_run"]["context"] == {"row": {"name": "r1"}, "device": "serial-1"}
+
+        submitted = []
+        monkeypatch.setattr(rWorkflowRun.pool, "submit", lambda data, *args, **kwargs: submitted.append(data))
+        response = rWorkflowRun.resume_workflow_run("carry-1", from_node="f", db=db)
+        assert response["code"] == 200
+        assert submitted[0]["row"] == {"name": "r1"}
+        assert submitted[0]["device"] == "serial-1"
+        assert submitted[0]["resume"] == {"run_uuid": "carry-1", "node_id": "f"}
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import threading
+
+import pytest
+
+from conftest import make_node
+from ability.component.map import MAP
+from ability.component.router import BaseRouter
+from ability.core.exeception import MException
+from driver.core.manager import Manager
+from script.constPath.error_code import ErrorCode
+
+spans = {}
+entered = []
+
+
+class Work:
+    def __init__(self, info):
+        self.info = info
+
+    def execute(self):
+        started = time.monotonic()
+        time.sleep(float(self.info.data.get("t", 0)))
+        spans[self.info.id] = (started, time.monotonic(), threading.current_thread().name)
+
+
+class Back:
+    """
+    始终走回循环入口，模拟走向永远不变的循环体
+    """
+
+    def __init__(self, info):
+        self.info = info
+
+    def execute(self):
+        entered.append(self.info.id)
+        self.info.nextCodes = [self.info.data["to"]]
+
+
+@pytest.fixture(autouse=True)
+def routes():
+    MAP["test"] = {"details": {"work": {"address": "test/work"}, "back": {"address": "test/back"}}}
+    BaseRouter.routes["test/work"] = Work
+    BaseRouter.routes["test/back"] = Back
+    spans.clear()
+    entered.clear()
+    yield
+    MAP.pop("test", None)
+
+
+def run(nodes):
+    manager = Manager({"nodes": nodes}, keep_alive=True)
+    manager.run()
+    return manager
+
+
+def test_independent_passive_branches_overlap(run_context):
+    nodes = {
+        "public-trigger-1": make_node("public-trigger-1", ["a", "b"], []),
+        "a": make_node("a", ["j"], ["public-trigger-1"], t=0.5),
+        "b": make_node("b", ["j"], ["public-trigger-1"], t=0.5),
+        "j": make_node("j", [], ["a", "b"]),
+    }
+    started = time.monotonic()
+    run(nodes)
+    elapsed = time.monotonic() - started
+
+    (a_start, a_end, a_thread), (b_start, b_end, b_thread) = spans["a"], spans["b"]
+    assert a_thread != b_thread
+    assert a_start < b_end and b_start < a_end
+    assert elapsed < 0.9
+    # 汇合节点在两个分支都结束后才执行
+    assert spans["j"][0] >= max(a_end, b_end)
+
+
+def test_ui_lane_stays_serial_per_device(run_context):
+    nodes = {
+        "public-trigger-1": make_node("public-trigger-1", ["a", "b"], []),
+        "a": make_node("a", [], ["public-trigger-1"], platform="mobile", t=0.2),
+        "b": make_node("b", [], ["public-trigger-1"], platform="mobile", t=0.2),
+    }
+    run(nodes)
+    (a_start, a_end, _), (b_start, b_end, _) = spans["a"], spans["b"]
+    assert a_end <= b_start or b_end <= a_start
+
+
+def test_endless_loop_fails_at_rearm_limit(run_context):
+    nodes = {
+        "_loop": {"max_rearms": 5},
+        "public-trigger-1": make_node("public-trigger-1", ["l"], []),
+        "l": make_node("l", ["x"], ["public-trigger-1", "x"]),
+        "x": make_node("x", ["l"], ["l"], code="test/back", to="l"),
+    }
+    with pytest.raises(MException) as error:
+        run(nodes)
+    assert error.value.error_code == ErrorCode.RUN_ERROR_LOOP_LIMIT.code
+    assert len(entered) == 6
@@ -0,0 +1,20 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import logging
+
+from script.log import SLog, CONSOLE_LEVEL
+
+
+def test_console_skips_debug_by_default(monkeypatch):
+    calls = []
+    monkeypatch.setattr(SLog, "_db_write_callback", None)
+    assert CONSOLE_LEVEL == logging.INFO and SLog.console_level == logging.INFO
+
+    SLog.d("T", lambda: calls.append("debug") or "debug")
+    SLog.i("T", lambda: calls.append("info") or "info")
+    assert calls == ["info"]
+
+    monkeypatch.setattr(SLog, "console_level", SLog.console_level)
+    SLog.set_level(console="debug")
+    SLog.d("T", lambda: calls.append("debug") or "debug")
+    assert calls == ["info", "debug"]
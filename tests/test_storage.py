@@ -0,0 +1,82 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from server.core.storage import WriteQueue, create_sqlite_engine, metrics
+
+
+@pytest.fixture
+def queue(tmp_path):
+    engine = create_sqlite_engine(str(tmp_path / "queue.db"), f"test-{tmp_path.name}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT NOT NULL)"))
+    writer = WriteQueue(sessionmaker(bind=engine), "test", batch_size=50, interval=0.05)
+    yield writer, engine
+    writer.close()
+    engine.dispose()
+
+
+def insert(value):
+    return lambda db: db.execute(text("INSERT INTO items (value) VALUES (:value)"), {"value": value})
+
+
+def values(engine):
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT value FROM items ORDER BY id"))]
+
+
+def test_jobs_are_committed_in_batches_in_order(queue):
+    writer, engine = queue
+    for index in range(120):
+        writer.submit(insert(str(index)))
+    assert writer.flush(10) is True
+
+    assert values(engine) == [str(index) for index in range(120)]
+    assert writer.written == 120 and writer.failed == 0
+    # 每批最多 batch_size 个 job，在一个事务中提交
+    assert 3 <= writer.batches < 120
+
+
+def test_failed_job_only_drops_itself(queue):
+    writer, engine = queue
+    writer.submit(insert("a"))
+    writer.submit(insert(None))  # NOT NULL 约束失败
+    writer.submit(insert("b"))
+    assert writer.flush(10) is True
+
+    assert values(engine) == ["a", "b"]
+    assert writer.written == 2 and writer.failed == 1
+
+
+def test_flush_waits_for_slow_writes(queue):
+    writer, engine = queue
+    release = threading.Event()
+
+    def slow(db):
+        release.wait(5)
+        insert("slow")(db)
+
+    writer.submit(slow)
+    assert writer.flush(0.2) is False
+    release.set()
+    assert writer.flush(10) is True
+    assert values(engine) == ["slow"]
+
+
+def test_engine_applies_pragmas_and_reports_metrics(queue, tmp_path):
+    writer, engine = queue
+    writer.submit(insert("x"))
+    writer.flush(10)
+    conn = sqlite3.connect(str(tmp_path / "queue.db"))
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+    stats = metrics()[f"test-{tmp_path.name}"]
+    assert stats["transactions"] >= 1
+    assert stats["pool"]["checked_out"] == 0
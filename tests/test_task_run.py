@@ -0,0 +1,99 @@
+# !/usr/bin/env python
+# -*-coding:utf-8 -*-
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+from server.core.database import SessionLocal
+from server.models.task import Task
+from server.models.workflow_run import WorkflowRun
+from server.services import run_service, task_service
+from server.services.task_service import TaskRun, tasks
+
+
+class FakePool:
+    """
+    "ok" 工作流立即成功结束，"hang" 工作流开始后一直不结束 (不回调)
+    """
+
+    def __init__(self):
+        self.cancelled = []
+
+    def grow(self, size):
+        pass
+
+    def submit(self, run_data, run_id, flow_id, callback=None):
+        db = SessionLocal()
+        try:
+            status = "success" if flow_id == "ok" else "pending"
+            db.add(WorkflowRun(workflow_id=flow_id, run_uuid=run_id, status=status, trigger_type="task",
+                               start_time=datetime.now()))
+            db.commit()
+        finally:
+            db.close()
+        if flow_id == "ok":
+            callback(run_id)
+
+    def cancel(self, run_id):
+        self.cancelled.append(run_id)
+        return "running"
+
+
+@pytest.fixture
+def workflows(monkeypatch):
+    monkeypatch.setattr(task_service, "load_workflow", lambda workflow_id: {"nodes": {}})
+    monkeypatch.setattr(task_service, "release_devices", lambda devices: None)
+    monkeypatch.setattr(task_service, "RUN_WAIT_TIMEOUT", 0.2)
+
+
+def add_task(workflow_ids):
+    task_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(Task(id=task_id, app_id="app", name="t", type="test", workflow_ids=workflow_ids))
+        db.commit()
+    finally:
+        db.close()
+    return task_id
+
+
+def wait_finished(task_id, timeout=5):
+    end = time.time() + timeout
+    while task_id in tasks and time.time() < end:
+        time.sleep(0.02)
+    db = SessionLocal()
+    try:
+        return db.query(Task).filter(Task.id == task_id).first()
+    finally:
+        db.close()
+
+
+def test_start_returns_false_when_task_missing(databases, workflows):
+    assert TaskRun(FakePool(), "no-such-task", ["ok"], ["d1"]).start() is False
+    assert "no-such-task" not in tasks
+
+
+def test_hanging_run_is_failed_after_wait_timeout(databases, workflows):
+    pool = FakePool()
+    task_id = add_task(["hang", "ok"])
+    started = time.time()
+    assert TaskRun(pool, task_id, ["hang", "ok"], ["d1"]).start() is True
+
+    task = wait_finished(task_id)
+    assert time.time() - started < 3
+    runs = {item["workflow_id"]: item for item in task.result_summary["runs"]}
+    assert runs["hang"]["status"] == "failed"
+    assert runs["ok"]["status"] == "success"
+    assert task.status == "failed"
+    assert task.completed_count == 2
+    # 超时的运行标记为失败，并从池中取消
+    assert run_service.get_status(runs["hang"]["run_uuid"]) == "failed"
+    assert pool.cancelled == [runs["hang"]["run_uuid"]]
+
+
+def test_wait_timeout_follows_run_deadline(monkeypatch):
+    monkeypatch.setattr(task_service, "RUN_WAIT_GRACE", 5)
+    assert TaskRun._wait_timeout({"nodes": {"_deadline": {"run": 30}}}) == 35
+    assert TaskRun._wait_timeout({"nodes": {}}) == task_service.RUN_WAIT_TIMEOUT